@@ -3,28 +3,64 @@ OMR Testing System - Flask Backend Server
 Handles OMR image processing requests from the frontend
 """
 
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
 import sys
 import tempfile
 import base64
+import binascii
 import json
+import gzip
+import re
+import atexit
+import queue
+import functools
+import hmac
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import traceback
 
 # directory itech
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from omr_scanner import OMRScanner
+# heavy imports (cv2, numpy, omr_scanner) are deferred, see get_omr_scanner()
+from artifact_store import ArtifactStore
+from scan_ledger import ScanLedger, SUMMARY_BUCKETS
+from scanner_config import PROFILES, PREPROCESS_PIPELINES, load_profiles
+from memory_budget import (MemoryBudget, MemoryBudgetTimeout, image_size, read_image_size,
+                           estimate_scan_bytes, estimate_decode_bytes, choose_reduce_factor)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# preflight cached ng browser para di doble round trip sa cross-origin calls
+CORS_MAX_AGE = 24 * 60 * 60
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, max_age=CORS_MAX_AGE)
+
+# mga folder kung san inuupload results (OMR_BASE_FOLDER para sa ibang location, e.g. tests)
+BASE_FOLDER = os.environ.get('OMR_BASE_FOLDER', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+UPLOAD_FOLDER = os.path.join(BASE_FOLDER, 'uploads')
+RESULTS_FOLDER = os.path.join(BASE_FOLDER, 'results')
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'}
 
-# mga folder kung san inuupload results
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'results')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
+# binary webcam uploads: content type -> file extension
+WEBCAM_MIMETYPES = {
+    'image/webp': 'webp',
+    'image/jpeg': 'jpg',
+    'image/png': 'png'
+}
+
+# webcam uploads are checked with a 1/8 decode before saving
+WEBCAM_CHECK_REDUCE = 8
 
 # directories true
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -34,8 +70,231 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# retention ng uploads/ at results/ para di mapuno disk
+app.config['UPLOAD_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # 2GB
+app.config['UPLOAD_MAX_AGE_DAYS'] = 7
+app.config['RESULTS_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # 2GB
+app.config['RESULTS_MAX_AGE_DAYS'] = 30
+app.config['RETENTION_INTERVAL_SECONDS'] = 60 * 60
+
+# out-of-process scanning (python scan_worker.py), None = scan inside flask
+app.config['SCAN_WORKER_SOCKET'] = os.environ.get('OMR_SCAN_WORKER_SOCKET')
+app.config['SCAN_WORKER_TIMEOUT'] = 60
+
+# report peak bytes allocated per full scan (tracemalloc, for profiling only;
+# null for scans that overlapped another scan, the peak is process-wide)
+app.config['TRACK_SCAN_ALLOCATIONS'] = os.environ.get('OMR_TRACK_ALLOCATIONS') == '1'
+
+# estimated scan working memory na pwedeng sabay-sabay (see memory_budget.py);
+# a single scan may use MAX_SHARE of it, bigger images are decoded downscaled
+app.config['SCAN_MEMORY_BUDGET_BYTES'] = int(os.environ.get('OMR_SCAN_MEMORY_BUDGET_MB', 1024)) * 1024 * 1024
+app.config['SCAN_MEMORY_MAX_SHARE'] = 0.5
+app.config['SCAN_MEMORY_QUEUE_TIMEOUT'] = 30  # seconds a scan may wait, then 503
+
+# on-demand scan profiling (X-OMR-Profile: 1 or ?profiling=1), callers sending
+# X-Admin-Token lang. Behind a reverse proxy every caller is 127.0.0.1, kaya
+# local callers without a token only with OMR_PROFILING_ALLOW_LOCAL=1 (dev only)
+app.config['PROFILING_ADMIN_TOKEN'] = os.environ.get('OMR_ADMIN_TOKEN')
+app.config['PROFILING_ALLOW_LOCAL'] = os.environ.get('OMR_PROFILING_ALLOW_LOCAL') == '1'
+app.config['PROFILING_LOCAL_ADDRESSES'] = {'127.0.0.1', '::1'}
+
+# target time mula import hanggang warmed-up scanner
+app.config['STARTUP_TARGET_MS'] = 3000
+# failed warm-up is retried by the next request after this many seconds
+app.config['WARM_UP_RETRY_SECONDS'] = 5
+
+# sqlite ledger ng lahat ng full scans (wala sa results/ para di ma-retention)
+app.config['SCAN_LEDGER_PATH'] = os.path.join(BASE_FOLDER, 'data', 'scan_ledger.db')
+
+# scans of the same form within this many seconds reuse its bubble layout (0 = off, default;
+# leave it off for load tests, replayed slips would only measure the reuse fast path)
+app.config['RETAKE_WINDOW_SECONDS'] = float(os.environ.get('OMR_RETAKE_WINDOW_SECONDS', 0))
+
+# shadow mode: re-run a sample of full scans with a candidate profile (unset = off)
+app.config['SHADOW_PROFILE'] = os.environ.get('OMR_SHADOW_PROFILE')
+app.config['SHADOW_SAMPLE_RATE'] = float(os.environ.get('OMR_SHADOW_SAMPLE_RATE', 0.05))
+app.config['SHADOW_MAX_CPU_SHARE'] = float(os.environ.get('OMR_SHADOW_MAX_CPU_SHARE', 0.1))
+app.config['SHADOW_WORKERS'] = 1
+app.config['SHADOW_LOG_FOLDER'] = os.path.join(BASE_FOLDER, 'data', 'shadow')
+
+# tuned profiles (python autotune.py ...), selectable per request via "profile"
+app.config['SCANNER_PROFILES_DIR'] = os.environ.get(
+    'OMR_PROFILES_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles'))
+# profile used when a request doesn't pick one
+app.config['SCANNER_PROFILE'] = os.environ.get('OMR_SCANNER_PROFILE', 'default')
+
+# upload name prefix -> preprocessing source profile when a scan request has no "source"
+# (only applies if the scanner profile uses the default pipeline). Off by default, e.g.
+# OMR_UPLOAD_SOURCES=omr_webcam:webcam once autotune.py shows it is as accurate on webcam slips
+app.config['UPLOAD_SOURCES'] = dict(
+    pair.split(':', 1) for pair in os.environ.get('OMR_UPLOAD_SOURCES', '').split(',') if pair)
+
+# advertised sa client para maliit lang ang webcam uploads (mahina wifi)
+app.config['WEBCAM_CAPTURE_CONFIG'] = {
+    'formats': ['image/webp', 'image/jpeg'],  # in order of preference
+    'quality': 0.85,
+    'max_width': 1600,
+    'max_height': 1600,
+    'upload_url': '/api/upload-webcam'
+}
+
+# caching per route, lahat ng wala dito is dynamic (no-store)
+NO_STORE = 'no-store, no-cache, must-revalidate, max-age=0'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+app.config['STATIC_CACHE_MAX_AGE'] = 300
+CACHE_POLICIES = {
+    'index': 'no-cache',
+    'get_catalog': 'no-cache',
+    'serve_css': f"public, max-age={app.config['STATIC_CACHE_MAX_AGE']}, must-revalidate",
+    'serve_js': f"public, max-age={app.config['STATIC_CACHE_MAX_AGE']}, must-revalidate"
+}
+
+# only successful responses (and their revalidations) get the per-route policy
+CACHEABLE_STATUSES = {200, 304}
+
+# debug artifacts with a content hash in the name never change
+HASHED_ARTIFACT_PATTERN = re.compile(r'_[0-9a-f]{16}\.(jpg|png|json|prof|txt)$')
+
+# compress lang yung text responses na sulit i-compress
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/css', 'application/javascript', 'text/javascript', 'text/plain'}
+MIN_COMPRESS_SIZE = 500
+
+# compact /api/full-scan response (format=compact)
+COMPACT_SCHEMA_VERSION = 2
+COMPACT_FIELDS = ['detected_form', 'catalog_version', 'items', 'total_price', 'confidence_score']
+# debug fields, ibabalik lang pag hiningi sa fields=
+DEBUG_FIELDS = [
+    'form_label', 'total_circles', 'menu_circles', 'debug_image', 'processing_time',
+    'item_details', 'selected_items_display', 'menu_items_available', 'peak_allocated_bytes', 'tier_counts',
+    'preprocessing'
+]
+
 # initialize
-omr_scanner = OMRScanner()
+upload_store = ArtifactStore(
+    UPLOAD_FOLDER,
+    max_bytes=app.config['UPLOAD_MAX_BYTES'],
+    max_age_days=app.config['UPLOAD_MAX_AGE_DAYS']
+)
+results_store = ArtifactStore(
+    RESULTS_FOLDER,
+    max_bytes=app.config['RESULTS_MAX_BYTES'],
+    max_age_days=app.config['RESULTS_MAX_AGE_DAYS']
+)
+# scanner is built on first use or by the warm-up thread
+_omr_scanner = None
+_omr_scanner_lock = threading.Lock()
+warm_up_done = threading.Event()
+_warm_up_lock = threading.Lock()
+_warm_up_pid = [None]  # process na nag-start ng warm-up
+_warm_up_failed_at = [None]  # monotonic time ng huling failed warm-up
+_profiling_lock = threading.Lock()
+STARTUP_TIMINGS = {}
+
+scan_worker = None
+if app.config['SCAN_WORKER_SOCKET']:
+    from scan_worker import ScanWorkerClient
+    scan_worker = ScanWorkerClient(app.config['SCAN_WORKER_SOCKET'], timeout=app.config['SCAN_WORKER_TIMEOUT'])
+
+load_profiles(app.config['SCANNER_PROFILES_DIR'])
+if app.config['SCANNER_PROFILE'] not in PROFILES:
+    raise RuntimeError(f"Unknown OMR_SCANNER_PROFILE: {app.config['SCANNER_PROFILE']}")
+for prefix, source in app.config['UPLOAD_SOURCES'].items():
+    if source not in PREPROCESS_PIPELINES:
+        raise RuntimeError(f"Unknown source profile in OMR_UPLOAD_SOURCES: {prefix}:{source}")
+
+# shadow pool is forked here, before any thread of this process starts
+# (retention, ledger writer, warm-up), so the fork copies no held locks
+shadow_evaluator = None
+if app.config['SHADOW_PROFILE']:
+    from shadow_mode import ShadowEvaluator
+    if app.config['SHADOW_PROFILE'] not in PROFILES:
+        raise RuntimeError(f"Unknown OMR_SHADOW_PROFILE: {app.config['SHADOW_PROFILE']}")
+    shadow_evaluator = ShadowEvaluator(
+        PROFILES[app.config['SHADOW_PROFILE']],
+        sample_rate=app.config['SHADOW_SAMPLE_RATE'],
+        max_cpu_share=app.config['SHADOW_MAX_CPU_SHARE'],
+        workers=app.config['SHADOW_WORKERS'],
+        log_folder=app.config['SHADOW_LOG_FOLDER']
+    )
+    atexit.register(shadow_evaluator.close)
+
+upload_store.start_retention(app.config['RETENTION_INTERVAL_SECONDS'])
+results_store.start_retention(app.config['RETENTION_INTERVAL_SECONDS'])
+
+scan_ledger = ScanLedger(app.config['SCAN_LEDGER_PATH'])
+atexit.register(scan_ledger.close)
+
+memory_budget = MemoryBudget(app.config['SCAN_MEMORY_BUDGET_BYTES'])
+
+def get_omr_scanner():
+    """Import and build the OMRScanner on first use"""
+    global _omr_scanner
+    if _omr_scanner is None:
+        with _omr_scanner_lock:
+            if _omr_scanner is None:
+                started = time.perf_counter()
+                from omr_scanner import OMRScanner
+                from retake_index import RetakeIndex
+                STARTUP_TIMINGS['scanner_import_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+                started = time.perf_counter()
+                retake_window = app.config['RETAKE_WINDOW_SECONDS']
+                _omr_scanner = OMRScanner(
+                    results_store=results_store,
+                    track_allocations=app.config['TRACK_SCAN_ALLOCATIONS'],
+                    config=PROFILES[app.config['SCANNER_PROFILE']],
+                    retake_index=RetakeIndex(window_seconds=retake_window) if retake_window > 0 else None
+                )
+                STARTUP_TIMINGS['scanner_init_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return _omr_scanner
+
+def warm_up():
+    """Build the scanner and run a synthetic scan so the first real scan is fast"""
+    try:
+        scanner = get_omr_scanner()
+        STARTUP_TIMINGS['warm_up_ms'] = round(scanner.warm_up(), 1)
+    except Exception as e:
+        # not ready; /api/ready shows the error and a later request retries
+        print(f"Warm-up failed: {e}")
+        STARTUP_TIMINGS['error'] = str(e)
+        with _warm_up_lock:
+            _warm_up_failed_at[0] = time.monotonic()
+            _warm_up_pid[0] = None
+        return
+    STARTUP_TIMINGS.pop('error', None)
+    STARTUP_TIMINGS['time_to_ready_ms'] = round((time.perf_counter() - _import_started) * 1000, 1)
+    warm_up_done.set()
+
+    print(f"Scanner ready: {STARTUP_TIMINGS}")
+    if STARTUP_TIMINGS['time_to_ready_ms'] > app.config['STARTUP_TARGET_MS']:
+        print(f"Warning: time to ready exceeded target of {app.config['STARTUP_TARGET_MS']}ms")
+
+def start_warm_up():
+    """
+    Run warm_up() in a background thread, server can accept requests meanwhile.
+    Once per process (a forked WSGI worker starts its own); returns None if
+    warm-up already ran or is running.
+    """
+    with _warm_up_lock:
+        if warm_up_done.is_set() or _warm_up_pid[0] == os.getpid():
+            return None
+        failed_at = _warm_up_failed_at[0]
+        if failed_at is not None and time.monotonic() - failed_at < app.config['WARM_UP_RETRY_SECONDS']:
+            return None
+        _warm_up_pid[0] = os.getpid()
+    thread = threading.Thread(target=warm_up, name='omr-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+@app.before_request
+def ensure_warm_up():
+    """
+    Start warm-up on the first request when nothing else did, e.g. under a WSGI
+    server or start_server.py's debug mode, so /api/ready does not stay 503.
+    Also retries a failed warm-up.
+    """
+    if not warm_up_done.is_set() and _warm_up_pid[0] != os.getpid():
+        start_warm_up()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -45,14 +304,348 @@ def allowed_file(filename):
 def save_uploaded_file(file):
     """Save uploaded file and return file path"""
     if file and allowed_file(file.filename):
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"omr_test_{timestamp}_{file.filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        return filepath
+        # content-hashed name, same image = same file
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        name = upload_store.put(file.read(), 'omr_test', extension)
+        return upload_store.path(name)
     return None
 
+def decode_image_bytes(image_bytes, reduce=1):
+    """Decode compressed image bytes with OpenCV (reduce=2/4/8 for smaller), returns None if invalid"""
+    import numpy as np
+    import cv2
+    from omr_scanner import REDUCED_DECODE_FLAGS
+
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[reduce])
+
+def read_webcam_image():
+    """
+    Read webcam image bytes from the request.
+    Supports a raw image body (image/webp, image/jpeg, image/png), a multipart
+    upload with an 'image' (or 'file') part, and the legacy JSON base64 data URL.
+
+    Returns: (image_bytes, extension) or (None, error message)
+    """
+    mimetype = request.mimetype
+
+    if mimetype in WEBCAM_MIMETYPES:
+        # raw body, diretso galing sa stream walang base64/json
+        return request.get_data(cache=False), WEBCAM_MIMETYPES[mimetype]
+
+    if mimetype == 'multipart/form-data':
+        part = request.files.get('image') or request.files.get('file')
+        if part is None:
+            return None, "Missing image part in multipart request"
+        extension = WEBCAM_MIMETYPES.get(part.mimetype)
+        if extension is None:
+            return None, f"Unsupported image type: {part.mimetype}"
+        return part.read(), extension
+
+    # legacy json na base64 data url
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'image' not in data:
+        return None, "Missing image in request"
+
+    image_data = data['image']
+    if not isinstance(image_data, str):
+        return None, "image must be a base64 string or data URL"
+    extension = 'png'
+    if image_data.startswith('data:image'):
+        # Remove data URL prefix
+        header, _, image_data = image_data.partition(',')
+        extension = WEBCAM_MIMETYPES.get(header[5:].split(';')[0], 'png')
+    try:
+        return base64.b64decode(image_data), extension
+    except binascii.Error:
+        return None, "image is not valid base64"
+
+def cache_policy_for_request(response):
+    """Pick the Cache-Control value for the current request"""
+    # errors (e.g. 404 ng artifact na na-delete ng retention) hindi dapat ma-cache
+    if response.status_code not in CACHEABLE_STATUSES:
+        return NO_STORE
+    if request.endpoint == 'get_result_file':
+        filename = request.view_args.get('filename', '')
+        if HASHED_ARTIFACT_PATTERN.search(filename):
+            return IMMUTABLE
+        return 'no-cache'
+    return CACHE_POLICIES.get(request.endpoint, NO_STORE)
+
+def compress_response(response):
+    """Compress text responses with br or gzip if the client accepts it"""
+    if (response.status_code != 200 or
+            response.mimetype not in COMPRESSIBLE_MIMETYPES or
+            'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    accept_encodings = request.accept_encodings
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        encoding = 'br'
+    elif accept_encodings.quality('gzip') > 0:
+        encoding = 'gzip'
+    else:
+        return response
+
+    # static files are sent as passthrough file wrappers
+    response.direct_passthrough = False
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body)
+    else:
+        compressed = gzip.compress(body, compresslevel=6)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+    # iba na ang bytes so weak etag na lang, still matches on revalidation
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+def parse_fields(fields):
+    """Parse fields selector from a list or comma separated string"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return [field.strip() for field in fields if field.strip()]
+
+def item_quantities(items):
+    """Compact item list: [{'id': item, 'quantity': n}] in first-seen order"""
+    quantities = {}
+    for item in items:
+        quantities[item['item']] = quantities.get(item['item'], 0) + item['quantity']
+    return [{'id': item_id, 'quantity': quantity} for item_id, quantity in quantities.items()]
+
+def compact_scan_result(result, fields=None):
+    """
+    Build the compact full scan response: item ids and quantities plus a
+    catalog version reference (see /api/catalog) instead of the item list.
+    """
+    available = {
+        'detected_form': result['detected_form'],
+        'catalog_version': result['catalog_version'],
+        'items': item_quantities(result['items']),
+        'total_price': result['total_price'],
+        'confidence_score': result['confidence_score'],
+        'form_label': result['form_label'],
+        'total_circles': result['total_circles'],
+        'menu_circles': result['menu_circles'],
+        'debug_image': result['debug_image'],
+        'processing_time': result['processing_time'],
+        'item_details': result['items'],
+        'selected_items_display': result['selected_items_display'],
+        'menu_items_available': result['menu_items_available'],
+        'peak_allocated_bytes': result.get('peak_allocated_bytes'),
+        'tier_counts': result.get('tier_counts'),
+        'preprocessing': result.get('preprocessing')
+    }
+
+    compact = {'schema_version': COMPACT_SCHEMA_VERSION, 'scan_id': result.get('scan_id')}
+    for field in fields or COMPACT_FIELDS:
+        compact[field] = available[field]
+    if result.get('retake'):
+        compact['retake'] = result['retake']
+    if 'profiling' in result:
+        compact['profiling'] = result['profiling']
+    return compact
+
+def parse_time_arg(name):
+    """Parse an ISO date/datetime query arg into unix time, None if missing"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+class ScanWorkerUnavailable(Exception):
+    """Scan worker daemon is down or crashed mid-scan"""
+
+class ProfilingBusy(Exception):
+    """Another profiled scan is running (one cProfile per process)"""
+
+class ScanRequestError(Exception):
+    """Invalid scan request body, answered with a JSON error and status"""
+
+    def __init__(self, message, error, status=400):
+        super().__init__(error)
+        self.message = message
+        self.error = error
+        self.status = status
+
+def parse_full_scan_request(data):
+    """
+    (filepath, config, response_format, fields) of a full scan request body.
+    Raises ScanRequestError.
+    """
+    if not data or 'filepath' not in data:
+        raise ScanRequestError("File path required", "Missing filepath in request")
+    
+    response_format = data.get('format') or request.args.get('format', 'full')
+    fields = parse_fields(data.get('fields') or request.args.get('fields'))
+    if fields is not None:
+        response_format = 'compact'
+        unknown = [field for field in fields if field not in COMPACT_FIELDS + DEBUG_FIELDS]
+        if unknown:
+            raise ScanRequestError("Unknown fields requested", f"Unknown fields: {', '.join(unknown)}")
+    
+    filepath = data['filepath']
+    if not os.path.exists(filepath):
+        raise ScanRequestError("File not found", "File does not exist", 404)
+    
+    try:
+        config = scan_config_from_request(data)
+    except ValueError as e:
+        raise ScanRequestError("Invalid scanner parameters", str(e))
+    return filepath, config, response_format, fields
+
+def shadow_submission(data, filepath, config, result):
+    """
+    Shadow scan of a served full scan, to be called once the response is out;
+    None if shadow mode is off, the request picked its own profile or the scan failed.
+    Never raises, the served result must not depend on the candidate.
+    """
+    if shadow_evaluator is None or 'profile' in data or 'error' in result:
+        return None
+    # candidate gets the same source/params overrides as the served config
+    try:
+        candidate = scan_config_from_request({**data, 'profile': app.config['SHADOW_PROFILE']})
+    except Exception as e:
+        # e.g. params valid for the served profile but not for the candidate's radii
+        print(f"Shadow scan skipped: {e}")
+        shadow_evaluator.skip('invalid_candidate')
+        return None
+    reduce = round(1 / result.get('decode_scale', 1))
+    return functools.partial(shadow_evaluator.submit, filepath, config, result, reduce, candidate)
+
+def stream_event(event, data, use_sse=False):
+    """One /api/full-scan/stream event as an NDJSON line or a Server-Sent Event"""
+    if use_sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({'event': event, 'data': data}) + '\n'
+
+def scan_config_from_request(data):
+    """
+    Scanner config for this request: "profile" picks a built-in or tuned profile,
+    "params" overrides individual circle_params/shaded_params/preprocess and
+    "source" ("flatbed", "webcam", "phone") picks the preprocessing pipeline.
+    Raises ValueError on unknown profiles or invalid parameters.
+    """
+    profile = data.get('profile', app.config['SCANNER_PROFILE'])
+    if not isinstance(profile, str) or profile not in PROFILES:
+        raise ValueError(f"Unknown profile: {profile} (available: {', '.join(PROFILES)})")
+    config = PROFILES[profile].with_overrides(data.get('params'))
+
+    source = data.get('source')
+    if source is None and config.preprocess.name == 'default':
+        # e.g. omr_webcam_<hash>.webp -> webcam pipeline
+        prefix = os.path.basename(str(data.get('filepath', ''))).rsplit('_', 1)[0]
+        source = app.config['UPLOAD_SOURCES'].get(prefix)
+    return config.for_source(source)
+
+@contextmanager
+def admitted_scan(filepath, config=None):
+    """
+    Reserve memory budget for scanning filepath and decode it.
+    Dimensions come from the file header; if the estimated working set is
+    over one scan's share of the budget the image is decoded at 1/2, 1/4 or
+    1/8 size and the config scaled to match. Yields (image, config, factor),
+    image is None if it could not be decoded. Raises MemoryBudgetTimeout.
+    """
+    scanner = get_omr_scanner()
+    config = config or scanner.config
+    max_scan_bytes = int(memory_budget.limit_bytes * app.config['SCAN_MEMORY_MAX_SHARE'])
+
+    size = read_image_size(filepath)
+    if size is None:
+        # unknown header (e.g. tiff), assume the worst
+        factor, estimate = 1, max_scan_bytes
+    else:
+        factor = choose_reduce_factor(size[0], size[1], max_scan_bytes, config.debug_images)
+        estimate = estimate_scan_bytes(size[0] // factor, size[1] // factor, config.debug_images)
+    if factor > 1:
+        memory_budget.record_downscale()
+        config = config.scaled(1 / factor)
+
+    with memory_budget.reserve(estimate, timeout=app.config['SCAN_MEMORY_QUEUE_TIMEOUT']):
+        yield scanner.load_image(filepath, reduce=factor), config, factor
+
+def run_scan(method, filepath, config=None, on_stage=None):
+    """
+    Run an OMRScanner method in-process or in the scan worker daemon, within the memory budget.
+    on_stage(stage, partial_result) gets full_omr_scan's partial results as they come.
+    """
+    with admitted_scan(filepath, config) as (image, config, factor):
+        if image is None:
+            return {"error": "Could not load image"}
+        kwargs = {} if on_stage is None else {'on_stage': on_stage}
+        if scan_worker is None:
+            result = getattr(get_omr_scanner(), method)(filepath, image=image, config=config, **kwargs)
+        else:
+            # pixels lang ang ipapasa through shared memory
+            try:
+                result = scan_worker.scan(method, filepath, image, config=config, **kwargs)
+            except (OSError, ConnectionError) as e:
+                raise ScanWorkerUnavailable(str(e))
+    if factor > 1 and 'error' not in result:
+        result['decode_scale'] = 1 / factor
+    return result
+
+def profiling_requested():
+    """Did the caller ask for this scan to be profiled"""
+    return request.headers.get('X-OMR-Profile') == '1' or request.args.get('profiling') == '1'
+
+def profiling_allowed():
+    """
+    Profiling is for callers with the admin token; local callers only if
+    PROFILING_ALLOW_LOCAL is on (the peer address is the proxy's behind one)
+    """
+    token = app.config['PROFILING_ADMIN_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode()):
+        return True
+    return app.config['PROFILING_ALLOW_LOCAL'] and request.remote_addr in app.config['PROFILING_LOCAL_ADDRESSES']
+
+def run_profiled_scan(method, filepath, config=None):
+    """
+    Run a scan in-process under ScanProfiler and store the .prof and
+    collapsed-stack files in results/, names are added as result['profiling'].
+    One at a time, raises ProfilingBusy if another profiled scan is running.
+    """
+    from scan_profiler import ScanProfiler
+
+    # isang cProfile lang pwede active per process (3.12+ raises otherwise)
+    if not _profiling_lock.acquire(blocking=False):
+        raise ProfilingBusy("Another profiled scan is running")
+    try:
+        # in-process kahit may scan worker, para ang scan mismo ang na-profile
+        with admitted_scan(filepath, config) as (image, config, factor):
+            if image is None:
+                return {"error": "Could not load image"}
+            with ScanProfiler() as profiler:
+                result = getattr(get_omr_scanner(), method)(filepath, image=image, config=config)
+    finally:
+        _profiling_lock.release()
+    if factor > 1 and 'error' not in result:
+        result['decode_scale'] = 1 / factor
+
+    result['profiling'] = {
+        'profile': results_store.put(profiler.profile_bytes(), 'scan_profile', 'prof'),
+        'collapsed_stacks': results_store.put(profiler.collapsed_stacks().encode('utf-8'), 'scan_stacks', 'txt'),
+        'duration_ms': round(profiler.duration_ms, 1),
+        'samples': sum(profiler.samples.values()),
+        'top_functions': profiler.top_functions()
+    }
+    return result
+
 def create_response(success=True, message="", data=None, error=None):
     """Create standardized API response"""
     response = {
@@ -87,23 +680,62 @@ def serve_js(filename):
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
+    scanner_status = {"mode": "in-process"}
+    if _omr_scanner is not None and _omr_scanner.retake_index is not None:
+        scanner_status["retakes"] = _omr_scanner.retake_index.stats()
+    if scan_worker is not None:
+        scanner_status = {"mode": "worker", "socket": scan_worker.socket_path}
+        try:
+            scanner_status["worker"] = scan_worker.ping()
+        except (OSError, ConnectionError) as e:
+            scanner_status["worker_error"] = str(e)
+
     return jsonify(create_response(
         success=True,
         message="OMR Testing Server is running",
         data={
             "status": "healthy",
             "version": "1.0.0",
+            "pid": os.getpid(),
+            "scanner": scanner_status,
+            "ready": warm_up_done.is_set(),
+            "startup": STARTUP_TIMINGS,
             "endpoints": [
                 "/api/upload",
                 "/api/upload-webcam",
+                "/api/capture-config",
                 "/api/detect-circles",
                 "/api/analyze-shaded",
                 "/api/full-scan",
+                "/api/full-scan/stream",
+                "/api/catalog",
+                "/api/scan-profiles",
+                "/api/storage",
+                "/api/memory",
+                "/api/scans",
+                "/api/scans/summary",
+                "/api/shadow/summary",
+                "/api/ready",
                 "/api/health"
             ]
         }
     ))
 
+@app.route('/api/ready')
+def ready_check():
+    """503 until the scanner has been warmed up"""
+    if not warm_up_done.is_set():
+        return jsonify(create_response(
+            success=False,
+            message="OMR scanner warm-up failed" if 'error' in STARTUP_TIMINGS else "OMR scanner is warming up",
+            data={"ready": False, "startup": STARTUP_TIMINGS}
+        )), 503
+    return jsonify(create_response(
+        success=True,
+        message="OMR scanner is ready",
+        data={"ready": True, "startup": STARTUP_TIMINGS}
+    ))
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file upload"""
@@ -154,50 +786,60 @@ def upload_file():
             error=str(e)
         )), 500
 
+@app.route('/api/capture-config')
+def capture_config():
+    """Webcam capture format and quality the client should use"""
+    return jsonify(create_response(
+        success=True,
+        message="Webcam capture configuration",
+        data=app.config['WEBCAM_CAPTURE_CONFIG']
+    ))
+
 @app.route('/api/upload-webcam', methods=['POST'])
 def upload_webcam():
     """Handle webcam image upload"""
     try:
-        data = request.get_json()
-        if not data or 'image' not in data:
+        image_bytes, extension = read_webcam_image()
+        if image_bytes is None:
             return jsonify(create_response(
                 success=False,
                 message="No image data provided",
-                error="Missing image in request"
+                error=extension
             )), 400
         
-        # extract
-        image_data = data['image']
-        if image_data.startswith('data:image'):
-            # Remove data URL prefix
-            image_data = image_data.split(',')[1]
-        
-        # decode
-        image_bytes = base64.b64decode(image_data)
-        
-        # unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"omr_webcam_{timestamp}.png"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        # save image
-        with open(filepath, 'wb') as f:
-            f.write(image_bytes)
+        # size galing sa header, tapos small decode para sure na valid image bago i-save
+        size = image_size(image_bytes)
+        image = None
+        if size is not None:
+            decode_bytes = estimate_decode_bytes(image_bytes, size[0], size[1], reduce=WEBCAM_CHECK_REDUCE)
+            with memory_budget.reserve(decode_bytes, timeout=app.config['SCAN_MEMORY_QUEUE_TIMEOUT']):
+                image = decode_image_bytes(image_bytes, reduce=WEBCAM_CHECK_REDUCE)
+        if image is None:
+            return jsonify(create_response(
+                success=False,
+                message="Invalid image data",
+                error="Could not decode image"
+            )), 400
         
-        # file path
-        file_size = os.path.getsize(filepath)
+        # save the original compressed bytes, no re-encode
+        name = upload_store.put(image_bytes, 'omr_webcam', extension)
+        filepath = upload_store.path(name)
         
         return jsonify(create_response(
             success=True,
             message="Webcam image uploaded successfully",
             data={
-                "filename": filename,
+                "filename": os.path.basename(filepath),
                 "filepath": filepath,
-                "size": file_size,
+                "size": len(image_bytes),
+                "width": int(size[0]),
+                "height": int(size[1]),
                 "uploaded_at": datetime.now().isoformat()
             }
         ))
         
+    except MemoryBudgetTimeout:
+        raise
     except Exception as e:
         app.logger.error(f"Webcam upload error: {str(e)}")
         return jsonify(create_response(
@@ -226,8 +868,17 @@ def detect_circles():
                 error="File does not exist"
             )), 404
         
+        try:
+            config = scan_config_from_request(data)
+        except ValueError as e:
+            return jsonify(create_response(
+                success=False,
+                message="Invalid scanner parameters",
+                error=str(e)
+            )), 400
+        
         # pandetect circles
-        result = omr_scanner.detect_circles(filepath)
+        result = run_scan('detect_circles', filepath, config=config)
         
         return jsonify(create_response(
             success=True,
@@ -235,6 +886,8 @@ def detect_circles():
             data=result
         ))
         
+    except (ScanWorkerUnavailable, MemoryBudgetTimeout):
+        raise
     except Exception as e:
         app.logger.error(f"Circle detection error: {str(e)}")
         return jsonify(create_response(
@@ -263,8 +916,28 @@ def analyze_shaded():
                 error="File does not exist"
             )), 404
         
+        try:
+            config = scan_config_from_request(data)
+        except ValueError as e:
+            return jsonify(create_response(
+                success=False,
+                message="Invalid scanner parameters",
+                error=str(e)
+            )), 400
+        
+        profiling = profiling_requested()
+        if profiling and not profiling_allowed():
+            return jsonify(create_response(
+                success=False,
+                message="Profiling not allowed",
+                error="Profiling requires X-Admin-Token"
+            )), 403
+        
         # pang analyze ng circles
-        result = omr_scanner.analyze_shaded_circles(filepath)
+        if profiling:
+            result = run_profiled_scan('analyze_shaded_circles', filepath, config=config)
+        else:
+            result = run_scan('analyze_shaded_circles', filepath, config=config)
         
         return jsonify(create_response(
             success=True,
@@ -272,6 +945,8 @@ def analyze_shaded():
             data=result
         ))
         
+    except (ScanWorkerUnavailable, MemoryBudgetTimeout, ProfilingBusy):
+        raise
     except Exception as e:
         app.logger.error(f"Shaded analysis error: {str(e)}")
         return jsonify(create_response(
@@ -282,33 +957,59 @@ def analyze_shaded():
 
 @app.route('/api/full-scan', methods=['POST'])
 def full_scan():
-    """Perform full OMR scan on uploaded image"""
+    """
+    Perform full OMR scan on uploaded image.
+    Optional: format=compact for the compact schema, and fields=a,b,c to pick
+    fields of the compact response (JSON body or query string).
+    profile (e.g. "high-res"), params ({"circle_params": {...},
+    "shaded_params": {...}}) and source ("flatbed", "webcam", "phone")
+    tune the scanner for this request only.
+    X-OMR-Profile: 1 (or ?profiling=1) profiles the scan, see run_profiled_scan().
+    """
     try:
         data = request.get_json()
-        if not data or 'filepath' not in data:
+        try:
+            filepath, config, response_format, fields = parse_full_scan_request(data)
+        except ScanRequestError as e:
             return jsonify(create_response(
                 success=False,
-                message="File path required",
-                error="Missing filepath in request"
-            )), 400
+                message=e.message,
+                error=e.error
+            )), e.status
         
-        filepath = data['filepath']
-        if not os.path.exists(filepath):
+        profiling = profiling_requested()
+        if profiling and not profiling_allowed():
             return jsonify(create_response(
                 success=False,
-                message="File not found",
-                error="File does not exist"
-            )), 404
+                message="Profiling not allowed",
+                error="Profiling requires X-Admin-Token"
+            )), 403
         
         # full omr scaaan
-        result = omr_scanner.full_omr_scan(filepath)
+        started = time.perf_counter()
+        if profiling:
+            result = run_profiled_scan('full_omr_scan', filepath, config=config)
+        else:
+            result = run_scan('full_omr_scan', filepath, config=config)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if 'error' not in result:
+            result['scan_id'] = scan_ledger.record(result, source=os.path.basename(filepath), duration_ms=duration_ms)
+        shadow = None if profiling else shadow_submission(data, filepath, config, result)
+        if response_format == 'compact' and 'error' not in result:
+            result = compact_scan_result(result, fields)
         
-        return jsonify(create_response(
+        response = jsonify(create_response(
             success=True,
             message="Full OMR scan completed",
             data=result
         ))
+        if shadow:
+            # after the response is sent, para walang dagdag na latency sa cashier
+            response.call_on_close(shadow)
+        return response
         
+    except (ScanWorkerUnavailable, MemoryBudgetTimeout, ProfilingBusy):
+        raise
     except Exception as e:
         app.logger.error(f"Full scan error: {str(e)}")
         return jsonify(create_response(
@@ -317,11 +1018,195 @@ def full_scan():
             error=str(e)
         )), 500
 
-@app.route('/api/results/<filename>')
+@app.route('/api/full-scan/stream', methods=['POST'])
+def full_scan_stream():
+    """
+    Full OMR scan streamed stage by stage, same body as /api/full-scan:
+    'form' (detected form), 'items' (selected items and total), 'artifacts'
+    (scan_id and debug image link) and 'result' (the /api/full-scan data),
+    or 'error'. NDJSON lines by default, Server-Sent Events with
+    Accept: text/event-stream or ?stream=sse.
+    """
+    data = request.get_json(silent=True)
+    try:
+        filepath, config, response_format, fields = parse_full_scan_request(data)
+    except ScanRequestError as e:
+        return jsonify(create_response(
+            success=False,
+            message=e.message,
+            error=e.error
+        )), e.status
+
+    use_sse = request.args.get('stream') == 'sse' or request.accept_mimetypes.best == 'text/event-stream'
+    compact = response_format == 'compact'
+    events = queue.Queue()
+
+    def on_stage(stage, partial):
+        if stage == 'items' and compact:
+            partial = {**partial, 'items': item_quantities(partial['items'])}
+        events.put((stage, partial))
+
+    def scan():
+        # sariling thread, para tapos at naka-record pa rin ang scan kahit umalis ang client
+        try:
+            started = time.perf_counter()
+            result = run_scan('full_omr_scan', filepath, config=config, on_stage=on_stage)
+            duration_ms = (time.perf_counter() - started) * 1000
+            if 'error' in result:
+                events.put(('error', {'message': "Full OMR scan failed", 'error': result['error']}))
+                return
+            result['scan_id'] = scan_ledger.record(result, source=os.path.basename(filepath), duration_ms=duration_ms)
+            shadow = shadow_submission(data, filepath, config, result)
+            events.put(('artifacts', {
+                'scan_id': result['scan_id'],
+                'debug_image': result['debug_image'],
+                'debug_image_url': f"/api/results/{result['debug_image']}" if result['debug_image'] else None
+            }))
+            events.put(('result', compact_scan_result(result, fields) if compact else result))
+            if shadow:
+                shadow()
+        except ScanWorkerUnavailable as e:
+            # same messages as the errorhandlers of the non-stream endpoints
+            app.logger.error(f"Scan worker unavailable: {str(e)}")
+            events.put(('error', {'message': "Scanner temporarily unavailable", 'error': str(e)}))
+        except MemoryBudgetTimeout as e:
+            app.logger.warning(f"Scan memory budget: {str(e)}")
+            events.put(('error', {'message': "Scanner busy, try again", 'error': str(e)}))
+        except Exception as e:
+            app.logger.error(f"Full scan stream error: {str(e)}")
+            events.put(('error', {'message': "Full OMR scan failed", 'error': str(e)}))
+
+    threading.Thread(target=scan, daemon=True).start()
+
+    def generate():
+        while True:
+            event, payload = events.get()
+            yield stream_event(event, payload, use_sse)
+            if event in ('result', 'error'):
+                return
+
+    response = app.response_class(generate(), mimetype='text/event-stream' if use_sse else 'application/x-ndjson')
+    # walang buffering sa nginx, dapat dumating agad bawat event
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/scan-profiles')
+def scan_profiles():
+    """Built-in scanner profiles usable as "profile" in scan requests"""
+    return jsonify(create_response(
+        success=True,
+        message="Scanner profiles",
+        data={name: config.to_dict() for name, config in PROFILES.items()}
+    ))
+
+@app.route('/api/catalog')
+def get_catalog():
+    """Menu items per form and prices, referenced by catalog_version"""
+    catalog = get_omr_scanner().get_catalog()
+    response = jsonify(create_response(
+        success=True,
+        message="Menu catalog",
+        data=catalog
+    ))
+    response.set_etag(catalog['catalog_version'])
+    return response.make_conditional(request)
+
+@app.route('/api/scans')
+def list_scans():
+    """Recorded scans, filter with since/until (ISO), item, form, limit, offset"""
+    try:
+        scans = scan_ledger.query_scans(
+            since=parse_time_arg('since'),
+            until=parse_time_arg('until'),
+            item=request.args.get('item'),
+            form=request.args.get('form', type=int),
+            limit=min(request.args.get('limit', 100, type=int), 1000),
+            offset=request.args.get('offset', 0, type=int)
+        )
+    except ValueError as e:
+        return jsonify(create_response(
+            success=False,
+            message="Invalid query",
+            error=str(e)
+        )), 400
+
+    return jsonify(create_response(
+        success=True,
+        message="Scans",
+        data={"count": len(scans), "scans": scans}
+    ))
+
+@app.route('/api/scans/summary')
+def scans_summary():
+    """Totals per item and per hour/day, filter with since/until (ISO)"""
+    group_by = request.args.get('group_by', 'hour')
+    if group_by not in SUMMARY_BUCKETS:
+        return jsonify(create_response(
+            success=False,
+            message="Invalid query",
+            error=f"group_by must be one of: {', '.join(SUMMARY_BUCKETS)}"
+        )), 400
+
+    try:
+        summary = scan_ledger.summary(
+            since=parse_time_arg('since'),
+            until=parse_time_arg('until'),
+            group_by=group_by
+        )
+    except ValueError as e:
+        return jsonify(create_response(
+            success=False,
+            message="Invalid query",
+            error=str(e)
+        )), 400
+
+    return jsonify(create_response(
+        success=True,
+        message="Scan summary",
+        data=summary
+    ))
+
+@app.route('/api/results/<path:filename>')
 def get_result_file(filename):
     """Serve result files"""
     return send_from_directory(app.config['RESULTS_FOLDER'], filename)
 
+@app.route('/api/memory')
+def scan_memory():
+    """Scan memory budget: current and peak reserved bytes, queued/downscaled scans"""
+    return jsonify(create_response(
+        success=True,
+        message="Scan memory budget",
+        data=memory_budget.usage()
+    ))
+
+@app.route('/api/shadow/summary')
+def shadow_summary():
+    """Shadow mode: candidate vs served results and per-stage latency"""
+    if shadow_evaluator is None:
+        return jsonify(create_response(
+            success=True,
+            message="Shadow mode is off",
+            data={"enabled": False}
+        ))
+    return jsonify(create_response(
+        success=True,
+        message="Shadow mode summary",
+        data={"enabled": True, **shadow_evaluator.summary()}
+    ))
+
+@app.route('/api/storage')
+def storage_usage():
+    """Disk usage of uploads/ and results/"""
+    return jsonify(create_response(
+        success=True,
+        message="Storage usage",
+        data={
+            "uploads": upload_store.usage(),
+            "results": results_store.usage()
+        }
+    ))
+
 @app.errorhandler(413)
 def too_large(e):
     """Handle file too large error"""
@@ -331,6 +1216,37 @@ def too_large(e):
         error="File size exceeds 16MB limit"
     )), 413
 
+@app.errorhandler(ScanWorkerUnavailable)
+def scan_worker_unavailable(e):
+    """Scan worker down, API stays up"""
+    app.logger.error(f"Scan worker unavailable: {str(e)}")
+    return jsonify(create_response(
+        success=False,
+        message="Scanner temporarily unavailable",
+        error=str(e)
+    )), 503
+
+@app.errorhandler(ProfilingBusy)
+def profiling_busy(e):
+    """Profiled scans run one at a time"""
+    return jsonify(create_response(
+        success=False,
+        message="Profiling busy, try again",
+        error=str(e)
+    )), 409
+
+@app.errorhandler(MemoryBudgetTimeout)
+def scan_memory_busy(e):
+    """Too many large scans in flight, client should retry"""
+    app.logger.warning(f"Scan memory budget: {str(e)}")
+    response = jsonify(create_response(
+        success=False,
+        message="Scanner busy, try again",
+        error=str(e)
+    ))
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
 @app.errorhandler(404)
 def not_found(e):
     """Handle 404 errors"""
@@ -342,10 +1258,19 @@ def not_found(e):
 
 @app.after_request
 def add_header(response):
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '-1'
-    return response
+    """Per-route caching and compression"""
+    if request.method == 'OPTIONS':
+        # CORS preflight, Access-Control-Max-Age is set by flask_cors
+        response.headers['Cache-Control'] = f'public, max-age={CORS_MAX_AGE}'
+        return response
+
+    cache_policy = cache_policy_for_request(response)
+    response.headers['Cache-Control'] = cache_policy
+    if cache_policy == NO_STORE:
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '-1'
+
+    return compress_response(response)
 
 @app.errorhandler(500)
 def internal_error(e):
@@ -356,6 +1281,8 @@ def internal_error(e):
         error="An unexpected error occurred"
     )), 500
 
+STARTUP_TIMINGS['app_import_ms'] = round((time.perf_counter() - _import_started) * 1000, 1)
+
 if __name__ == '__main__':
     print("Starting OMR Testing Server...")
     print(f"Upload folder: {UPLOAD_FOLDER}")
@@ -364,9 +1291,19 @@ if __name__ == '__main__':
     print("API endpoints:")
     print("   - POST /api/upload")
     print("   - POST /api/upload-webcam")
+    print("   - GET /api/capture-config")
     print("   - POST /api/detect-circles")
     print("   - POST /api/analyze-shaded")
     print("   - POST /api/full-scan")
+    print("   - POST /api/full-scan/stream")
+    print("   - GET /api/catalog")
+    print("   - GET /api/scan-profiles")
+    print("   - GET /api/storage")
+    print("   - GET /api/scans")
+    print("   - GET /api/scans/summary")
+    print("   - GET /api/shadow/summary")
+    print("   - GET /api/ready")
     print("   - GET /api/health")
 
+    start_warm_up()
     app.run(host='0.0.0.0', port=5003, debug=False, use_reloader=False)
\ No newline at end of file
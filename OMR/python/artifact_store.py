@@ -0,0 +1,164 @@
+"""
+OMR Artifact Store - Content-addressed storage for uploads and results
+Files are named by content hash, sharded into subdirectories, written
+atomically and cleaned up by a size- and age-based retention policy
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class ArtifactStore:
+    def __init__(self, root: str, max_bytes: Optional[int] = None,
+                 max_age_days: Optional[float] = None, shard_depth: int = 2):
+        """
+        root: base directory (e.g. uploads/ or results/)
+        max_bytes: total size budget, oldest files are removed first when over
+        max_age_days: files not written or reused for this long are removed
+        shard_depth: number of 2-hex-char subdirectory levels (256 per level)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.shard_depth = shard_depth
+        self._retention_thread = None
+        self._stop_event = threading.Event()
+        os.makedirs(self.root, exist_ok=True)
+
+    def content_name(self, data: bytes, prefix: str, extension: str) -> str:
+        """Relative sharded name for the given content, e.g. 3f/a2/full_omr_scan_3fa2....jpg"""
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return '/'.join(shards + [f"{prefix}_{digest}.{extension}"])
+
+    def path(self, name: str) -> str:
+        """Absolute path of a stored artifact"""
+        return os.path.join(self.root, *name.split('/'))
+
+    def put(self, data: bytes, prefix: str, extension: str) -> str:
+        """
+        Store content and return its relative name.
+        Same content always gets the same name, so a second put is a no-op
+        apart from refreshing the file's age for retention.
+        """
+        name = self.content_name(data, prefix, extension)
+        path = self.path(name)
+
+        if os.path.exists(path):
+            os.utime(path, None)
+            return name
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # write to temp file sa same dir tapos rename, para walang half-written files
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return name
+
+    def _list_files(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) for every stored file, including legacy flat files"""
+        files = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith('.tmp_'):
+                    continue  # in-progress write
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def usage(self) -> Dict:
+        """Current file count and size"""
+        files = self._list_files()
+        return {
+            'files': len(files),
+            'bytes': sum(size for _, size, _ in files)
+        }
+
+    def compact(self) -> Dict:
+        """Apply the retention policy: drop expired files, then oldest until under budget"""
+        files = sorted(self._list_files())
+        now = time.time()
+        removed = []
+
+        if self.max_age_days is not None:
+            cutoff = now - self.max_age_days * 24 * 60 * 60
+            expired = [f for f in files if f[0] < cutoff]
+            files = [f for f in files if f[0] >= cutoff]
+            removed.extend(expired)
+
+        total_bytes = sum(size for _, size, _ in files)
+        if self.max_bytes is not None:
+            while files and total_bytes > self.max_bytes:
+                oldest = files.pop(0)
+                total_bytes -= oldest[1]
+                removed.append(oldest)
+
+        removed_bytes = 0
+        for _, size, path in removed:
+            try:
+                os.remove(path)
+                removed_bytes += size
+            except FileNotFoundError:
+                pass
+
+        self._remove_empty_shards()
+
+        return {
+            'removed_files': len(removed),
+            'removed_bytes': removed_bytes,
+            'files': len(files),
+            'bytes': total_bytes
+        }
+
+    def _remove_empty_shards(self):
+        """Remove shard directories left empty after compaction"""
+        for directory, _, _ in os.walk(self.root, topdown=False):
+            if directory == self.root:
+                continue
+            try:
+                # fails kung may laman pa, which is what we want
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    def start_retention(self, interval_seconds: float = 3600):
+        """Run compact() periodically in a background daemon thread"""
+        if self._retention_thread is not None:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    result = self.compact()
+                    if result['removed_files']:
+                        print(f"Artifact retention ({self.root}): removed {result['removed_files']} files, "
+                              f"{result['removed_bytes']} bytes")
+                except Exception as e:
+                    print(f"Artifact retention error: {e}")
+                self._stop_event.wait(interval_seconds)
+
+        self._retention_thread = threading.Thread(target=run, name='artifact-retention', daemon=True)
+        self._retention_thread.start()
+
+    def stop_retention(self):
+        """Stop the background retention thread"""
+        self._stop_event.set()
+        self._retention_thread = None
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+OMR Autotune - Search scanner parameters over a labeled corpus
+Runs full_omr_scan on every slip in a folder for many candidate configs,
+in parallel across cores, scores them against ground truth and reports the
+Pareto front of accuracy vs per-scan latency. The chosen config is written
+as a profile that ScannerConfig.load() / OMRScanner(config=...) can use.
+
+Corpus layout: slips plus a labels.json with the expected selections, e.g.
+    {"slip1.jpg": {"form": 1, "items": ["Bulalo", "MacChs", "Viktoria's Classic"]}}
+Item names are the catalog's (catalog/menu_catalog.json), spelled the same.
+
+Usage: python autotune.py ../corpus --trials 200 --jobs 4 --output ../profiles/tuned.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import multiprocessing
+from collections import Counter
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scanner_config import ScannerConfig, CircleParams, ShadedParams, PROFILES, PREPROCESS_PIPELINES
+from menu_catalog import CatalogStore
+
+# candidate values per parameter; radius ranges are pairs para laging valid
+SEARCH_SPACE = {
+    'circle_params': {
+        'dp': [1, 1.2, 1.5, 2],
+        'minDist': [20, 30, 40, 50, 60],
+        'param1': [40, 50, 60, 80],
+        'param2': [20, 25, 30, 35, 40],
+        ('minRadius', 'maxRadius'): [(5, 30), (8, 35), (10, 40), (10, 50), (15, 45), (10, 80), (20, 120)]
+    },
+    'shaded_params': {
+        'dark_threshold': [80, 90, 100, 110, 120],
+        'fill_ratio_threshold': [0.4, 0.5, 0.6, 0.7],
+        'mean_intensity_threshold': [100, 110, 120, 130, 140],
+        'median_intensity_threshold': [80, 90, 100, 110, 120]
+    },
+    # preprocessing pipelines per image source (see PREPROCESS_PIPELINES)
+    'preprocess': list(PREPROCESS_PIPELINES)
+}
+
+# per-process state, set by init_worker()
+_scanner = None
+_corpus = None
+
+
+def load_corpus(folder: str) -> Dict[str, Dict]:
+    """labels.json of the corpus folder, keyed by image path"""
+    labels_path = os.path.join(folder, 'labels.json')
+    with open(labels_path, 'r') as f:
+        labels = json.load(f)
+
+    # label na wala sa catalog, hindi kailanman magma-match sa scan
+    known = set(CatalogStore().get().prices)
+    corpus = {}
+    for filename, label in labels.items():
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path):
+            print(f"Skipping {filename}: file not found")
+            continue
+        unknown = sorted(set(label.get('items', [])) - known)
+        if unknown:
+            print(f"Warning: {filename} labels items not in the catalog: {', '.join(unknown)}")
+        corpus[path] = {
+            'form': label.get('form'),
+            'items': Counter(label.get('items', []))
+        }
+    return corpus
+
+
+def sample_config(rng: random.Random, index: int) -> ScannerConfig:
+    """Random config from SEARCH_SPACE"""
+    params = {}
+    for group, space in SEARCH_SPACE.items():
+        if group == 'preprocess':
+            continue
+        values = {}
+        for key, choices in space.items():
+            choice = rng.choice(choices)
+            if isinstance(key, tuple):
+                values.update(zip(key, choice))
+            else:
+                values[key] = choice
+        params[group] = values
+    return ScannerConfig(
+        name=f"trial-{index}",
+        circle=CircleParams(**params['circle_params']),
+        shaded=ShadedParams(**params['shaded_params']),
+        preprocess=PREPROCESS_PIPELINES[rng.choice(SEARCH_SPACE['preprocess'])]
+    )
+
+
+def init_worker(corpus: Dict[str, Dict]):
+    """Pool initializer: decode the corpus once and build a quiet scanner"""
+    global _scanner, _corpus
+    import cv2
+    from omr_scanner import OMRScanner
+
+    # scanner prints a lot of DEBUG lines per scan
+    sys.stdout = open(os.devnull, 'w')
+
+    _scanner = OMRScanner()
+    _scanner.warm_up()
+    _corpus = {path: (cv2.imread(path), label) for path, label in corpus.items()}
+
+
+def evaluate(config: ScannerConfig) -> Dict:
+    """Scan the whole corpus with one config and score it"""
+    config = replace(config, debug_images=False)
+    latencies = []
+    preprocess_latencies = []
+    exact = 0
+    true_positives = false_positives = false_negatives = 0
+    errors = 0
+
+    for path, (image, label) in _corpus.items():
+        started = time.perf_counter()
+        result = _scanner.full_omr_scan(path, image=image, config=config)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        if 'error' in result:
+            errors += 1
+            false_negatives += sum(label['items'].values())
+            continue
+
+        preprocess_latencies.append(result['preprocessing']['preprocess_ms'])
+        found = Counter()
+        for item in result.get('items', []):
+            found[item['item']] += item['quantity']
+
+        true_positives += sum((found & label['items']).values())
+        false_positives += sum((found - label['items']).values())
+        false_negatives += sum((label['items'] - found).values())
+        if found == label['items'] and (label['form'] is None or result.get('detected_form') == label['form']):
+            exact += 1
+
+    precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+    recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    return {
+        'config': config.to_dict(),
+        'accuracy': round(exact / len(_corpus), 4),
+        'item_f1': round(f1, 4),
+        'errors': errors,
+        'median_ms': round(statistics.median(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'preprocess_median_ms': round(statistics.median(preprocess_latencies), 2) if preprocess_latencies else None
+    }
+
+
+def dominates(a: Dict, b: Dict) -> bool:
+    """a is at least as good as b on accuracy, f1 and latency, and better on one"""
+    at_least = a['accuracy'] >= b['accuracy'] and a['item_f1'] >= b['item_f1'] and a['median_ms'] <= b['median_ms']
+    better = a['accuracy'] > b['accuracy'] or a['item_f1'] > b['item_f1'] or a['median_ms'] < b['median_ms']
+    return at_least and better
+
+
+def pareto_front(trials: List[Dict]) -> List[Dict]:
+    """Non-dominated trials, fastest first"""
+    front = [t for t in trials if not any(dominates(other, t) for other in trials)]
+    return sorted(front, key=lambda t: t['median_ms'])
+
+
+def choose(front: List[Dict], max_latency_ms: Optional[float]) -> Dict:
+    """Most accurate front trial within the latency budget (fastest on ties)"""
+    candidates = [t for t in front if max_latency_ms is None or t['median_ms'] <= max_latency_ms] or front[:1]
+    return max(candidates, key=lambda t: (t['accuracy'], t['item_f1'], -t['median_ms']))
+
+
+def main():
+    default_output = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profiles', 'tuned.json')
+
+    parser = argparse.ArgumentParser(description="Tune OMR scanner parameters on a labeled corpus")
+    parser.add_argument('corpus', help="Folder with slips and labels.json")
+    parser.add_argument('--trials', type=int, default=100, help="Number of random configs to try")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="Parallel scanner processes")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the search")
+    parser.add_argument('--max-latency-ms', type=float, help="Pick the most accurate config under this median latency")
+    parser.add_argument('--output', default=default_output, help="Where to write the chosen profile")
+    parser.add_argument('--report', help="Write all trials and the Pareto front as JSON")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error("No labeled slips found")
+
+    rng = random.Random(args.seed)
+    # built-in profiles with every source pipeline are always scored para may baseline
+    baselines = [replace(config, name=f"{config.name}/{source}").for_source(source)
+                 for config in PROFILES.values() for source in PREPROCESS_PIPELINES]
+    configs = baselines + [sample_config(rng, i) for i in range(args.trials)]
+
+    print(f"Tuning on {len(corpus)} slips, {len(configs)} configs, {args.jobs} jobs")
+    started = time.perf_counter()
+    trials = []
+    with multiprocessing.Pool(args.jobs, initializer=init_worker, initargs=(corpus,)) as pool:
+        for i, trial in enumerate(pool.imap_unordered(evaluate, configs), 1):
+            trials.append(trial)
+            if i % 10 == 0 or i == len(configs):
+                print(f"  {i}/{len(configs)} configs ({time.perf_counter() - started:.0f}s)")
+
+    front = pareto_front(trials)
+    print("\nPareto front (accuracy vs median latency):")
+    print(f"  {'accuracy':>8}  {'item_f1':>7}  {'median_ms':>9}  {'preproc':>7}  config")
+    for trial in front:
+        print(f"  {trial['accuracy']:>8.2%}  {trial['item_f1']:>7.3f}  {trial['median_ms']:>9.1f}  "
+              f"{trial['preprocess_median_ms'] or 0:>7.1f}  {trial['config']['name']} "
+              f"[{trial['config']['preprocess']['name']}] {trial['config']['circle_params']} "
+              f"{trial['config']['shaded_params']}")
+
+    best = choose(front, args.max_latency_ms)
+    profile_name = os.path.splitext(os.path.basename(args.output))[0]
+    profile = replace(ScannerConfig.from_dict(best['config']), name=profile_name, debug_images=True)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    profile.save(args.output)
+    print(f"\nWrote {args.output}: accuracy {best['accuracy']:.2%}, median {best['median_ms']:.1f}ms "
+          f"(from {best['config']['name']})")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'corpus': args.corpus, 'trials': trials, 'pareto_front': front,
+                       'chosen': best['config']['name']}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+OMR Hot Folder - Scan slip images dropped into a shared folder
+Polls a directory, scans new images with OMRScanner.full_omr_scan in a
+pool of worker processes and writes results in batches: one JSON line per
+slip in a daily results file plus the scan ledger (shown in /api/scans).
+Files are de-duplicated by content hash and progress is checkpointed in
+SQLite, so a restart resumes without rescanning anything. A file that
+failed is retried once its size or mtime changes (e.g. copied again).
+
+Usage:
+    python hot_folder.py /srv/omr-dropbox --workers 4
+    python hot_folder.py /srv/omr-dropbox --once    # process what's there and exit
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import hashlib
+import sqlite3
+import argparse
+import multiprocessing
+from datetime import datetime
+from contextlib import closing
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scan_ledger import ScanLedger
+from scanner_config import PROFILES, PREPROCESS_PIPELINES, ScannerConfig, load_profiles
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp', '.tif', '.tiff'}
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+# same tuned profiles folder as app.py
+PROFILES_DIR = os.environ.get('OMR_PROFILES_DIR', os.path.join(os.path.dirname(DATA_FOLDER), 'profiles'))
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    processed_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    scan_id TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS seen_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+# per-process scanner, set by init_worker()
+_scanner = None
+_config = None
+
+
+def file_digest(path: str) -> str:
+    """sha1 of the file contents"""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def init_worker(results_folder: str, config: Dict, log_path: str):
+    """Pool initializer: one warmed-up OMRScanner per process"""
+    global _scanner, _config
+    from omr_scanner import OMRScanner
+    from artifact_store import ArtifactStore
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # scanner prints a lot of DEBUG lines per scan, errors included, kaya sa log file
+    sys.stdout = open(log_path, 'a', buffering=1)
+
+    _config = ScannerConfig.from_dict(config)
+    _scanner = OMRScanner(results_store=ArtifactStore(results_folder), config=_config)
+    _scanner.warm_up()
+
+
+def scan_file(task: Tuple[str, str]) -> Dict:
+    """Scan one slip in a worker process"""
+    path, digest = task
+    started = time.perf_counter()
+    try:
+        result = _scanner.full_omr_scan(path)
+    except Exception as e:
+        result = {'error': str(e)}
+    return {
+        'path': path,
+        'digest': digest,
+        'duration_ms': (time.perf_counter() - started) * 1000,
+        'result': json.loads(json.dumps(result, default=to_json))
+    }
+
+
+def to_json(value):
+    """JSON fallback for numpy scalars in scan results"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class HotFolder:
+    def __init__(self, folder: str, state_path: str, ledger: ScanLedger, output_folder: str,
+                 settle_seconds: float = 2.0):
+        """
+        folder: directory to watch (subdirectories included)
+        state_path: SQLite checkpoint of processed digests
+        ledger: scan ledger the results are recorded in
+        output_folder: where the daily results-YYYY-MM-DD.jsonl files go
+        settle_seconds: a file must be unchanged this long before it is scanned
+        """
+        self.folder = folder
+        self.state_path = state_path
+        self.ledger = ledger
+        self.output_folder = output_folder
+        self.settle_seconds = settle_seconds
+        self.unsettled = 0  # files still being written at the last poll
+        self._candidates = {}  # path -> (size, mtime) from the previous poll
+
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        os.makedirs(output_folder, exist_ok=True)
+        self._state = sqlite3.connect(state_path)
+        self._state.execute('PRAGMA journal_mode=WAL')
+        self._state.executescript(STATE_SCHEMA)
+
+    def close(self):
+        self._state.close()
+
+    def poll(self) -> List[Tuple[str, str]]:
+        """New, settled, not yet processed files as (path, digest) tasks"""
+        now = time.time()
+        current = {}
+        for directory, _, filenames in os.walk(self.folder):
+            for filename in filenames:
+                if filename.startswith('.') or os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                current[path] = (stat.st_size, stat.st_mtime)
+
+        tasks, digests = [], set()
+        seen_rows = []
+        self.unsettled = 0
+        for path, (size, mtime) in current.items():
+            # still being copied kung nagbago size/mtime since last poll
+            if self._candidates.get(path) != (size, mtime) and now - mtime < self.settle_seconds:
+                self.unsettled += 1
+                continue
+
+            row = self._state.execute('SELECT size, mtime, digest FROM seen_files WHERE path = ?', (path,)).fetchone()
+            if row and (row[0], row[1]) == (size, mtime):
+                digest = row[2]
+            else:
+                try:
+                    digest = file_digest(path)
+                except FileNotFoundError:
+                    continue
+                seen_rows.append((path, size, mtime, digest))
+
+            if digest in digests:
+                continue  # same content twice in this batch
+            processed = self._state.execute('SELECT status FROM processed WHERE digest = ?', (digest,)).fetchone()
+            # failed scans are retried when the file changed since (e.g. copied again after a bad copy)
+            changed = not row or (row[0], row[1]) != (size, mtime)
+            if processed and not (processed[0] == 'error' and changed):
+                continue
+            digests.add(digest)
+            tasks.append((path, digest))
+
+        with self._state:
+            self._state.executemany('INSERT OR REPLACE INTO seen_files VALUES (?, ?, ?, ?)', seen_rows)
+        self._candidates = current
+        return tasks
+
+    def commit(self, outcomes: List[Dict]):
+        """
+        Write a batch of scan outcomes: results file, ledger, then checkpoint.
+        The checkpoint is last, so a crash mid-batch rescans that batch
+        instead of losing it.
+        """
+        if not outcomes:
+            return
+
+        lines = []
+        checkpoint_rows = []
+        for outcome in outcomes:
+            result = outcome['result']
+            scan_id = None
+            status = 'error' if 'error' in result else 'ok'
+            if status == 'ok':
+                scan_id = self.ledger.record(result, source=f"hot-folder:{os.path.basename(outcome['path'])}",
+                                             duration_ms=outcome['duration_ms'])
+            lines.append(json.dumps({
+                'path': outcome['path'],
+                'digest': outcome['digest'],
+                'scan_id': scan_id,
+                'scanned_at': datetime.now().isoformat(),
+                'duration_ms': round(outcome['duration_ms'], 1),
+                'result': result
+            }))
+            checkpoint_rows.append((outcome['digest'], outcome['path'], time.time(), status,
+                                    scan_id, result.get('error')))
+
+        output_path = os.path.join(self.output_folder, f"results-{datetime.now():%Y-%m-%d}.jsonl")
+        with open(output_path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.ledger.flush()
+        with self._state:
+            self._state.executemany('INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?)', checkpoint_rows)
+
+    def stats(self) -> Dict:
+        """Processed counts per status"""
+        with closing(self._state.execute('SELECT status, COUNT(*) FROM processed GROUP BY status')) as cursor:
+            return dict(cursor.fetchall())
+
+
+def run(hot_folder: HotFolder, pool, interval: float, batch_size: int, once: bool):
+    """Poll/scan/commit loop until stopped (or the folder is drained with once)"""
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+        print("Stopping after the current batch...")
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while running:
+        tasks = hot_folder.poll()
+        if tasks:
+            print(f"{len(tasks)} new slips")
+            started = time.perf_counter()
+            batch = []
+            for outcome in pool.imap_unordered(scan_file, tasks):
+                batch.append(outcome)
+                if len(batch) >= batch_size:
+                    hot_folder.commit(batch)
+                    batch = []
+                if not running:
+                    break
+            hot_folder.commit(batch)
+            print(f"Scanned {len(tasks)} slips in {time.perf_counter() - started:.1f}s ({hot_folder.stats()})")
+        elif once and not hot_folder.unsettled:
+            break
+
+        if running:
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan slips dropped into a folder")
+    parser.add_argument('folder', help="Directory to watch")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Scanner processes")
+    parser.add_argument('--interval', type=float, default=2.0, help="Seconds between folder polls")
+    parser.add_argument('--batch-size', type=int, default=50, help="Results written per batch")
+    parser.add_argument('--profile', default='default', help="Scanner profile, built-in or tuned (see --profiles)")
+    parser.add_argument('--profiles', default=PROFILES_DIR, help="Folder with tuned profiles (autotune.py output)")
+    parser.add_argument('--source', choices=list(PREPROCESS_PIPELINES),
+                        help="Preprocessing for the image source (default: the profile's)")
+    parser.add_argument('--no-debug-images', action='store_true', help="Skip rendering debug images")
+    parser.add_argument('--state', default=os.path.join(DATA_FOLDER, 'hot_folder.db'), help="Checkpoint database")
+    parser.add_argument('--ledger', default=os.path.join(DATA_FOLDER, 'scan_ledger.db'), help="Scan ledger database")
+    parser.add_argument('--output', default=os.path.join(DATA_FOLDER, 'hot_folder'),
+                        help="Folder for results-*.jsonl and the workers' workers.log")
+    parser.add_argument('--results', default=os.path.join(os.path.dirname(DATA_FOLDER), 'results'),
+                        help="Results folder for debug images")
+    parser.add_argument('--once', action='store_true', help="Process the files present now and exit")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"Not a directory: {args.folder}")
+    load_profiles(args.profiles)
+    if args.profile not in PROFILES:
+        parser.error(f"Unknown profile: {args.profile} (available: {', '.join(PROFILES)})")
+    config = PROFILES[args.profile].for_source(args.source)
+    if args.no_debug_images:
+        config = ScannerConfig.from_dict({**config.to_dict(), 'debug_images': False})
+
+    os.makedirs(args.output, exist_ok=True)
+    log_path = os.path.join(args.output, 'workers.log')
+
+    # spawn, not fork: the ledger writer thread is running whenever the pool
+    # replaces a dead worker, and a forked child could inherit its held locks
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(args.workers, initializer=init_worker,
+                      initargs=(args.results, config.to_dict(), log_path)) as pool:
+        ledger = ScanLedger(args.ledger)
+        hot_folder = HotFolder(args.folder, args.state, ledger, args.output, settle_seconds=args.interval)
+        print(f"Watching {args.folder} with {args.workers} workers (already processed: {hot_folder.stats()}, "
+              f"worker output in {log_path})")
+        try:
+            run(hot_folder, pool, args.interval, args.batch_size, args.once)
+        finally:
+            ledger.close()
+            hot_folder.close()
+
+
+if __name__ == "__main__":
+    main()
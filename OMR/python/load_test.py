@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+OMR Load Test - Replay slip images against a running app.py
+Each transaction is one cashier scan: /api/upload (or /api/upload-webcam)
+followed by /api/full-scan. Runs one step per concurrency level and reports
+throughput, p50/p95/p99 latency, error rate and server CPU/RSS, i.e. a
+saturation curve that can be saved and compared between releases.
+
+Closed loop (default): each of N virtual cashiers sends its next scan as
+soon as the previous one finishes. Open loop (--rate): scans arrive at a
+fixed average rate and latency counts from the arrival time, so queueing
+inside the server shows up in the percentiles. A list of rates runs one
+step per rate, i.e. the saturation curve in a single run.
+
+Usage:
+    python load_test.py ../corpus --concurrency 1,2,4,8 --duration 30 --output release-1.2.json
+    python load_test.py ../corpus --rate 1,2,4,8 --concurrency 16 --compare release-1.1.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import mimetypes
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp'}
+# content types /api/upload-webcam accepts as a raw body, others are sent as PNG
+WEBCAM_MIMETYPES = {'image/png', 'image/jpeg', 'image/webp'}
+FLOWS = ('upload', 'webcam', 'mixed')
+PERCENTILES = (50, 95, 99)
+
+
+def load_corpus(folder: str, webcam: bool = False) -> List[Dict]:
+    """
+    Slip images in a folder, read into memory para disk reads don't skew timings.
+    webcam=True also prepares the body for /api/upload-webcam, re-encoded
+    as PNG if the file is a type the endpoint doesn't take (e.g. .bmp)
+    """
+    corpus = []
+    for filename in sorted(os.listdir(folder)):
+        if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        with open(os.path.join(folder, filename), 'rb') as f:
+            slip = {
+                'filename': filename,
+                'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                'data': f.read()
+            }
+        if webcam:
+            slip['webcam_mimetype'], slip['webcam_data'] = webcam_body(slip)
+        corpus.append(slip)
+    return corpus
+
+
+def webcam_body(slip: Dict):
+    """(content type, bytes) to post to /api/upload-webcam"""
+    if slip['mimetype'] in WEBCAM_MIMETYPES:
+        return slip['mimetype'], slip['data']
+    import numpy as np
+    import cv2
+
+    image = cv2.imdecode(np.frombuffer(slip['data'], dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not decode {slip['filename']}")
+    return 'image/png', cv2.imencode('.png', image)[1].tobytes()
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(p / 100 * len(ordered))))
+    return round(ordered[min(rank, len(ordered)) - 1], 1)
+
+
+class ApiClient:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, path: str, body: bytes = None, content_type: str = None) -> Dict:
+        """Send a request and return the JSON envelope, raising on HTTP or API errors"""
+        req = urllib.request.Request(self.base_url + path, data=body)
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"HTTP {e.code} from {path}")
+        if not payload.get('success'):
+            raise RuntimeError(f"{path}: {payload.get('error') or payload.get('message')}")
+        return payload.get('data', {})
+
+    def upload(self, slip: Dict) -> str:
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{slip["filename"]}"\r\n'
+            f'Content-Type: {slip["mimetype"]}\r\n\r\n'
+        ).encode() + slip['data'] + f'\r\n--{boundary}--\r\n'.encode()
+        return self.request('/api/upload', body, f'multipart/form-data; boundary={boundary}')['filepath']
+
+    def upload_webcam(self, slip: Dict) -> str:
+        # raw body, same as the browser integration
+        return self.request('/api/upload-webcam', slip['webcam_data'], slip['webcam_mimetype'])['filepath']
+
+    def full_scan(self, filepath: str) -> Dict:
+        body = json.dumps({'filepath': filepath, 'format': 'compact'}).encode()
+        return self.request('/api/full-scan', body, 'application/json')
+
+
+def layout_reuse(client: ApiClient) -> Optional[Dict]:
+    """Retake index counters from /api/health, None when layout reuse is off"""
+    return client.request('/api/health').get('scanner', {}).get('retakes')
+
+
+class ServerMonitor:
+    """Samples CPU% and RSS of the server process (and its children with psutil)"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read(self):
+        """(cpu seconds, rss bytes) or None if the process can't be read"""
+        if psutil is not None:
+            try:
+                process = psutil.Process(self.pid)
+                processes = [process] + process.children(recursive=True)
+                cpu = sum(sum(p.cpu_times()[:2]) for p in processes)
+                rss = sum(p.memory_info().rss for p in processes)
+                return cpu, rss
+            except psutil.Error:
+                return None
+        try:
+            # linux fallback, main process lang
+            with open(f'/proc/{self.pid}/stat') as f:
+                stat = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{self.pid}/statm') as f:
+                rss_pages = int(f.read().split()[1])
+            ticks = os.sysconf('SC_CLK_TCK')
+            return (int(stat[11]) + int(stat[12])) / ticks, rss_pages * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def start(self):
+        self.samples = []
+        if self.pid is None:
+            return
+        self._stop.clear()
+
+        def run():
+            previous = self._read()
+            previous_time = time.monotonic()
+            while not self._stop.wait(self.interval):
+                current = self._read()
+                now = time.monotonic()
+                if current is None or previous is None:
+                    break
+                cpu_percent = (current[0] - previous[0]) / (now - previous_time) * 100
+                self.samples.append((cpu_percent, current[1]))
+                previous, previous_time = current, now
+
+        self._thread = threading.Thread(target=run, name='server-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict:
+        if self._thread is None:
+            return {}
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if not self.samples:
+            return {}
+        cpu = [c for c, _ in self.samples]
+        return {
+            'cpu_percent_avg': round(sum(cpu) / len(cpu), 1),
+            'cpu_percent_max': round(max(cpu), 1),
+            'rss_mb_max': round(max(rss for _, rss in self.samples) / (1024 * 1024), 1)
+        }
+
+
+def run_transaction(client: ApiClient, slip: Dict, flow: str) -> Dict:
+    """One upload + full scan; per-endpoint timings in ms"""
+    timings = {}
+    started = time.perf_counter()
+    if flow == 'webcam':
+        filepath = client.upload_webcam(slip)
+        timings['upload-webcam'] = (time.perf_counter() - started) * 1000
+    else:
+        filepath = client.upload(slip)
+        timings['upload'] = (time.perf_counter() - started) * 1000
+
+    scan_started = time.perf_counter()
+    client.full_scan(filepath)
+    timings['full-scan'] = (time.perf_counter() - scan_started) * 1000
+    return timings
+
+
+def run_step(client: ApiClient, corpus: List[Dict], flow: str, concurrency: int,
+             duration: float, rate: Optional[float], rng: random.Random) -> Dict:
+    """Run one load level and return its latency/throughput stats"""
+    latencies, endpoint_latencies, errors = [], {}, {}
+    lock = threading.Lock()
+
+    def transaction(arrived_at: float):
+        slip = rng.choice(corpus)
+        slip_flow = rng.choice(('upload', 'webcam')) if flow == 'mixed' else flow
+        try:
+            timings = run_transaction(client, slip, slip_flow)
+        except Exception as e:
+            with lock:
+                key = str(e)[:120]
+                errors[key] = errors.get(key, 0) + 1
+            return
+        total = (time.perf_counter() - arrived_at) * 1000
+        with lock:
+            latencies.append(total)
+            for endpoint, ms in timings.items():
+                endpoint_latencies.setdefault(endpoint, []).append(ms)
+
+    started = time.perf_counter()
+    deadline = started + duration
+
+    if rate:
+        # open loop: poisson arrivals, queued kapag busy lahat ng threads
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_arrival = started
+            while next_arrival < deadline:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(transaction, next_arrival)
+                next_arrival += rng.expovariate(rate)
+    else:
+        def cashier():
+            while time.perf_counter() < deadline:
+                transaction(time.perf_counter())
+
+        threads = [threading.Thread(target=cashier) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - started
+    error_count = sum(errors.values())
+    attempted = len(latencies) + error_count
+
+    step = {
+        'concurrency': concurrency,
+        'rate': rate,
+        'duration_s': round(elapsed, 1),
+        'completed': len(latencies),
+        'errors': error_count,
+        'error_rate': round(error_count / attempted, 4) if attempted else 0.0,
+        'throughput_per_s': round(len(latencies) / elapsed, 2),
+        'latency_ms': {f'p{p}': percentile(latencies, p) for p in PERCENTILES},
+        'endpoints_ms': {
+            endpoint: {f'p{p}': percentile(values, p) for p in PERCENTILES}
+            for endpoint, values in endpoint_latencies.items()
+        },
+        'error_messages': errors
+    }
+    step['latency_ms']['max'] = round(max(latencies), 1) if latencies else None
+    return step
+
+
+def print_curve(steps: List[Dict], baseline: Optional[Dict] = None):
+    """Saturation curve table, with deltas against a previous report"""
+    previous = {}
+    if baseline:
+        previous = {(s['concurrency'], s['rate']): s for s in baseline.get('steps', [])}
+
+    print(f"\n{'conc':>5} {'rate':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'cpu%':>6} {'rss_mb':>7}")
+    for step in steps:
+        latency = step['latency_ms']
+        server = step.get('server', {})
+        line = (f"{step['concurrency']:>5} {step['rate'] or '-':>6} {step['throughput_per_s']:>7.2f} "
+                f"{latency['p50'] or 0:>8.1f} {latency['p95'] or 0:>8.1f} {latency['p99'] or 0:>8.1f} "
+                f"{step['error_rate'] * 100:>6.1f} {server.get('cpu_percent_avg', '-'):>6} {server.get('rss_mb_max', '-'):>7}")
+        old = previous.get((step['concurrency'], step['rate']))
+        if old and old['throughput_per_s'] and old['latency_ms']['p99']:
+            line += (f"   vs baseline: req/s {(step['throughput_per_s'] / old['throughput_per_s'] - 1) * 100:+.0f}%, "
+                     f"p99 {((latency['p99'] or 0) / old['latency_ms']['p99'] - 1) * 100:+.0f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the OMR Flask API")
+    parser.add_argument('corpus', help="Folder with slip images to replay")
+    parser.add_argument('--url', default='http://localhost:5003', help="Base URL of the running app.py")
+    parser.add_argument('--flow', choices=FLOWS, default='upload',
+                        help="upload: /api/upload + full-scan, webcam: /api/upload-webcam + full-scan, mixed: both")
+    parser.add_argument('--concurrency', default='1,2,4,8', help="Comma separated concurrency levels, one step each")
+    parser.add_argument('--rate', help="Open loop: comma separated average arrivals per second, one step each "
+                                       "(default closed loop)")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds per step")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--server-pid', type=int, help="Server pid for CPU/RSS (default: from /api/health)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for slip selection")
+    parser.add_argument('--output', help="Write the report as JSON")
+    parser.add_argument('--compare', help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, webcam=args.flow != 'upload')
+    if not corpus:
+        parser.error("No slip images found")
+    levels = [int(level) for level in args.concurrency.split(',')]
+    rates = [float(rate) for rate in args.rate.split(',')] if args.rate else [None]
+
+    client = ApiClient(args.url, args.timeout)
+    try:
+        health = client.request('/api/health')
+    except Exception as e:
+        sys.exit(f"Server not reachable at {args.url}: {e}")
+    pid = args.server_pid or health.get('pid')
+    if pid and not os.path.exists(f'/proc/{pid}') and psutil is None:
+        print("Server CPU/RSS not available (install psutil or run on Linux)")
+        pid = None
+
+    # isang scan muna para warmed up na ang server
+    run_transaction(client, corpus[0], 'webcam' if args.flow == 'webcam' else 'upload')
+
+    # layout reuse (OMR_RETAKE_WINDOW_SECONDS) turns replayed slips into cache hits
+    reuse_before = layout_reuse(client)
+    if reuse_before is not None:
+        print("Warning: retake layout reuse is on, replayed slips may skip detection; "
+              "restart the server with OMR_RETAKE_WINDOW_SECONDS=0 to measure the scanner")
+
+    rng = random.Random(args.seed)
+    monitor = ServerMonitor(pid)
+    steps = []
+    for concurrency in levels:
+        for rate in rates:
+            print(f"Step: concurrency {concurrency}" + (f", rate {rate:g}/s" if rate else '') +
+                  f", {args.duration:.0f}s")
+            monitor.start()
+            step = run_step(client, corpus, args.flow, concurrency, args.duration, rate, rng)
+            step['server'] = monitor.stop()
+            steps.append(step)
+
+    report = {
+        'url': args.url,
+        'flow': args.flow,
+        'corpus_size': len(corpus),
+        'server_version': health.get('version'),
+        'scanner_mode': health.get('scanner', {}).get('mode'),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'steps': steps
+    }
+    if reuse_before is not None:
+        reuse_after = layout_reuse(client) or reuse_before
+        report['layout_reuse'] = {key: reuse_after.get(key, 0) - reuse_before.get(key, 0)
+                                  for key in ('lookups', 'layout_reused', 'retakes')}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    print_curve(steps, baseline)
+    if 'layout_reuse' in report:
+        reuse = report['layout_reuse']
+        print(f"\nLayout reuse: {reuse['layout_reused']} of {reuse['lookups']} scans, {reuse['retakes']} reported retakes")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+OMR Memory Budget - Admission control for scan working memory
+Image dimensions are read from the file header (no decode), the scan's
+working set is estimated from them, and scans reserve that much of a
+global budget before decoding. Scans that would not fit wait in FIFO
+order; images too big for a single scan's share are decoded downscaled.
+"""
+
+import struct
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# bytes per decoded pixel ng isang scan: BGR frame (3), gray/filtered/thresh
+# scratch (3), Hough edges + gradients + accumulator (~9), bubble integral
+# images + dark mask (13)
+SCAN_BYTES_PER_PIXEL = 28
+# debug canvas (BGR copy) + encoded debug image
+DEBUG_BYTES_PER_PIXEL = 4
+# decode factors supported by cv2.IMREAD_REDUCED_*
+REDUCE_FACTORS = (1, 2, 4, 8)
+
+HEADER_READ_BYTES = 256 * 1024  # JPEG EXIF/APP segments can push SOF far in
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class MemoryBudgetTimeout(Exception):
+    """A scan waited too long for memory budget"""
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a PNG/JPEG/WebP/GIF/BMP header, None if unknown"""
+    try:
+        if data[:8] == b'\x89PNG\r\n\x1a\n':
+            return struct.unpack('>II', data[16:24])
+        if data[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', data[6:10])
+        if data[:2] == b'BM':
+            width, height = struct.unpack('<ii', data[18:26])
+            return width, abs(height)
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            chunk = data[12:16]
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', data[26:30])
+                return width & 0x3fff, height & 0x3fff
+            if chunk == b'VP8L':
+                bits = struct.unpack('<I', data[21:25])[0]
+                return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+            if chunk == b'VP8X':
+                return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+            return None
+        if data[:2] == b'\xff\xd8':
+            i = 2
+            while i + 9 <= len(data):
+                if data[i] != 0xFF:
+                    return None
+                marker = data[i + 1]
+                if marker == 0xFF:
+                    i += 1  # fill byte
+                    continue
+                if marker in JPEG_SOF_MARKERS:
+                    height, width = struct.unpack('>HH', data[i + 5:i + 9])
+                    return width, height
+                i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    except struct.error:
+        pass
+    return None
+
+
+def read_image_size(filepath: str) -> Optional[Tuple[int, int]]:
+    """(width, height) of an image file without decoding it"""
+    try:
+        with open(filepath, 'rb') as f:
+            return image_size(f.read(HEADER_READ_BYTES))
+    except OSError:
+        return None
+
+
+def estimate_scan_bytes(width: int, height: int, debug_images: bool = True) -> int:
+    """Estimated peak working set of scanning a width x height frame"""
+    per_pixel = SCAN_BYTES_PER_PIXEL + (DEBUG_BYTES_PER_PIXEL if debug_images else 0)
+    return width * height * per_pixel
+
+
+def estimate_decode_bytes(data: bytes, width: int, height: int, reduce: int = 1) -> int:
+    """
+    Estimated peak of cv2.imdecode at a REDUCED_* factor: JPEG decodes
+    straight to the reduced size, other formats decode full size then shrink
+    """
+    if reduce > 1 and data[:2] == b'\xff\xd8':
+        width, height = -(-width // reduce), -(-height // reduce)
+    return width * height * 3
+
+
+def choose_reduce_factor(width: int, height: int, max_bytes: int, debug_images: bool = True) -> int:
+    """Smallest decode reduction that brings the scan under max_bytes"""
+    for factor in REDUCE_FACTORS:
+        if estimate_scan_bytes(width // factor, height // factor, debug_images) <= max_bytes:
+            return factor
+    return REDUCE_FACTORS[-1]
+
+
+class MemoryBudget:
+    def __init__(self, limit_bytes: int):
+        """
+        limit_bytes: total estimated working set allowed across concurrent scans
+        """
+        self.limit_bytes = limit_bytes
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._in_use = 0
+        self._peak = 0
+        self._active = 0
+        self._stats = {'admitted': 0, 'queued': 0, 'timed_out': 0, 'downscaled': 0}
+
+    @contextmanager
+    def reserve(self, nbytes: int, timeout: Optional[float] = None):
+        """
+        Hold nbytes of the budget for the duration of the block, waiting
+        (first come, first served) until it fits. Raises MemoryBudgetTimeout.
+        A reservation bigger than the whole budget runs alone.
+        """
+        nbytes = min(nbytes, self.limit_bytes)
+        ticket = object()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            self._queue.append(ticket)
+            if not self._fits(ticket, nbytes):
+                self._stats['queued'] += 1
+            while not self._fits(ticket, nbytes):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._queue.remove(ticket)
+                    self._stats['timed_out'] += 1
+                    self._condition.notify_all()
+                    raise MemoryBudgetTimeout(f"Waited {timeout}s for {nbytes} bytes of scan memory")
+                self._condition.wait(remaining)
+
+            self._queue.popleft()
+            self._in_use += nbytes
+            self._active += 1
+            self._peak = max(self._peak, self._in_use)
+            self._stats['admitted'] += 1
+            # baka kasya rin yung kasunod
+            self._condition.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_use -= nbytes
+                self._active -= 1
+                self._condition.notify_all()
+
+    def _fits(self, ticket, nbytes: int) -> bool:
+        return self._queue[0] is ticket and (self._active == 0 or self._in_use + nbytes <= self.limit_bytes)
+
+    def record_downscale(self):
+        """Count a scan that was decoded at reduced size to fit"""
+        with self._condition:
+            self._stats['downscaled'] += 1
+
+    def usage(self) -> Dict:
+        """Current and peak reserved bytes plus admission counters"""
+        with self._condition:
+            return {
+                'limit_bytes': self.limit_bytes,
+                'in_use_bytes': self._in_use,
+                'peak_bytes': self._peak,
+                'active_scans': self._active,
+                'waiting_scans': len(self._queue),
+                **self._stats
+            }
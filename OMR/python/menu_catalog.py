@@ -0,0 +1,169 @@
+"""
+OMR Menu Catalog - External, versioned menu items and prices
+The catalog JSON (OMR/catalog/menu_catalog.json) is compiled once per
+version into per-form arrays indexed by bubble position, with prices looked
+up by normalized name so "Viktoria’s" and "Viktoria's" are the same item.
+CatalogStore re-reads the file when it changes and swaps the compiled
+catalog in one assignment, so scans in progress keep the version they
+started with and no worker needs a restart.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+# same file for flask, scan workers and hot folder processes
+DEFAULT_CATALOG_PATH = os.environ.get('OMR_CATALOG_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalog', 'menu_catalog.json'))
+
+# curly quotes/backticks na nagiging straight apostrophe
+APOSTROPHES = str.maketrans({'’': "'", '‘': "'", 'ʼ': "'", '`': "'", '´': "'"})
+
+
+class CatalogError(ValueError):
+    """Catalog file is malformed or inconsistent"""
+
+
+def normalize_key(name: str) -> str:
+    """Lookup key for an item name: unicode-normalized, straight apostrophes, case and spacing folded"""
+    name = unicodedata.normalize('NFKC', name).translate(APOSTROPHES)
+    return ' '.join(name.casefold().split())
+
+
+class MenuCatalog:
+    """Compiled, read-only catalog"""
+
+    def __init__(self, data: Dict):
+        if not isinstance(data, dict):
+            raise CatalogError("Catalog must be an object")
+        forms = data.get('forms')
+        prices = data.get('prices')
+        if not isinstance(forms, dict) or not forms:
+            raise CatalogError("Catalog needs a 'forms' object of item lists")
+        if not isinstance(prices, dict):
+            raise CatalogError("Catalog needs a 'prices' object")
+
+        self.default_price = float(data.get('default_price', 100.00))
+
+        # price per normalized name; two spellings of one item must agree
+        self._prices = {}
+        for name, price in prices.items():
+            key = normalize_key(name)
+            if isinstance(price, bool) or not isinstance(price, (int, float)) or price < 0:
+                raise CatalogError(f"Invalid price for {name!r}: {price!r}")
+            if key in self._prices and self._prices[key] != float(price):
+                raise CatalogError(f"Conflicting prices for {name!r}")
+            self._prices[key] = float(price)
+
+        # per-form arrays: bubble index -> item id / price
+        self.forms: Dict[int, Tuple[str, ...]] = {}
+        self.form_prices: Dict[int, Tuple[float, ...]] = {}
+        for form, items in sorted(forms.items()):
+            try:
+                form = int(form)
+            except ValueError:
+                raise CatalogError(f"Form ids must be numbers, got {form!r}")
+            if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                raise CatalogError(f"Form {form} must be a list of item names")
+            missing = [item for item in items if normalize_key(item) not in self._prices]
+            if missing:
+                raise CatalogError(f"Form {form} items without a price: {', '.join(missing)}")
+            self.forms[form] = tuple(items)
+            self.form_prices[form] = tuple(self._prices[normalize_key(item)] for item in items)
+
+        # unidentified form: labels + every form's items, same as before
+        self.all_items = tuple(f"Form {form}" for form in self.forms) + \
+            tuple(item for items in self.forms.values() for item in items)
+
+        compiled = json.dumps([{str(k): v for k, v in self.forms.items()}, sorted(self._prices.items()),
+                               self.default_price], ensure_ascii=False)
+        self.label = str(data.get('version', 'unversioned'))
+        self.version = f"{self.label}.{hashlib.sha1(compiled.encode('utf-8')).hexdigest()[:8]}"
+        self.prices = {item: self._prices[normalize_key(item)] for items in self.forms.values() for item in items}
+
+    def items_for_form(self, form: int) -> Tuple[str, ...]:
+        """Item per bubble index for a detected form (all items if unknown)"""
+        return self.forms.get(form, self.all_items)
+
+    def price(self, item: str) -> float:
+        """Price by normalized name, default_price if unknown"""
+        return self._prices.get(normalize_key(item), self.default_price)
+
+    def item_at(self, form: int, index: int) -> Optional[Tuple[str, float]]:
+        """(item, price) of a form's bubble index, None if out of range"""
+        items = self.forms.get(form)
+        if items is None:
+            items = self.all_items
+            if 0 <= index < len(items):
+                return items[index], self.price(items[index])
+            return None
+        if 0 <= index < len(items):
+            return items[index], self.form_prices[form][index]
+        return None
+
+    def to_dict(self) -> Dict:
+        """Public view for /api/catalog"""
+        return {
+            'catalog_version': self.version,
+            'label': self.label,
+            'forms': {'0': list(self.all_items), **{str(form): list(items) for form, items in self.forms.items()}},
+            'prices': self.prices
+        }
+
+
+class CatalogStore:
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, check_interval: float = 1.0):
+        """
+        path: catalog JSON file
+        check_interval: min seconds between file change checks
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._signature = self._stat_signature()
+        self._catalog = self._load()
+
+    def _stat_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load(self) -> MenuCatalog:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return MenuCatalog(json.load(f))
+
+    def get(self) -> MenuCatalog:
+        """Current catalog, reloading first if the file changed"""
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._next_check = now + self.check_interval
+                if self._stat_signature() != self._signature:
+                    self.reload()
+            except OSError as e:
+                print(f"Catalog check failed, keeping {self._catalog.version}: {e}")
+            finally:
+                self._lock.release()
+        return self._catalog
+
+    def reload(self) -> MenuCatalog:
+        """
+        Load and compile the file; the new catalog replaces the old one only
+        if it is valid, otherwise the old one stays live
+        """
+        try:
+            # signature muna, para di paulit-ulit ang error hanggang may bagong change
+            self._signature = self._stat_signature()
+            catalog = self._load()
+        except (OSError, ValueError) as e:
+            # ValueError covers bad JSON and CatalogError (e.g. half-written file)
+            print(f"Catalog reload failed, keeping {self._catalog.version}: {e}")
+            return self._catalog
+        if catalog.version != self._catalog.version:
+            print(f"Catalog reloaded: {self._catalog.version} -> {catalog.version}")
+        self._catalog = catalog
+        return catalog
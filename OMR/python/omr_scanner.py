@@ -9,155 +9,204 @@ import numpy as np
 import os
 import json
 import base64
+import hashlib
+import math
+import time
+import threading
+import functools
+import tracemalloc
+import weakref
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
+
+from artifact_store import ArtifactStore
+from scanner_config import ScannerConfig, PreprocessPipeline, PREPROCESS_PIPELINES
+from menu_catalog import CatalogStore, MenuCatalog
+from retake_index import Fingerprint, RetakeIndex
+
+# cv2.imread flags per decode reduction factor
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+class ScanScratch:
+    """
+    Scratch buffers reused across scans, one set per concurrently running scan.
+    Buffers grow to the largest frame seen and smaller frames use a
+    contiguous view of them, so steady-state scans allocate no full frames.
+    """
 
-class OMRScanner:
     def __init__(self):
-        """Initialize OMR Scanner with default parameters"""
-        # form 1 menu
-        self.form1_items = [
-            'WhtRc', 'Bangsi', 'TnaPng', 'PnkBagn', 'Bulalo',  
-            'MacChs', 'OvrBngs', 'Carbo', 'OrgChk', 'PltWhtRc',  
-            'RB-Bina', 'Viktoria\'s Classic', 'SngTun', 'Alfrdo',
-            
-            'Tapsi', 'SzTofu', 'Porksi', 'PrkSsg', 'SprRc', 'Lechsi',  
-            'Fst3', 'Parmesan Wings', 'Crispy Diniguan w/ Rice', 'ChkSsg', 'PrkRc',  
-            'VktChk', 'BcnEggChs', 'BgrRc', 'PltGrlcRc', 'BfKald',
-            
-            'ChickBul', 'Chk&Moj', 'RB-KK', 'Fst2', 'SisiSi',  
-            'Cal&Frs', 'GrnSld', 'OrgChkR', 'ChkFil', 'Chksi', 'TstBrd'
-        ]
-        
-        # form 2
-        self.form2_items = [
-           
-            'SngBab', 'Fst1', 'RB-BulDng', 'ClbHse', 'Liemsi', 'RB-Tofu',
-            'AmpCar', 'Bagn', 'Htdog', 'Mojos', 'TndRc', 'RB-Kald',
-            'Chopsy', 'FshFil',
-           
-            'Hotsi', 'Longsi', 'BtrShrp', 'CrisKK', 'HnyWngs', 'Tocsi',
-            'Spag', 'CrsPata', 'TbnRc', 'Egg', 'CdnBlu', 'Nachos',
-            'SngHip', 'GrlcRc', 'Fst4', 'Viktoria\'s Cheesy Bacon',
-           
-            'Fish&Moj', 'FrFrs', 'ChkTapa', 'BufWngs', 
-            'Viktoria\'s Double Cheesy Bacon', 'HamEggChs', 'BfBroc', 'CrisDng',
-            'Pitcher of Iced Tea', 'Pitcher of Lemonade', 'Wintermelon Milktea', 'Cucumber Lemonade', 'Spanish Latte'
-        ]
-        
-        # combined na
-        self.menu_items = ['Form 1', 'Form 2'] + self.form1_items + self.form2_items
-        
-        # parameters ng circles
-        self.circle_params = {
-            'dp': 1,
-            'minDist': 30,
-            'param1': 50,
-            'param2': 30,
-            'minRadius': 10,
-            'maxRadius': 80
-        }
-        
-        # analysis ng shaded circles
-        self.shaded_params = {
-            'dark_threshold': 100,
-            'fill_ratio_threshold': 0.6,
-            'mean_intensity_threshold': 120,
-            'median_intensity_threshold': 100
-        }
+        self.gray = np.empty(0, dtype=np.uint8)
+        self.filtered = np.empty(0, dtype=np.uint8)
+        self.thresh = np.empty(0, dtype=np.uint8)
+        self.canvas = np.empty(0, dtype=np.uint8)
+        self.mask = np.empty(0, dtype=np.uint8)
+        self.dark = np.empty(0, dtype=np.uint8)
+        self.integral = np.empty(0, dtype=np.float64)
+        self.dark_integral = np.empty(0, dtype=np.int32)
+        self.gray_source = None
+
+    @staticmethod
+    def view(buffer: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+        """Contiguous view of buffer with the given shape (buffer must be big enough)"""
+        return buffer[:int(np.prod(shape))].reshape(shape)
+
+    def ensure(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """View of the named buffer, growing it if the frame is bigger than any before"""
+        buffer = getattr(self, name)
+        size = int(np.prod(shape))
+        if buffer.size < size or buffer.dtype != dtype:
+            buffer = np.empty(size, dtype=dtype)
+            setattr(self, name, buffer)
+            if name == 'gray':
+                self.gray_source = None
+        return self.view(buffer, shape)
+
+# tracemalloc is process-wide, shared by every tracked scan (see tracked_allocations)
+_tracing_lock = threading.Lock()
+_tracing = {'active': 0, 'starts': 0, 'owned': False}
+
+@contextmanager
+def tracked_allocations():
+    """
+    Trace allocations for one scan and yield a dict whose 'peak_bytes' is
+    set on exit. tracemalloc has one peak for the whole process, so the peak
+    is only attributable to a scan that ran alone; a scan that overlapped
+    another tracked scan gets None. Tracing is started by the first tracked
+    scan and stopped by the last one, and the peak is never reset while
+    another tracked scan is running.
+    """
+    allocations = {'peak_bytes': None}
+    with _tracing_lock:
+        if _tracing['active'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['owned'] = True
+        _tracing['active'] += 1
+        _tracing['starts'] += 1
+        starts = _tracing['starts']
+        alone = _tracing['active'] == 1
+        if alone:
+            tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        yield allocations
+    finally:
+        with _tracing_lock:
+            _, peak = tracemalloc.get_traced_memory()
+            # may nag-start na ibang scan habang tumatakbo ito
+            if alone and _tracing['starts'] == starts:
+                allocations['peak_bytes'] = max(0, peak - baseline)
+            _tracing['active'] -= 1
+            if _tracing['active'] == 0 and _tracing['owned']:
+                tracemalloc.stop()
+                _tracing['owned'] = False
+
+@functools.lru_cache(maxsize=None)
+def disk_mask(radius: int) -> Tuple[np.ndarray, int, int]:
+    """
+    Filled disk of the given radius as analyze_circle_fill draws it, its
+    pixel count, and the half size of the largest centred square inside it
+    """
+    mask = np.zeros((2 * radius + 1, 2 * radius + 1), dtype=np.uint8)
+    cv2.circle(mask, (radius, radius), radius, 255, -1)
+    disk = mask == 255
+    disk.setflags(write=False)
+    half = int(radius * 0.7071)
+    while half > 0 and not disk[radius - half:radius + half + 1, radius - half:radius + half + 1].all():
+        half -= 1
+    return disk, int(disk.sum()), half
+
+def uses_scratch(method):
+    """Run a scanner method with a scratch buffer set bound to the calling thread"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.scratch_session():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class OMRScanner:
+    def __init__(self, results_store: Optional[ArtifactStore] = None, track_allocations: bool = False,
+                 config: Optional[ScannerConfig] = None, catalog_store: Optional[CatalogStore] = None,
+                 retake_index: Optional[RetakeIndex] = None):
+        """
+        Initialize OMR Scanner with default parameters.
+        The scanner holds no per-scan state, so one instance can serve many
+        threads; pass config= to a scan method to override parameters per call.
+        """
+        # reusable buffers: idle sets sa pool, checked out per scan (see ScanScratch)
+        # pool instead of pure thread-local kasi werkzeug gumagawa ng bagong thread per request
+        self._thread_local = threading.local()
+        self._scratch_pool = []
+        self._scratch_lock = threading.Lock()
+
+        # report peak bytes allocated per full scan (uses tracemalloc, slower)
+        self.track_allocations = track_allocations
+
+        # dito sine-save debug images at results
+        if results_store is None:
+            results_store = ArtifactStore(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'results'))
+        self.results_store = results_store
+
+        # menu items and prices, external and hot-reloaded (see menu_catalog.py)
+        self.catalog_store = catalog_store or CatalogStore()
         
-        # price mapping para sa menu
-        self.price_map = {
-            'WhtRc': 30.00,
-            'Bangsi': 145.00,
-            'TnaPng': 320.00,
-            'PnkBagn': 510.00,
-            'Bulalo': 510.00,
-            'MacChs': 180.00,
-            'OvrBngs': 420.00,
-            'Carbo': 190.00,
-            'OrgChk': 460.00,
-            'PltWhtRc': 110.00,
-            'RB-Bina': 190.00,
-            'Viktoria’s Classic': 220.00,
-            'SngTun': 490.00,
-            'Alfrdo': 230.00,
-            'Tapsi': 150.00,
-            'SzTofu': 190.00,
-            'Porksi': 155.00,
-            'PrkSsg': 230.00,
-            'SprRc': 290.00,
-            'Lechsi': 160.00,
-            'Fst3': 1889.00,
-            'Parmesan Wings': 240.00,
-            'Crispy Diniguan w/ Rice': 170.00,
-            'ChkSsg': 230.00,
-            'PrkRc': 250.00,
-            'VktChk': 490.00,
-            'BcnEggChs': 150.00,
-            'BgrRc': 180.00,
-            'PltGrlcRc': 120.00,
-            'BfKald': 505.00,
-            'ChickBul': 160.00,
-            'Chk&Moj': 270.00,
-            'RB-KK': 230.00,
-            'Fst2': 1669.00,
-            'SisiSi': 140.00,
-            'Cal&Frs': 300.00,
-            'GrnSld': 230.00,
-            'OrgChkR': 170.00,
-            'ChkFil': 140.00,
-            'Chksi': 150.00,
-            'TstBrd': 30.00,
-            'SngBab': 495.00,
-            'Fst1': 1449.00,
-            'RB-BulDng': 160.00,
-            'ClbHse': 180.00,
-            'Liemsi': 160.00,
-            'RB-Tofu': 160.00,
-            'AmpCar': 460.00,
-            'Bagn': 360.00,
-            'Htdog': 80.00,
-            'Mojos': 120.00,
-            'TndRc': 290.00,
-            'RB-Kald': 250.00,
-            'Chopsy': 420.00,
-            'FshFil': 170.00,
-            'Hotsi': 90.00,
-            'Longsi': 170.00,
-            'BtrShrp': 505.00,
-            'CrisKK': 505.00,
-            'HnyWngs': 220.00,
-            'Tocsi': 140.00,
-            'Spag': 210.00,
-            'CrsPata': 800.00,
-            'TbnRc': 290.00,
-            'Egg': 60.00,
-            'CdnBlu': 170.00,
-            'Nachos': 205.00,
-            'SngHip': 490.00,
-            'GrlcRc': 35.00,
-            'Fst4': 1779.00,
-            'Viktoria’s Cheesy Bacon': 280.00,
-            'Fish&Moj': 260.00,
-            'FrFrs': 80.00,
-            'ChkTapa': 140.00,
-            'BufWngs': 220.00,
-            'Viktoria’s Double Cheesy Bacon': 350.00,
-            'HamEggChs': 150.00,
-            'BfBroc': 505.00,
-            'CrisDng': 495.00,
-            'Pitcher of Iced Tea': 170.00,
-            'Pitcher of Lemonade': 170.00,
-            'Wintermelon Milktea': 89.00,
-            'Cucumber Lemonade': 170.00,
-            'Spanish Latte': 140.00
-        }
-
-    def load_image(self, filepath: str) -> Optional[np.ndarray]:
-        """Load image from filepath"""
+        # parameters ng circles at shaded analysis (immutable, see scanner_config.py)
+        self.config = config or ScannerConfig()
+
+        # recent frames for spotting retakes in full_omr_scan (None = off)
+        self.retake_index = retake_index
+
+    @property
+    def catalog(self) -> MenuCatalog:
+        """Current compiled catalog; take it once per scan so a reload can't change it mid-scan"""
+        return self.catalog_store.get()
+
+    @property
+    def form1_items(self) -> List[str]:
+        return list(self.catalog.items_for_form(1))
+
+    @property
+    def form2_items(self) -> List[str]:
+        return list(self.catalog.items_for_form(2))
+
+    @property
+    def menu_items(self) -> List[str]:
+        """Form labels plus all items, used when the form is not identified"""
+        return list(self.catalog.all_items)
+
+    @property
+    def price_map(self) -> Dict[str, float]:
+        return dict(self.catalog.prices)
+
+    @property
+    def catalog_version(self) -> str:
+        """Version ng menu/prices, para ma-reference ng clients instead of full list"""
+        return self.catalog.version
+
+    @property
+    def circle_params(self) -> Dict:
+        """Default HoughCircles parameters (read-only copy)"""
+        return self.config.circle.as_dict()
+
+    @property
+    def shaded_params(self) -> Dict:
+        """Default shaded analysis thresholds (read-only copy)"""
+        return self.config.shaded.as_dict()
+
+    def get_catalog(self) -> Dict:
+        """Form item lists and prices for the current catalog version"""
+        return self.catalog.to_dict()
+
+    def load_image(self, filepath: str, reduce: int = 1) -> Optional[np.ndarray]:
+        """Load image from filepath, reduce=2/4/8 decodes at 1/reduce size"""
         try:
-            image = cv2.imread(filepath)
+            image = cv2.imread(filepath, REDUCED_DECODE_FLAGS[reduce])
             if image is None:
                 raise ValueError(f"Could not load image: {filepath}")
             return image
@@ -165,45 +214,172 @@ class OMRScanner:
             print(f"Error loading image: {e}")
             return None
 
-    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+    @contextmanager
+    def scratch_session(self):
+        """Check out a scratch buffer set for the current scan, nested calls share it"""
+        local = self._thread_local
+        scratch = getattr(local, 'scratch', None)
+        if scratch is not None:
+            yield scratch
+            return
+
+        with self._scratch_lock:
+            scratch = self._scratch_pool.pop() if self._scratch_pool else ScanScratch()
+        local.scratch = scratch
+        try:
+            yield scratch
+        finally:
+            local.scratch = None
+            scratch.gray_source = None
+            with self._scratch_lock:
+                self._scratch_pool.append(scratch)
+
+    def get_scratch(self) -> ScanScratch:
+        """Scratch buffers of the current scan (a throwaway set outside a scan)"""
+        scratch = getattr(self._thread_local, 'scratch', None)
+        if scratch is None:
+            scratch = ScanScratch()
+        return scratch
+
+    def to_gray(self, image: np.ndarray) -> np.ndarray:
+        """
+        Grayscale of the image into the scratch buffer.
+        Converted once per image, later stages of the same scan reuse it.
+        """
+        scratch = self.get_scratch()
+        gray = scratch.ensure('gray', image.shape[:2])
+        source = scratch.gray_source() if scratch.gray_source is not None else None
+        if source is not image:
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+            scratch.gray_source = weakref.ref(image)
+        return gray
+
+    def debug_canvas(self, image: np.ndarray) -> np.ndarray:
+        """Copy of the image in the reusable scratch canvas for drawing debug output"""
+        canvas = self.get_scratch().ensure('canvas', image.shape)
+        np.copyto(canvas, image)
+        return canvas
+
+    def preprocess_image(self, image: np.ndarray, config: Optional[ScannerConfig] = None) -> np.ndarray:
         """Preprocess image for better circle detection"""
+        processed, _, _ = self.run_preprocess(image, (config or self.config).preprocess)
+        return processed
+
+    def run_preprocess(self, image: np.ndarray,
+                       pipeline: PreprocessPipeline) -> Tuple[np.ndarray, float, List[Dict]]:
+        """
+        Run the preprocessing stages on the grayscale image.
+        Returns (processed, scale, stage timings); scale is < 1 if a
+        downscale stage shrank the frame.
+        """
+        scratch = self.get_scratch()
+
         # filter tas convert sa grayscale
+        current = self.to_gray(image)
+        scale = 1.0
+        timings = []
+        # stages alternate between two scratch buffers, gray stays untouched for fill analysis
+        buffers = ['filtered', 'thresh']
+
+        for stage in pipeline.stages:
+            started = time.perf_counter()
+            params = stage.kwargs
+            shape = current.shape
+
+            if stage.op == 'downscale':
+                factor = params['max_side'] / max(shape)
+                if factor >= 1:
+                    timings.append({'op': stage.op, 'ms': round((time.perf_counter() - started) * 1000, 3)})
+                    continue
+                shape = (max(1, int(round(shape[0] * factor))), max(1, int(round(shape[1] * factor))))
+                scale *= shape[0] / current.shape[0]
+
+            dst = scratch.ensure(buffers[0], shape)
+            buffers.reverse()
+            if stage.op == 'downscale':
+                cv2.resize(current, (shape[1], shape[0]), dst=dst, interpolation=cv2.INTER_AREA)
+            elif stage.op == 'gaussian_blur':
+                cv2.GaussianBlur(current, (params['ksize'], params['ksize']), 0, dst=dst)
+            elif stage.op == 'median_blur':
+                cv2.medianBlur(current, params['ksize'], dst=dst)
+            elif stage.op == 'bilateral':
+                # reduce ng noise, edge-preserving pero mabagal
+                cv2.bilateralFilter(current, params['d'], params['sigma_color'], params['sigma_space'], dst=dst)
+            elif stage.op == 'clahe':
+                clahe = cv2.createCLAHE(clipLimit=params['clip_limit'],
+                                        tileGridSize=(params['tile_size'], params['tile_size']))
+                clahe.apply(current, dst=dst)
+            elif stage.op == 'adaptive_threshold':
+                # treshold ng marks
+                cv2.adaptiveThreshold(
+                    current, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                    cv2.THRESH_BINARY, params['block_size'], params['C'], dst=dst
+                )
+            elif stage.op == 'otsu_threshold':
+                cv2.threshold(current, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)
+
+            current = dst
+            timings.append({'op': stage.op, 'ms': round((time.perf_counter() - started) * 1000, 3)})
+
+        return current, scale, timings
+
+    @uses_scratch
+    def warm_up(self) -> float:
+        """
+        Run the detection pipeline once on a synthetic slip so OpenCV's lazy
+        initialisation happens before the first real scan. Returns elapsed ms.
+        """
+        started = time.perf_counter()
+
+        image = np.full((600, 450, 3), 255, dtype=np.uint8)
+        for row in range(4):
+            for col in range(3):
+                cv2.circle(image, (75 + col * 150, 75 + row * 150), 20, (0, 0, 0), 2)
+        cv2.circle(image, (75, 75), 18, (0, 0, 0), -1)
+
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # reduce ng noise
-        filtered = cv2.bilateralFilter(gray, 9, 75, 75)
-        
-        # treshold ng marks
-        thresh = cv2.adaptiveThreshold(
-            filtered, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
-        
-        return thresh
+        # lahat ng source pipelines, para walang lazy init sa unang webcam/phone scan
+        for pipeline in PREPROCESS_PIPELINES.values():
+            self.run_preprocess(image, pipeline)
+        processed = self.preprocess_image(image)
+        circles = cv2.HoughCircles(processed, cv2.HOUGH_GRADIENT, **self.config.circle.as_dict())
+        if circles is not None:
+            for x, y, r in np.round(circles[0, :]).astype("int"):
+                self.analyze_circle_fill(gray, {'center': (int(x), int(y)), 'radius': int(r)})
+        cv2.putText(image, "warm-up", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+        cv2.imencode('.jpg', image)
 
-    def detect_circles(self, filepath: str) -> Dict:
-        """Detect circles in the image"""
+        return (time.perf_counter() - started) * 1000
+
+    @uses_scratch
+    def detect_circles(self, filepath: str, image: Optional[np.ndarray] = None,
+                       config: Optional[ScannerConfig] = None) -> Dict:
+        """Detect circles in the image (pass image if already decoded)"""
+        config = config or self.config
         try:
             print(f"Detecting circles in: {os.path.basename(filepath)}")
             
             # reprocess image
-            image = self.load_image(filepath)
+            if image is None:
+                image = self.load_image(filepath)
             if image is None:
                 return {"error": "Could not load image"}
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            processed = self.preprocess_image(image)
+            processed, scale, stage_timings = self.run_preprocess(image, config.preprocess)
             
-            # hough circles detection
+            # hough circles detection, params follow the downscale stage kung meron
+            started = time.perf_counter()
             circles = cv2.HoughCircles(
                 processed,
                 cv2.HOUGH_GRADIENT,
-                **self.circle_params
+                **config.scaled(scale).circle.as_dict()
             )
+            hough_ms = (time.perf_counter() - started) * 1000
             
             circle_data = []
             if circles is not None:
-                circles = np.round(circles[0, :]).astype("int")
+                # balik sa full-size coordinates
+                circles = np.round(circles[0, :] / scale).astype("int")
                 
                 # nag gogroup into columns based sa x position
                 sorted_by_x = sorted(circles, key=lambda c: c[0])
@@ -236,41 +412,61 @@ class OMRScanner:
                         'area': int(np.pi * r * r)
                     })
             
-            # debug image
-            debug_image = image.copy()
-            for circle in circle_data:
-                x, y, r = circle['center'][0], circle['center'][1], circle['radius']
-                cv2.circle(debug_image, (x, y), r, (0, 255, 0), 2)
-                cv2.putText(debug_image, str(circle['id']), (x-10, y+5), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            debug_filename = None
+            if config.debug_images:
+                # debug image
+                debug_image = self.debug_canvas(image)
+                for circle in circle_data:
+                    x, y, r = circle['center'][0], circle['center'][1], circle['radius']
+                    cv2.circle(debug_image, (x, y), r, (0, 255, 0), 2)
+                    cv2.putText(debug_image, str(circle['id']), (x-10, y+5), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
             
-            # save debug image
-            debug_filename = f"circle_debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            debug_path = os.path.join(os.path.dirname(os.path.dirname(filepath)), 'results', debug_filename)
-            cv2.imwrite(debug_path, debug_image)
+                # save debug image
+                debug_filename = self.save_debug_image(debug_image, 'circle_debug')
             
             return {
                 'circles_found': len(circle_data),
                 'circles': circle_data,
                 'debug_image': debug_filename,
                 'processing_time': datetime.now().isoformat(),
-                'parameters': self.circle_params
+                'parameters': config.circle.as_dict(),
+                'preprocessing': {
+                    'pipeline': config.preprocess.name,
+                    'scale': round(scale, 4),
+                    'stages': stage_timings,
+                    'preprocess_ms': round(sum(stage['ms'] for stage in stage_timings), 3),
+                    'hough_ms': round(hough_ms, 3)
+                }
             }
             
         except Exception as e:
             print(f"Circle detection error: {e}")
             return {"error": str(e)}
 
-    def analyze_circle_fill(self, gray_image: np.ndarray, circle: Dict) -> Tuple[bool, float]:
+    def analyze_circle_fill(self, gray_image: np.ndarray, circle: Dict,
+                            config: Optional[ScannerConfig] = None) -> Tuple[bool, float]:
         """Analyze if a circle is filled/shaded"""
+        shaded_params = (config or self.config).shaded
         x, y, r = circle['center'][0], circle['center'][1], circle['radius']
         
         # para ma avoid border effects
-        mask = np.zeros(gray_image.shape[:2], dtype=np.uint8)
-        cv2.circle(mask, (x, y), max(1, r-5), 255, -1)
+        inner_radius = max(1, r-5)
+        
+        # mask lang ng bounding box ng circle, hindi buong frame
+        height, width = gray_image.shape[:2]
+        x0, y0 = max(0, x - inner_radius), max(0, y - inner_radius)
+        x1, y1 = min(width, x + inner_radius + 1), min(height, y + inner_radius + 1)
+        if x0 >= x1 or y0 >= y1:
+            return False, 0.0
+        
+        roi = gray_image[y0:y1, x0:x1]
+        mask = self.get_scratch().ensure('mask', roi.shape)
+        mask.fill(0)
+        cv2.circle(mask, (x - x0, y - y0), inner_radius, 255, -1)
         
         # extract pixels within the circle
-        circle_pixels = gray_image[mask == 255]
+        circle_pixels = roi[mask == 255]
         
         if len(circle_pixels) == 0:
             return False, 0.0
@@ -280,20 +476,109 @@ class OMRScanner:
         median_intensity = np.median(circle_pixels)
         
         # count dark pixels
-        dark_pixels = np.sum(circle_pixels < self.shaded_params['dark_threshold'])
+        dark_pixels = np.sum(circle_pixels < shaded_params.dark_threshold)
         total_pixels = len(circle_pixels)
         fill_percentage = (dark_pixels / total_pixels) * 100
         
         # determine if circle is shaded
         is_shaded = bool(
-            fill_percentage > (self.shaded_params['fill_ratio_threshold'] * 100) and
-            mean_intensity < self.shaded_params['mean_intensity_threshold'] and
-            median_intensity < self.shaded_params['median_intensity_threshold']
+            fill_percentage > (shaded_params.fill_ratio_threshold * 100) and
+            mean_intensity < shaded_params.mean_intensity_threshold and
+            median_intensity < shaded_params.median_intensity_threshold
         )
         
         return is_shaded, fill_percentage
 
-    def detect_form_identifier(self, gray_image: np.ndarray, circles: List[Dict]) -> Tuple[int, str]:
+    def classify_bubbles(self, gray_image: np.ndarray, circles: List[Dict],
+                         config: Optional[ScannerConfig] = None) -> List[Tuple[bool, float, int]]:
+        """
+        Two-tier shaded check for all bubbles of a scan.
+        Tier 1 builds integral images of the gray frame and of its dark pixels
+        (< dark_threshold) once, over the area the bubbles cover. The square
+        inscribed in a bubble's disk and the square around it bound the disk's
+        dark ratio and mean from below and above with four lookups each; a
+        bubble is decided there only if the whole bound clears the thresholds
+        by the tier1 margins, the rest go to tier 2, analyze_circle_fill.
+        fill_percentage is always counted on the same disk as tier 2.
+
+        Returns: (is_shaded, fill_percentage, tier) per circle
+        """
+        shaded_params = (config or self.config).shaded
+        if not circles:
+            return []
+        scratch = self.get_scratch()
+        height, width = gray_image.shape[:2]
+
+        xs = np.array([c['center'][0] for c in circles])
+        ys = np.array([c['center'][1] for c in circles])
+        radii = np.array([max(1, c['radius'] - 5) for c in circles])
+        disks = [disk_mask(int(radius)) for radius in radii]
+        disk_area = np.array([area for _, area, _ in disks])
+        half_in = np.array([half for _, _, half in disks])
+
+        # disk na nasa gilid ng frame ay naka-clip sa tier 2, doon na lang
+        inside = (xs - radii >= 0) & (ys - radii >= 0) & (xs + radii < width) & (ys + radii < height)
+        xo0, yo0 = np.clip(xs - radii, 0, width), np.clip(ys - radii, 0, height)
+        xo1, yo1 = np.clip(xs + radii + 1, 0, width), np.clip(ys + radii + 1, 0, height)
+        xi0, yi0 = np.clip(xs - half_in, xo0, xo1), np.clip(ys - half_in, yo0, yo1)
+        xi1, yi1 = np.clip(xs + half_in + 1, xi0, xo1), np.clip(ys + half_in + 1, yi0, yo1)
+
+        # integral images lang ng area na sakop ng bubbles
+        left, top = xo0.min(), yo0.min()
+        right, bottom = max(xo1.max(), left + 1), max(yo1.max(), top + 1)
+        area_gray = gray_image[top:bottom, left:right]
+        dark = scratch.ensure('dark', area_gray.shape)
+        cv2.threshold(area_gray, math.ceil(shaded_params.dark_threshold) - 1, 1, cv2.THRESH_BINARY_INV, dst=dark)
+        sum_shape = (area_gray.shape[0] + 1, area_gray.shape[1] + 1)
+        gray_sum = scratch.ensure('integral', sum_shape, np.float64)
+        dark_sum = scratch.ensure('dark_integral', sum_shape, np.int32)
+        cv2.integral(area_gray, gray_sum, sdepth=cv2.CV_64F)
+        cv2.integral(dark, dark_sum, sdepth=cv2.CV_32S)
+
+        xi0, xi1, xo0, xo1 = xi0 - left, xi1 - left, xo0 - left, xo1 - left
+        yi0, yi1, yo0, yo1 = yi0 - top, yi1 - top, yo0 - top, yo1 - top
+
+        def box_sums(table, bx0, by0, bx1, by1):
+            return table[by1, bx1] - table[by0, bx1] - table[by1, bx0] + table[by0, bx0]
+
+        # inner square is inside the disk, outer square contains it
+        inner_area = (2 * half_in + 1) ** 2
+        outer_area = (2 * radii + 1) ** 2
+        dark_in, dark_out = box_sums(dark_sum, xi0, yi0, xi1, yi1), box_sums(dark_sum, xo0, yo0, xo1, yo1)
+        gray_in, gray_out = box_sums(gray_sum, xi0, yi0, xi1, yi1), box_sums(gray_sum, xo0, yo0, xo1, yo1)
+        ring, corners = disk_area - inner_area, outer_area - disk_area
+        fill_low = np.maximum(dark_in, dark_out - corners) / disk_area
+        fill_high = np.minimum(dark_in + ring, dark_out) / disk_area
+        mean_low = np.maximum(gray_in, gray_out - 255.0 * corners) / disk_area
+        mean_high = np.minimum(gray_in + 255.0 * ring, gray_out) / disk_area
+
+        fill_margin = shaded_params.tier1_fill_margin
+        intensity_margin = shaded_params.tier1_intensity_margin
+        # more than half dark puts the median below dark_threshold
+        clearly_filled = (
+            (fill_low > max(shaded_params.fill_ratio_threshold, 0.5) + fill_margin) &
+            (mean_high < shaded_params.mean_intensity_threshold - intensity_margin) &
+            (shaded_params.dark_threshold <= shaded_params.median_intensity_threshold)
+        )
+        clearly_empty = (
+            (fill_high <= shaded_params.fill_ratio_threshold - fill_margin) |
+            (mean_low >= shaded_params.mean_intensity_threshold + intensity_margin)
+        )
+        decided = (clearly_filled | clearly_empty) & inside
+
+        results = []
+        for i, circle in enumerate(circles):
+            if decided[i]:
+                window = dark[yo0[i]:yo1[i], xo0[i]:xo1[i]]
+                fill_percentage = np.count_nonzero(window[disks[i][0]]) / disk_area[i] * 100
+                results.append((bool(clearly_filled[i]), float(fill_percentage), 1))
+            else:
+                is_shaded, fill_percentage = self.analyze_circle_fill(gray_image, circle, config)
+                results.append((is_shaded, fill_percentage, 2))
+        return results
+
+    def detect_form_identifier(self, gray_image: np.ndarray, circles: List[Dict],
+                               config: Optional[ScannerConfig] = None) -> Tuple[int, str]:
         """
         Detect which form is being used by checking the first 2 circles (form identifier circles)
         The form should have circles marked as:
@@ -327,8 +612,8 @@ class OMRScanner:
         form2_circle = sorted_circles[1]
         
         # fill percentages for both circles
-        _, form1_fill = self.analyze_circle_fill(gray_image, form1_circle)
-        _, form2_fill = self.analyze_circle_fill(gray_image, form2_circle)
+        _, form1_fill = self.analyze_circle_fill(gray_image, form1_circle, config)
+        _, form2_fill = self.analyze_circle_fill(gray_image, form2_circle, config)
         
         print(f"Form Identifier Detection:")
         print(f"  Circle 1 (Form 1): Fill={form1_fill:.1f}%")
@@ -349,38 +634,45 @@ class OMRScanner:
             print(f"  → No clear form identifier (difference only {fill_diff:.1f}%)")
             return 0, "Warning: No clear form identifier - Using full list"
 
-    def analyze_shaded_circles(self, filepath: str, circles_data: Optional[List[Dict]] = None) -> Dict:
-        """Analyze shaded/filled circles in the image"""
+    @uses_scratch
+    def analyze_shaded_circles(self, filepath: str, circles_data: Optional[List[Dict]] = None,
+                               image: Optional[np.ndarray] = None,
+                               config: Optional[ScannerConfig] = None) -> Dict:
+        """Analyze shaded/filled circles in the image (pass image if already decoded)"""
+        config = config or self.config
         try:
             print(f"Analyzing shaded circles in: {os.path.basename(filepath)}")
             
-            image = self.load_image(filepath)
+            if image is None:
+                image = self.load_image(filepath)
             if image is None:
                 return {"error": "Could not load image"}
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = self.to_gray(image)
             
             if circles_data is None:
-                circles_result = self.detect_circles(filepath)
+                circles_result = self.detect_circles(filepath, image=image, config=config)
                 if 'error' in circles_result:
                     return circles_result
                 circles = circles_result['circles']
             else:
                 circles = circles_data
             
-            # Analyze each circle for shading
+            # Analyze each circle for shading, cheap tier muna (see classify_bubble)
             shaded_circles = []
             empty_circles = []
+            tier_counts = {'tier1': 0, 'tier2': 0}
             
-            for circle in circles:
-                is_shaded, fill_percent = self.analyze_circle_fill(gray, circle)
+            for circle, (is_shaded, fill_percent, tier) in zip(circles, self.classify_bubbles(gray, circles, config)):
+                tier_counts[f'tier{tier}'] += 1
                 
                 circle_info = {
                     'id': circle['id'],
                     'center': circle['center'],
                     'radius': circle['radius'],
                     'fill_percentage': round(fill_percent, 1),
-                    'is_shaded': bool(is_shaded)
+                    'is_shaded': bool(is_shaded),
+                    'tier': tier
                 }
                 
                 if is_shaded:
@@ -388,25 +680,25 @@ class OMRScanner:
                 else:
                     empty_circles.append(circle_info)
             
-            # Create debug image
-            debug_image = image.copy()
-            for circle in circles:
-                x, y, r = circle['center'][0], circle['center'][1], circle['radius']
-                is_shaded = any(c['id'] == circle['id'] for c in shaded_circles)
+            debug_filename = None
+            if config.debug_images:
+                # Create debug image
+                debug_image = self.debug_canvas(image)
+                for circle in circles:
+                    x, y, r = circle['center'][0], circle['center'][1], circle['radius']
+                    is_shaded = any(c['id'] == circle['id'] for c in shaded_circles)
                 
-                color = (0, 255, 0) if is_shaded else (0, 0, 255)
-                cv2.circle(debug_image, (x, y), r, color, 2)
+                    color = (0, 255, 0) if is_shaded else (0, 0, 255)
+                    cv2.circle(debug_image, (x, y), r, color, 2)
                 
-                status = "SHADED" if is_shaded else "EMPTY"
-                cv2.putText(debug_image, status, (x-20, y-r-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
-                cv2.putText(debug_image, str(circle['id']), (x-10, y+5), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1) # Add circle ID
+                    status = "SHADED" if is_shaded else "EMPTY"
+                    cv2.putText(debug_image, status, (x-20, y-r-10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+                    cv2.putText(debug_image, str(circle['id']), (x-10, y+5), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1) # Add circle ID
             
-            # Save debug image
-            debug_filename = f"shaded_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            debug_path = os.path.join(os.path.dirname(os.path.dirname(filepath)), 'results', debug_filename)
-            cv2.imwrite(debug_path, debug_image)
+                # Save debug image
+                debug_filename = self.save_debug_image(debug_image, 'shaded_analysis')
             
             return {
                 'total_circles': len(circles),
@@ -414,56 +706,106 @@ class OMRScanner:
                 'empty_circles': len(empty_circles),
                 'shaded_circle_data': shaded_circles,
                 'empty_circle_data': empty_circles,
+                'tier_counts': tier_counts,
                 'debug_image': debug_filename,
                 'processing_time': datetime.now().isoformat(),
-                'parameters': self.shaded_params
+                'parameters': config.shaded.as_dict()
             }
             
         except Exception as e:
             print(f"Shaded analysis error: {e}")
             return {"error": str(e)}
 
-    def full_omr_scan(self, filepath: str) -> Dict:
-        """Perform complete OMR scan with menu item recognition"""
+    @uses_scratch
+    def full_omr_scan(self, filepath: str, image: Optional[np.ndarray] = None,
+                      config: Optional[ScannerConfig] = None,
+                      on_stage: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        """
+        Perform complete OMR scan with menu item recognition (pass image if already decoded).
+        on_stage(stage, partial_result) is called as soon as the form ('form') and
+        the selected items and total ('items') are known, before the debug image.
+        """
+        config = config or self.config
+        if not self.track_allocations:
+            return self._full_omr_scan(filepath, image, config, on_stage)
+
+        # peak bytes allocated during the scan (numpy/OpenCV arrays included)
+        with tracked_allocations() as allocations:
+            result = self._full_omr_scan(filepath, image, config, on_stage)
+        if 'error' not in result:
+            result['peak_allocated_bytes'] = allocations['peak_bytes']
+        return result
+
+    def _full_omr_scan(self, filepath: str, image: Optional[np.ndarray], config: ScannerConfig,
+                       on_stage: Optional[Callable[[str, Dict], None]] = None) -> Dict:
         try:
             print(f"Performing full OMR scan on: {os.path.basename(filepath)}")
             
             # Load image
-            image = self.load_image(filepath)
+            if image is None:
+                image = self.load_image(filepath)
             if image is None:
                 return {"error": "Could not load image"}
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Detect circles
-            circles_result = self.detect_circles(filepath)
-            if 'error' in circles_result:
-                return circles_result
-            
-            circles = circles_result['circles']
+            # wall time per stage, para makita kung alin ang mabagal
+            stage_ms = {}
+            stage_started = [time.perf_counter()]
+            
+            def end_stage(stage):
+                now = time.perf_counter()
+                stage_ms[stage] = round((now - stage_started[0]) * 1000, 3)
+                stage_started[0] = now
+            
+            gray = self.to_gray(image)
+            # same catalog version for the whole scan kahit may reload
+            catalog = self.catalog
+            
+            # retake ng kaka-scan lang na slip: reuse bubble layout, fills lang ang i-check ulit
+            retake = None
+            if self.retake_index is not None:
+                fingerprint = Fingerprint(gray)
+                layout_key = json.dumps([config.circle.as_dict(), config.preprocess.to_dict()], sort_keys=True)
+                retake = self.retake_index.match(fingerprint, layout_key)
+            
+            if retake is not None:
+                circles, retake = retake
+                preprocessing = None
+                print(f"Same form as a recent scan ({retake['distance']} bits, offset {retake['offset']}), reusing bubble layout")
+            else:
+                # Detect circles
+                circles_result = self.detect_circles(filepath, image=image, config=config)
+                if 'error' in circles_result:
+                    return circles_result
+                
+                circles = circles_result['circles']
+                preprocessing = circles_result['preprocessing']
+            end_stage('detect')
             
             # Detect which form is being used (Form 1 or Form 2)
-            detected_form, form_label = self.detect_form_identifier(gray, circles)
+            detected_form, form_label = self.detect_form_identifier(gray, circles, config)
             print(f"Detected Form: {form_label}")
-            
-            # Select appropriate menu items list and skip form identifier circles
-            if detected_form == 1:
-                active_menu_items = self.form1_items
+            end_stage('form_id')
+            if on_stage is not None:
+                on_stage('form', {
+                    'detected_form': detected_form,
+                    'form_label': form_label,
+                    'total_circles': len(circles)
+                })
+            
+            # Select the detected form's item array and skip form identifier circles
+            active_menu_items = list(catalog.items_for_form(detected_form))
+            if detected_form in [1, 2]:
                 menu_circles = circles[2:]  # skip first 2 circles (form identifiers)
-                print("Using Form 1 menu items (41 items)")
-            elif detected_form == 2:
-                active_menu_items = self.form2_items
-                menu_circles = circles[2:]  # skip first 2 circles (form identifiers)
-                print("Using Form 2 menu items (38 items)")
+                print(f"Using Form {detected_form} menu items ({len(active_menu_items)} items)")
             else:
-                active_menu_items = self.menu_items
                 menu_circles = circles  # use all circles if form not identified
                 print("Using full menu items list")
             
             # Analyze shaded circles, passing the detected circles
-            shaded_result = self.analyze_shaded_circles(filepath, circles_data=circles)
+            shaded_result = self.analyze_shaded_circles(filepath, circles_data=circles, image=image, config=config)
             if 'error' in shaded_result:
                 return shaded_result
+            end_stage('fill')
             
   
             selected_items = [] 
@@ -508,18 +850,22 @@ class OMRScanner:
                     print(f"DEBUG: Adding shaded item: {item_name}")
                     # Safe confidence calculation
                     try:
-                        fill_percentage = next(c['fill_percentage'] for c in shaded_result['shaded_circle_data'] if c['id'] == circle['id'])
+                        shaded_circle = next(c for c in shaded_result['shaded_circle_data'] if c['id'] == circle['id'])
+                        fill_percentage = shaded_circle['fill_percentage']
+                        tier = shaded_circle['tier']
                         confidence = min(100, max(70, 100 - fill_percentage + 70))
                     except StopIteration:
                         fill_percentage = 50.0
+                        tier = None
                         confidence = 75.0
                     
                     item_data = {
                         'item': item_name,
                         'quantity': 1,
-                        'price': self.price_map.get(item_name, 100.00),
+                        'price': catalog.item_at(detected_form, menu_index)[1],
                         'fill_percentage': fill_percentage,
-                        'confidence': confidence
+                        'confidence': confidence,
+                        'tier': tier
                     }
                     selected_items.append(item_data)
                     print(f"DEBUG: Added item: {item_data}")
@@ -527,6 +873,14 @@ class OMRScanner:
                 status = "Shaded" if is_shaded else "Not Shaded"
                 selected_items_display.append(f"ID {circle['id']}: {item_name} ({status})")
 
+            if self.retake_index is not None:
+                marks = {c['id']: (True, c['fill_percentage']) for c in shaded_result['shaded_circle_data']}
+                marks.update((c['id'], (False, c['fill_percentage'])) for c in shaded_result['empty_circle_data'])
+                self.retake_index.add(fingerprint, layout_key, circles, marks)
+                # same template lang ang alam ng hash; retake lang kung pareho rin ang marks
+                if retake is not None and not self.retake_index.confirm(retake.pop('previous_marks'), marks):
+                    retake = None
+            
             # Calculate totals with error handling
             try:
                 total_price = sum(item['price'] for item in selected_items) if selected_items else 0.0
@@ -540,49 +894,63 @@ class OMRScanner:
             print(f"DEBUG: total_price = {total_price}")
             print(f"DEBUG: selected_items_display count = {len(selected_items_display)}")
             
-            # Create comprehensive debug image
-            debug_image = image.copy()
-            # Create a set of shaded circle IDs for quick lookup
-            shaded_circle_ids = {c['id'] for c in shaded_result['shaded_circle_data']}
+            confidence_score = round(np.mean([item['confidence'] for item in selected_items]) if selected_items else 0, 1)
+            end_stage('mapping')
+            if on_stage is not None:
+                # order entry needs only these, the debug image comes after
+                on_stage('items', {
+                    'detected_form': detected_form,
+                    'catalog_version': catalog.version,
+                    'items': selected_items,
+                    'total_price': round(total_price, 2),
+                    'confidence_score': confidence_score,
+                    'retake': retake
+                })
+            
+            debug_filename = None
+            if config.debug_images:
+                # Create comprehensive debug image
+                debug_image = self.debug_canvas(image)
+                # Create a set of shaded circle IDs for quick lookup
+                shaded_circle_ids = {c['id'] for c in shaded_result['shaded_circle_data']}
 
-            for i, circle in enumerate(circles):
-                x, y, r = circle['center'][0], circle['center'][1], circle['radius']
-                current_circle_id = circle['id']
-                is_shaded = current_circle_id in shaded_circle_ids
+                for i, circle in enumerate(circles):
+                    x, y, r = circle['center'][0], circle['center'][1], circle['radius']
+                    current_circle_id = circle['id']
+                    is_shaded = current_circle_id in shaded_circle_ids
                 
-                color = (0, 255, 0) if is_shaded else (0, 0, 255) # Green for shaded, Red for empty
-                cv2.circle(debug_image, (x, y), r, color, 3)
+                    color = (0, 255, 0) if is_shaded else (0, 0, 255) # Green for shaded, Red for empty
+                    cv2.circle(debug_image, (x, y), r, color, 3)
                 
-                # Get the correct item name based on form detection
-                if detected_form in [1, 2] and i < 2:
-                    # Form identifier circles
-                    item_name = "FORM_ID_1" if i == 0 else "FORM_ID_2"
-                else:
-                    # Menu item circles - use active_menu_items based on detected form
-                    menu_index = i - start_index
-                    item_name = active_menu_items[menu_index] if menu_index >= 0 and menu_index < len(active_menu_items) else "N/A"
+                    # Get the correct item name based on form detection
+                    if detected_form in [1, 2] and i < 2:
+                        # Form identifier circles
+                        item_name = "FORM_ID_1" if i == 0 else "FORM_ID_2"
+                    else:
+                        # Menu item circles - use active_menu_items based on detected form
+                        menu_index = i - start_index
+                        item_name = active_menu_items[menu_index] if menu_index >= 0 and menu_index < len(active_menu_items) else "N/A"
                 
-                if is_shaded:
-                    cv2.putText(debug_image, f" {item_name}", (x-30, y-r-15), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                else:
-                    cv2.putText(debug_image, f" {item_name}", (x-30, y-r-15), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                cv2.putText(debug_image, str(current_circle_id), (x-10, y+5), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1) # Add circle ID
-            
-            # Add summary text including form information
-            cv2.putText(debug_image, form_label, 
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
-            cv2.putText(debug_image, f"Total Items: {len(selected_items)}", 
-                       (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
-            cv2.putText(debug_image, f"Total Price: ${total_price:.2f}", 
-                       (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
-            
-            # Save debug image
-            debug_filename = f"full_omr_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            debug_path = os.path.join(os.path.dirname(os.path.dirname(filepath)), 'results', debug_filename)
-            cv2.imwrite(debug_path, debug_image)
+                    if is_shaded:
+                        cv2.putText(debug_image, f" {item_name}", (x-30, y-r-15), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                    else:
+                        cv2.putText(debug_image, f" {item_name}", (x-30, y-r-15), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                    cv2.putText(debug_image, str(current_circle_id), (x-10, y+5), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1) # Add circle ID
+            
+                # Add summary text including form information
+                cv2.putText(debug_image, form_label, 
+                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
+                cv2.putText(debug_image, f"Total Items: {len(selected_items)}", 
+                           (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+                cv2.putText(debug_image, f"Total Price: ${total_price:.2f}", 
+                           (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+            
+                # Save debug image
+                debug_filename = self.save_debug_image(debug_image, 'full_omr_scan')
+            end_stage('debug_image')
             
             return {
                 'scan_type': 'FULL_OMR_SCAN',
@@ -594,9 +962,16 @@ class OMRScanner:
                 'selected_item_data': selected_items_display,
                 'total_price': round(total_price, 2),
                 'menu_items_available': active_menu_items,
+                'items': selected_items,
+                'catalog_version': catalog.version,
+                'scanner_profile': config.name,
+                'tier_counts': shaded_result['tier_counts'],
+                'preprocessing': preprocessing,
+                'retake': retake,
+                'stage_ms': stage_ms,
                 'debug_image': debug_filename,
                 'processing_time': datetime.now().isoformat(),
-                'confidence_score': round(np.mean([item['confidence'] for item in selected_items]) if selected_items else 0, 1),
+                'confidence_score': confidence_score,
                 'selected_items_display': selected_items_display
             }
             
@@ -604,6 +979,14 @@ class OMRScanner:
             print(f"Full OMR scan error: {e}")
             return {"error": str(e)}
 
+    def save_debug_image(self, image: np.ndarray, prefix: str) -> str:
+        """
+        Save debug image into the results store under a content-hashed name.
+        The name changes whenever the content does, so it can be cached forever.
+        """
+        _, buffer = cv2.imencode('.jpg', image)
+        return self.results_store.put(buffer.tobytes(), prefix, 'jpg')
+
     def get_debug_image_base64(self, image: np.ndarray) -> str:
         """Convert debug image to base64 string"""
         try:
@@ -617,10 +1000,10 @@ class OMRScanner:
     def save_results(self, results: Dict, filename: str) -> str:
         """Save results to JSON file"""
         try:
-            results_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'results', filename)
-            with open(results_path, 'w') as f:
-                json.dump(results, f, indent=2, default=str)
-            return results_path
+            prefix = os.path.splitext(filename)[0]
+            data = json.dumps(results, indent=2, default=str).encode('utf-8')
+            name = self.results_store.put(data, prefix, 'json')
+            return self.results_store.path(name)
         except Exception as e:
             print(f"Error saving results: {e}")
             return ""
@@ -0,0 +1,147 @@
+"""
+OMR Retake Index - Recognize retakes of the same slip
+Cashiers often photograph the same slip two or three times within seconds.
+Every scanned frame gets a perceptual fingerprint (dHash of a small page
+thumbnail); a frame within a few bits of a recent one, with the same size
+and layout parameters, shows the same form template. The scanner then
+reuses the earlier bubble layout, shifted by the offset measured with phase
+correlation, and only re-checks the fills. The hash cannot see the marks,
+so a frame only counts as a retake of the same slip if the re-checked
+fills also match the earlier ones (confirm()).
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 16  # 16x16 difference bits
+THUMBNAIL_SIDE = 256  # long side of the thumbnail used for hashing and alignment
+
+
+class Fingerprint:
+    """dHash bits plus the thumbnail they came from (for alignment)"""
+
+    def __init__(self, gray: np.ndarray):
+        self.shape = gray.shape[:2]
+        # thumbnail pixels per frame pixel, para sa conversion ng offset
+        self.thumb_scale = THUMBNAIL_SIDE / max(self.shape)
+        thumb = cv2.resize(gray, None, fx=self.thumb_scale, fy=self.thumb_scale, interpolation=cv2.INTER_AREA)
+        self.thumb = thumb.astype(np.float32)
+
+        small = cv2.resize(thumb, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+        self.bits = np.packbits(small[:, 1:] > small[:, :-1])
+
+    def distance(self, other: 'Fingerprint') -> int:
+        """Hamming distance between the two hashes"""
+        return int(np.unpackbits(self.bits ^ other.bits).sum())
+
+
+class RetakeIndex:
+    def __init__(self, window_seconds: float = 20.0, max_distance: int = 24,
+                 min_response: float = 0.3, max_entries: int = 32, max_fill_difference: float = 15.0):
+        """
+        window_seconds: how long a scanned frame can be matched by a retake
+        max_distance: max differing hash bits (of 256) for a near-duplicate
+        min_response: min phase correlation peak; lower means rotated/zoomed, not just shifted
+        max_entries: recent frames kept
+        max_fill_difference: max fill percentage points any bubble may differ by in a retake
+        """
+        self.window_seconds = window_seconds
+        self.max_distance = max_distance
+        self.min_response = min_response
+        self.max_fill_difference = max_fill_difference
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'layout_reused': 0, 'misaligned': 0, 'retakes': 0}
+
+    def add(self, fingerprint: Fingerprint, layout_key: str, circles: List[Dict], marks: Dict[int, Tuple[bool, float]]):
+        """Remember a scanned frame's bubble layout and marks (circle id -> (is_shaded, fill_percentage))"""
+        # bubbles are on a grid: a shift of about one pitch would line up with the
+        # neighbouring bubbles, so only offsets under half the pitch are trusted
+        centers = np.array([circle['center'] for circle in circles], dtype=np.float64).reshape(-1, 2)
+        if len(centers) > 1:
+            gaps = np.hypot(*(centers[:, None, :] - centers[None, :, :]).transpose(2, 0, 1))
+            np.fill_diagonal(gaps, np.inf)
+            max_offset = gaps.min() / 2
+        else:
+            max_offset = 0.0
+        entry = {
+            'fingerprint': fingerprint,
+            'layout_key': layout_key,
+            'circles': circles,
+            'marks': marks,
+            'max_offset': max_offset,
+            'scanned_at': time.monotonic()
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+    def match(self, fingerprint: Fingerprint, layout_key: str) -> Optional[Tuple[List[Dict], Dict]]:
+        """
+        Layout of a recent near-duplicate frame, shifted onto this one, as
+        (circles, match info); None if there is none. A match only means the
+        same form template, pass the new marks to confirm() for a retake.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._stats['lookups'] += 1
+            while self._entries and now - self._entries[0]['scanned_at'] > self.window_seconds:
+                self._entries.popleft()
+            candidates = [(fingerprint.distance(entry['fingerprint']), entry) for entry in self._entries
+                          if entry['layout_key'] == layout_key and entry['fingerprint'].shape == fingerprint.shape]
+        if not candidates:
+            return None
+        distance, entry = min(candidates, key=lambda candidate: candidate[0])
+        if distance > self.max_distance:
+            return None
+
+        # gaano nausog yung slip mula sa previous frame; no window, it weights the
+        # center so much that a moved mark outvotes the rest of the page
+        (dx, dy), response = cv2.phaseCorrelate(entry['fingerprint'].thumb, fingerprint.thumb)
+        dx, dy = int(round(dx / fingerprint.thumb_scale)), int(round(dy / fingerprint.thumb_scale))
+
+        height, width = fingerprint.shape
+        circles = []
+        for circle in entry['circles']:
+            x, y, r = circle['center'][0] + dx, circle['center'][1] + dy, circle['radius']
+            circles.append({**circle, 'center': (x, y), 'bbox': (x - r, y - r, 2 * r, 2 * r)})
+        inside = all(r <= x < width - r and r <= y < height - r
+                     for (x, y), r in ((circle['center'], circle['radius']) for circle in circles))
+        if response < self.min_response or not inside or np.hypot(dx, dy) > entry['max_offset']:
+            with self._lock:
+                self._stats['misaligned'] += 1
+            return None
+
+        with self._lock:
+            self._stats['layout_reused'] += 1
+        return circles, {
+            'distance': distance,
+            'offset': (dx, dy),
+            'alignment_response': round(float(response), 3),
+            'age_ms': round((now - entry['scanned_at']) * 1000, 1),
+            'previous_marks': entry['marks']
+        }
+
+    def confirm(self, previous_marks: Dict[int, Tuple[bool, float]], marks: Dict[int, Tuple[bool, float]]) -> bool:
+        """
+        Is a frame that reused an earlier layout a retake of the same slip:
+        same shaded bubbles and every fill within max_fill_difference
+        """
+        same = previous_marks.keys() == marks.keys() and all(
+            previous_marks[circle_id][0] == shaded and
+            abs(previous_marks[circle_id][1] - fill) <= self.max_fill_difference
+            for circle_id, (shaded, fill) in marks.items()
+        )
+        if same:
+            with self._lock:
+                self._stats['retakes'] += 1
+        return same
+
+    def stats(self) -> Dict:
+        """Lookup/layout reuse/retake counters and frames currently remembered"""
+        with self._lock:
+            return {'entries': len(self._entries), **self._stats}
@@ -0,0 +1,262 @@
+"""
+OMR Scan Ledger - Append-only SQLite log of full scans
+Scans are queued by the request thread and inserted in batches by a
+background writer, so recording a scan never waits on disk
+"""
+
+import os
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id TEXT PRIMARY KEY,
+    scanned_at REAL NOT NULL,
+    source TEXT,
+    detected_form INTEGER,
+    catalog_version TEXT,
+    total_circles INTEGER,
+    item_count INTEGER,
+    total_price REAL,
+    confidence REAL,
+    duration_ms REAL,
+    debug_image TEXT,
+    detect_ms REAL,
+    form_id_ms REAL,
+    fill_ms REAL,
+    mapping_ms REAL,
+    debug_image_ms REAL
+);
+CREATE TABLE IF NOT EXISTS scan_items (
+    scan_id TEXT NOT NULL REFERENCES scans(scan_id),
+    scanned_at REAL NOT NULL,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price REAL,
+    fill_percentage REAL,
+    confidence REAL,
+    tier INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_scans_time ON scans(scanned_at);
+CREATE INDEX IF NOT EXISTS idx_scan_items_time ON scan_items(scanned_at);
+CREATE INDEX IF NOT EXISTS idx_scan_items_item ON scan_items(item, scanned_at);
+CREATE INDEX IF NOT EXISTS idx_scan_items_scan ON scan_items(scan_id);
+"""
+
+# full_omr_scan stage_ms keys, one REAL column each ("<stage>_ms") para queryable
+STAGES = ['detect', 'form_id', 'fill', 'mapping', 'debug_image']
+
+# columns added after the first release, added to older ledger files on open
+ADDED_COLUMNS = {
+    'scans': [f'{stage}_ms REAL' for stage in STAGES],
+    'scan_items': ['tier INTEGER']
+}
+
+SCAN_COLUMNS = ['scan_id', 'scanned_at', 'source', 'detected_form', 'catalog_version', 'total_circles',
+                'item_count', 'total_price', 'confidence', 'duration_ms', 'debug_image'] + \
+               [f'{stage}_ms' for stage in STAGES]
+ITEM_COLUMNS = ['scan_id', 'scanned_at', 'item', 'quantity', 'price', 'fill_percentage', 'confidence', 'tier']
+
+SCAN_INSERT = f"INSERT INTO scans ({', '.join(SCAN_COLUMNS)}) VALUES ({', '.join('?' * len(SCAN_COLUMNS))})"
+ITEM_INSERT = f"INSERT INTO scan_items ({', '.join(ITEM_COLUMNS)}) VALUES ({', '.join('?' * len(ITEM_COLUMNS))})"
+
+STAGE_AVERAGES = ', '.join(f'AVG({stage}_ms) AS avg_{stage}_ms' for stage in STAGES)
+
+# group_by values ng summary -> sqlite expression
+SUMMARY_BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00', scanned_at, 'unixepoch', 'localtime')",
+    'day': "strftime('%Y-%m-%d', scanned_at, 'unixepoch', 'localtime')"
+}
+
+
+class ScanLedger:
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 1.0):
+        """
+        db_path: SQLite database file (created if missing)
+        batch_size: max scans per insert transaction
+        flush_interval: max seconds a queued scan waits before being written
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._add_missing_columns(conn)
+
+        self._writer = threading.Thread(target=self._write_loop, name='scan-ledger-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """New connection, one per thread"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @staticmethod
+    def _add_missing_columns(conn: sqlite3.Connection):
+        """ALTER TABLE ledgers created before a column existed"""
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+            for column in columns:
+                if column.split()[0] not in existing:
+                    try:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column}')
+                    except sqlite3.OperationalError as e:
+                        # another process (e.g. hot_folder.py) added it first
+                        if 'duplicate column' not in str(e):
+                            raise
+        conn.commit()
+
+    def record(self, result: Dict, source: Optional[str] = None,
+               duration_ms: Optional[float] = None) -> str:
+        """Queue a full_omr_scan result for insertion and return its scan id"""
+        scan_id = uuid.uuid4().hex
+        scanned_at = time.time()
+        items = result.get('items', [])
+        stage_ms = result.get('stage_ms') or {}
+
+        scan_row = (
+            scan_id, scanned_at, source,
+            result.get('detected_form'), result.get('catalog_version'),
+            result.get('total_circles'), len(items),
+            result.get('total_price'), float(result.get('confidence_score', 0)),
+            duration_ms, result.get('debug_image')
+        ) + tuple(stage_ms.get(stage) for stage in STAGES)
+        item_rows = [
+            (scan_id, scanned_at, item['item'], item['quantity'],
+             item['price'], item['fill_percentage'], float(item['confidence']), item.get('tier'))
+            for item in items
+        ]
+        self._queue.put((scan_row, item_rows))
+        return scan_id
+
+    def _write_loop(self):
+        """Background writer: drain the queue in batches"""
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            batch = [entry for entry in batch if entry is not None]
+            try:
+                with conn:
+                    conn.executemany(SCAN_INSERT, [scan_row for scan_row, _ in batch])
+                    conn.executemany(ITEM_INSERT, [row for _, item_rows in batch for row in item_rows])
+            except Exception as e:
+                print(f"Scan ledger write error: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+
+            if stop:
+                conn.close()
+                return
+
+    def flush(self):
+        """Block until every queued scan has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write pending scans and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def query_scans(self, since: Optional[float] = None, until: Optional[float] = None,
+                    item: Optional[str] = None, form: Optional[int] = None,
+                    limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Scans newest first, with their items"""
+        conditions, params = self._time_conditions('s.scanned_at', since, until)
+        if form is not None:
+            conditions.append('s.detected_form = ?')
+            params.append(form)
+        if item is not None:
+            conditions.append('s.scan_id IN (SELECT scan_id FROM scan_items WHERE item = ?)')
+            params.append(item)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with closing(self._connect()) as conn:
+            scans = [dict(row) for row in conn.execute(
+                f'SELECT * FROM scans s {where} ORDER BY s.scanned_at DESC LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            )]
+            if not scans:
+                return []
+
+            placeholders = ','.join('?' * len(scans))
+            items = {}
+            for row in conn.execute(
+                f'SELECT scan_id, item, quantity, price, fill_percentage, confidence, tier '
+                f'FROM scan_items WHERE scan_id IN ({placeholders})',
+                [scan['scan_id'] for scan in scans]
+            ):
+                row = dict(row)
+                items.setdefault(row.pop('scan_id'), []).append(row)
+
+        for scan in scans:
+            scan['items'] = items.get(scan['scan_id'], [])
+        return scans
+
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None,
+                group_by: str = 'hour') -> Dict:
+        """Totals, per-item counts and per-hour/day confidence, aggregated in SQL"""
+        bucket = SUMMARY_BUCKETS[group_by]
+        conditions, params = self._time_conditions('scanned_at', since, until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with closing(self._connect()) as conn:
+            totals = dict(conn.execute(
+                f'SELECT COUNT(*) AS scans, COALESCE(SUM(total_price), 0) AS total_price, '
+                f'AVG(confidence) AS avg_confidence, AVG(duration_ms) AS avg_duration_ms, {STAGE_AVERAGES} '
+                f'FROM scans {where}', params
+            ).fetchone())
+
+            items = [dict(row) for row in conn.execute(
+                f'SELECT item, COUNT(*) AS scans, SUM(quantity) AS quantity, '
+                f'SUM(price * quantity) AS revenue, AVG(confidence) AS avg_confidence '
+                f'FROM scan_items {where} GROUP BY item ORDER BY quantity DESC', params
+            )]
+
+            buckets = [dict(row) for row in conn.execute(
+                f'SELECT {bucket} AS bucket, COUNT(*) AS scans, SUM(total_price) AS total_price, '
+                f'AVG(confidence) AS avg_confidence, AVG(duration_ms) AS avg_duration_ms, {STAGE_AVERAGES} '
+                f'FROM scans {where} GROUP BY bucket ORDER BY bucket', params
+            )]
+
+        return {
+            'totals': totals,
+            'items': items,
+            'group_by': group_by,
+            'buckets': buckets
+        }
+
+    @staticmethod
+    def _time_conditions(column: str, since: Optional[float], until: Optional[float]):
+        """WHERE conditions for a unix-time range"""
+        conditions, params = [], []
+        if since is not None:
+            conditions.append(f'{column} >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append(f'{column} < ?')
+            params.append(until)
+        return conditions, params
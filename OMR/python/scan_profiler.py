@@ -0,0 +1,91 @@
+"""
+OMR Scan Profiler - Profile a single scan on demand
+Runs cProfile (deterministic, per function totals) and a stack sampler
+(for flame graphs) on the calling thread while a scan runs. Only imported
+when a request asks for profiling, so normal scans pay nothing.
+"""
+
+import io
+import os
+import sys
+import time
+import pstats
+import marshal
+import cProfile
+import threading
+from collections import Counter
+from typing import Dict, List
+
+
+class ScanProfiler:
+    def __init__(self, sample_interval: float = 0.001):
+        """
+        sample_interval: seconds between stack samples
+        """
+        self.sample_interval = sample_interval
+        self.samples = Counter()
+        self.duration_ms = None
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._thread_id = None
+        self._base_depth = 0
+        self._started = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        # frames sa labas ng caller (flask/werkzeug) ay tinatanggal sa samples
+        frame, self._base_depth = sys._getframe(1), 0
+        while frame.f_back is not None:
+            frame = frame.f_back
+            self._base_depth += 1
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='scan-profiler', daemon=True)
+        self._sampler.start()
+        self._started = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        self._stop.set()
+        self._sampler.join()
+        return False
+
+    def _sample_loop(self):
+        """Record the scanning thread's python stack every sample_interval"""
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            del frame
+            stack = stack[::-1][self._base_depth:]
+            if stack:
+                self.samples[';'.join(stack)] += 1
+
+    def profile_bytes(self) -> bytes:
+        """cProfile stats in the .prof format (pstats, snakeviz)"""
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+    def collapsed_stacks(self) -> str:
+        """Sampled stacks as "frame;frame;frame count" lines (flamegraph.pl, speedscope)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def top_functions(self, limit: int = 10) -> List[Dict]:
+        """Functions with the highest cumulative time"""
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                'function': f"{name} ({os.path.basename(filename)}:{line})",
+                'calls': calls,
+                'total_ms': round(total * 1000, 2),
+                'cumulative_ms': round(cumulative * 1000, 2)
+            })
+        rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+        return rows[:limit]
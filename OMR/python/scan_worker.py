@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+OMR Scan Worker - Out-of-process scanning daemon
+Owns a pool of worker processes, each with its own OMRScanner, accepting
+scan requests on a Unix domain socket. Pixel data is handed over through
+multiprocessing.shared_memory so frames are never re-encoded or sent
+through the socket. Crashed workers are restarted by the supervisor.
+
+Usage: python scan_worker.py --socket /tmp/omr-scan.sock --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import struct
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scanner_config import ScannerConfig
+
+# scanner methods na pwedeng tawagin through the worker
+SCAN_METHODS = {'detect_circles', 'analyze_shaded_circles', 'full_omr_scan'}
+# methods that can report partial results per stage (on_stage)
+STAGED_METHODS = {'full_omr_scan'}
+
+HEADER = struct.Struct('!I')
+
+
+def send_message(conn: socket.socket, message: Dict):
+    """Send a length-prefixed JSON message"""
+    payload = json.dumps(message, default=to_json).encode('utf-8')
+    conn.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def receive_message(conn: socket.socket) -> Optional[Dict]:
+    """Receive a length-prefixed JSON message, None if the peer closed"""
+    header = _receive_exactly(conn, HEADER.size)
+    if header is None:
+        return None
+    payload = _receive_exactly(conn, HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def _receive_exactly(conn: socket.socket, size: int) -> Optional[bytes]:
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = conn.recv(size - len(chunks))
+        if not chunk:
+            return None
+        chunks.extend(chunk)
+    return bytes(chunks)
+
+
+def to_json(value):
+    """JSON fallback for numpy scalars/arrays in scan results"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a segment owned by the front end without tracking it here"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13, unregister para di i-unlink ng resource tracker
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class ScanWorkerClient:
+    """Front-end side: send decoded frames to the scan worker daemon"""
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, message: Dict, on_stage: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            send_message(conn, message)
+            response = receive_message(conn)
+            # stage messages come before the final response
+            while response is not None and 'stage' in response:
+                if on_stage is not None:
+                    on_stage(response['stage'], response['data'])
+                response = receive_message(conn)
+        if response is None:
+            raise ConnectionError("Scan worker closed the connection")
+        return response
+
+    def ping(self) -> Dict:
+        """Worker pid and uptime"""
+        return self._request({'op': 'ping'})
+
+    def scan(self, method: str, filepath: str, image: np.ndarray, config=None,
+             on_stage: Optional[Callable[[str, Dict], None]] = None, **kwargs) -> Dict:
+        """
+        Run an OMRScanner method on a decoded frame in the worker;
+        on_stage gets the worker's partial results (full_omr_scan only)
+        """
+        if config is not None:
+            kwargs['config'] = config.to_dict()
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+        try:
+            frame = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+            frame[...] = image
+            del frame
+
+            response = self._request({
+                'op': 'scan',
+                'method': method,
+                'filepath': filepath,
+                'shm': shm.name,
+                'shape': list(image.shape),
+                'dtype': str(image.dtype),
+                'kwargs': kwargs,
+                'stream': on_stage is not None and method in STAGED_METHODS
+            }, on_stage)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        if 'worker_error' in response:
+            raise RuntimeError(response['worker_error'])
+        return response['result']
+
+
+def handle_connection(conn: socket.socket, scanner, started_at: float):
+    """Serve one request on an accepted connection"""
+    message = receive_message(conn)
+    if message is None:
+        return
+
+    if message.get('op') == 'ping':
+        send_message(conn, {'pid': os.getpid(), 'uptime': time.time() - started_at})
+        return
+
+    method = message.get('method')
+    if message.get('op') != 'scan' or method not in SCAN_METHODS:
+        send_message(conn, {'worker_error': f"Unsupported request: {message.get('op')} {method}"})
+        return
+
+    kwargs = message.get('kwargs', {})
+    if 'config' in kwargs:
+        kwargs['config'] = ScannerConfig.from_dict(kwargs['config'])
+    if message.get('stream') and method in STAGED_METHODS:
+        kwargs['on_stage'] = lambda stage, data: send_message(conn, {'stage': stage, 'data': data})
+
+    shm = attach_shared_memory(message['shm'])
+    try:
+        image = np.ndarray(tuple(message['shape']), dtype=np.dtype(message['dtype']), buffer=shm.buf)
+        result = getattr(scanner, method)(message['filepath'], image=image, **kwargs)
+        del image
+    finally:
+        shm.close()
+
+    send_message(conn, {'result': result})
+
+
+def worker_main(server: socket.socket, results_folder: str, retake_window: float):
+    """Worker process: accept loop with its own OMRScanner"""
+    from omr_scanner import OMRScanner
+    from artifact_store import ArtifactStore
+    from retake_index import RetakeIndex
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # retakes are only spotted if they land on the same worker process
+    retake_index = RetakeIndex(window_seconds=retake_window) if retake_window > 0 else None
+    scanner = OMRScanner(results_store=ArtifactStore(results_folder), retake_index=retake_index)
+    scanner.warm_up()
+    started_at = time.time()
+
+    while True:
+        conn, _ = server.accept()
+        with conn:
+            try:
+                handle_connection(conn, scanner, started_at)
+            except Exception as e:
+                print(f"Scan worker {os.getpid()} error: {e}")
+                try:
+                    send_message(conn, {'worker_error': str(e)})
+                except OSError:
+                    pass
+
+
+def serve(socket_path: str, workers: int, results_folder: str, retake_window: float = 0.0):
+    """Supervisor: bind the socket, fork workers and restart any that die"""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(128)
+
+    context = multiprocessing.get_context('fork')
+
+    def spawn():
+        process = context.Process(target=worker_main, args=(server, results_folder, retake_window), daemon=True)
+        process.start()
+        return process
+
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    processes = [spawn() for _ in range(workers)]
+    print(f"Scan worker listening on {socket_path} with {workers} workers")
+
+    try:
+        while running:
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Scan worker {process.pid} exited ({process.exitcode}), restarting")
+                    processes[i] = spawn()
+            time.sleep(1)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(5)
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main():
+    default_results = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'results')
+
+    parser = argparse.ArgumentParser(description="OMR scan worker daemon")
+    parser.add_argument('--socket', default='/tmp/omr-scan.sock', help="Unix domain socket path")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of scanner processes")
+    parser.add_argument('--results', default=default_results, help="Results folder for debug images")
+    parser.add_argument('--retake-window', type=float, default=0.0,
+                        help="Seconds a scanned slip's bubble layout is reused by a retake (default 0 = off)")
+    args = parser.parse_args()
+
+    serve(args.socket, args.workers, args.results, args.retake_window)
+
+
+if __name__ == "__main__":
+    main()
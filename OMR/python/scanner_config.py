@@ -0,0 +1,319 @@
+"""
+OMR Scanner Configuration - Immutable, validated scanner parameters
+A ScannerConfig can be shared by any number of threads; per-request
+tuning creates a new config with with_overrides() instead of mutating
+the scanner.
+"""
+
+import os
+import json
+from dataclasses import dataclass, field, fields, replace, asdict
+from typing import Dict, Optional, Tuple
+
+
+def _check_number(name: str, value, minimum=None, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name} must be >= {minimum}, got {value}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{name} must be <= {maximum}, got {value}")
+
+
+def _from_mapping(cls, name: str, values: Dict):
+    """Build a params dataclass from a dict, rejecting unknown keys"""
+    if not isinstance(values, dict):
+        raise ValueError(f"{name} must be an object")
+    known = {f.name for f in fields(cls)}
+    unknown = set(values) - known
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(sorted(unknown))}")
+    return cls(**values)
+
+
+@dataclass(frozen=True)
+class CircleParams:
+    """cv2.HoughCircles parameters"""
+    dp: float = 1
+    minDist: float = 30
+    param1: float = 50
+    param2: float = 30
+    minRadius: int = 10
+    maxRadius: int = 80
+
+    def __post_init__(self):
+        _check_number('dp', self.dp, minimum=0.1)
+        _check_number('minDist', self.minDist, minimum=1)
+        _check_number('param1', self.param1, minimum=1)
+        _check_number('param2', self.param2, minimum=1)
+        _check_number('minRadius', self.minRadius, minimum=0)
+        _check_number('maxRadius', self.maxRadius, minimum=0)
+        if not isinstance(self.minRadius, int) or not isinstance(self.maxRadius, int):
+            raise ValueError("minRadius and maxRadius must be integers")
+        if self.maxRadius and self.maxRadius < self.minRadius:
+            raise ValueError("maxRadius must be >= minRadius")
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class ShadedParams:
+    """Thresholds for deciding if a bubble is shaded"""
+    dark_threshold: float = 100
+    fill_ratio_threshold: float = 0.6
+    mean_intensity_threshold: float = 120
+    median_intensity_threshold: float = 100
+    # two-tier classification: how far from the thresholds the cheap first pass
+    # must be to decide a bubble by itself (1 / 255 sends every bubble to the full check)
+    tier1_fill_margin: float = 0.15
+    tier1_intensity_margin: float = 20
+
+    def __post_init__(self):
+        _check_number('dark_threshold', self.dark_threshold, 0, 255)
+        _check_number('fill_ratio_threshold', self.fill_ratio_threshold, 0, 1)
+        _check_number('mean_intensity_threshold', self.mean_intensity_threshold, 0, 255)
+        _check_number('median_intensity_threshold', self.median_intensity_threshold, 0, 255)
+        _check_number('tier1_fill_margin', self.tier1_fill_margin, 0, 1)
+        _check_number('tier1_intensity_margin', self.tier1_intensity_margin, 0, 255)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+# preprocessing ops and their default params, run in order by OMRScanner.run_preprocess
+PREPROCESS_OPS = {
+    'downscale': {'max_side': 1200},  # shrink so the longer side fits, circles mapped back
+    'gaussian_blur': {'ksize': 5},
+    'median_blur': {'ksize': 5},
+    'bilateral': {'d': 9, 'sigma_color': 75, 'sigma_space': 75},
+    'clahe': {'clip_limit': 2.0, 'tile_size': 8},
+    'adaptive_threshold': {'block_size': 11, 'C': 2},
+    'otsu_threshold': {}
+}
+PREPROCESS_PARAM_MINIMUMS = {
+    'max_side': 100, 'ksize': 1, 'd': 1, 'sigma_color': 0, 'sigma_space': 0,
+    'clip_limit': 0.1, 'tile_size': 1, 'block_size': 3
+}
+INTEGER_PREPROCESS_PARAMS = {'max_side', 'ksize', 'd', 'tile_size', 'block_size'}
+ODD_PREPROCESS_PARAMS = {'ksize', 'block_size'}
+
+
+@dataclass(frozen=True)
+class PreprocessStage:
+    """One preprocessing step: an op from PREPROCESS_OPS with some params overridden"""
+    op: str
+    params: Tuple[Tuple[str, float], ...] = ()
+
+    def __post_init__(self):
+        if self.op not in PREPROCESS_OPS:
+            raise ValueError(f"Unknown preprocess op: {self.op} (available: {', '.join(PREPROCESS_OPS)})")
+        unknown = {name for name, _ in self.params} - set(PREPROCESS_OPS[self.op])
+        if unknown:
+            raise ValueError(f"Unknown {self.op} params: {', '.join(sorted(unknown))}")
+        for name, value in self.params:
+            _check_number(f"{self.op}.{name}", value, PREPROCESS_PARAM_MINIMUMS.get(name))
+            if name in INTEGER_PREPROCESS_PARAMS and not isinstance(value, int):
+                raise ValueError(f"{self.op}.{name} must be an integer")
+            if name in ODD_PREPROCESS_PARAMS and value % 2 == 0:
+                raise ValueError(f"{self.op}.{name} must be odd")
+
+    @property
+    def kwargs(self) -> Dict:
+        """All params of the op, defaults included"""
+        return {**PREPROCESS_OPS[self.op], **dict(self.params)}
+
+    def as_dict(self) -> Dict:
+        return {'op': self.op, **self.kwargs}
+
+    @classmethod
+    def from_dict(cls, data) -> 'PreprocessStage':
+        """Stage from {"op": "gaussian_blur", "ksize": 3} or just an op name"""
+        if isinstance(data, str):
+            return cls(data)
+        if not isinstance(data, dict) or not isinstance(data.get('op'), str):
+            raise ValueError('Preprocess stages must be an op name or an object with an "op"')
+        # defaults dropped para pareho ang stage kahit explicit ang default values
+        defaults = PREPROCESS_OPS.get(data['op'], {})
+        params = {k: v for k, v in data.items() if k != 'op' and (k not in defaults or defaults[k] != v)}
+        return cls(data['op'], tuple(sorted(params.items())))
+
+
+def _stages(*stages) -> Tuple[PreprocessStage, ...]:
+    return tuple(PreprocessStage.from_dict(stage) for stage in stages)
+
+
+@dataclass(frozen=True)
+class PreprocessPipeline:
+    """Ordered preprocessing stages applied to the grayscale frame before circle detection"""
+    name: str = 'default'
+    stages: Tuple[PreprocessStage, ...] = _stages('bilateral', 'adaptive_threshold')
+
+    def __post_init__(self):
+        if not self.stages:
+            raise ValueError("Preprocess pipeline needs at least one stage")
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'stages': [stage.as_dict() for stage in self.stages]}
+
+    @classmethod
+    def from_value(cls, value) -> 'PreprocessPipeline':
+        """
+        Pipeline from a source profile name ("webcam"), a list of stages or
+        {"name": ..., "stages": [...]}
+        """
+        if isinstance(value, str):
+            if value not in PREPROCESS_PIPELINES:
+                raise ValueError(f"Unknown source profile: {value} (available: {', '.join(PREPROCESS_PIPELINES)})")
+            return PREPROCESS_PIPELINES[value]
+        if isinstance(value, list):
+            return cls(name='custom', stages=_stages(*value))
+        if isinstance(value, dict):
+            if not isinstance(value.get('stages'), list):
+                raise ValueError('preprocess needs a "stages" list')
+            return cls(name=str(value.get('name', 'custom')), stages=_stages(*value['stages']))
+        raise ValueError("preprocess must be a source profile name, a list of stages or an object")
+
+
+# preprocessing per image source, pinipili per request via "source"
+PREPROCESS_PIPELINES = {
+    # original pipeline: strong edge-preserving denoise, slowest
+    'default': PreprocessPipeline(),
+    # even lighting, little sensor noise: light blur is enough (C=5 keeps paper grain out)
+    'flatbed': PreprocessPipeline('flatbed', _stages('gaussian_blur', {'op': 'adaptive_threshold', 'C': 5})),
+    # compressed frames with speckle noise: median removes it without smearing the rings
+    'webcam': PreprocessPipeline('webcam', _stages('median_blur', {'op': 'adaptive_threshold', 'C': 5})),
+    # big photos: detect on a smaller frame; adaptive threshold already copes with
+    # shadows, clahe before it turns paper grain into false circles
+    'phone': PreprocessPipeline('phone', _stages({'op': 'downscale', 'max_side': 1600}, 'median_blur',
+                                                 {'op': 'adaptive_threshold', 'C': 5}))
+}
+
+
+@dataclass(frozen=True)
+class ScannerConfig:
+    """Complete scanner configuration"""
+    name: str = 'default'
+    circle: CircleParams = field(default_factory=CircleParams)
+    shaded: ShadedParams = field(default_factory=ShadedParams)
+    # draw and save debug images (off for tuning/batch runs)
+    debug_images: bool = True
+    # preprocessing before circle detection (see PREPROCESS_PIPELINES)
+    preprocess: PreprocessPipeline = field(default_factory=PreprocessPipeline)
+
+    def with_overrides(self, overrides: Optional[Dict]) -> 'ScannerConfig':
+        """
+        New config with some parameters replaced, e.g.
+        {"circle_params": {"maxRadius": 40}, "shaded_params": {"dark_threshold": 90},
+         "preprocess": "flatbed"}
+        """
+        if not overrides:
+            return self
+        if not isinstance(overrides, dict):
+            raise ValueError("params must be an object")
+        unknown = set(overrides) - {'circle_params', 'shaded_params', 'preprocess'}
+        if unknown:
+            raise ValueError(f"Unknown params: {', '.join(sorted(unknown))}")
+
+        for name in ('circle_params', 'shaded_params'):
+            if name in overrides and not isinstance(overrides[name], dict):
+                raise ValueError(f"{name} must be an object")
+
+        circle = self.circle
+        if 'circle_params' in overrides:
+            circle = _from_mapping(CircleParams, 'circle_params', {**circle.as_dict(), **overrides['circle_params']})
+        shaded = self.shaded
+        if 'shaded_params' in overrides:
+            shaded = _from_mapping(ShadedParams, 'shaded_params', {**shaded.as_dict(), **overrides['shaded_params']})
+        preprocess = self.preprocess
+        if 'preprocess' in overrides:
+            preprocess = PreprocessPipeline.from_value(overrides['preprocess'])
+        return replace(self, name=f"{self.name}+overrides", circle=circle, shaded=shaded, preprocess=preprocess)
+
+    def for_source(self, source: Optional[str]) -> 'ScannerConfig':
+        """Same config with the preprocessing of a source profile ("flatbed", "webcam", "phone")"""
+        if source is not None and not isinstance(source, str):
+            raise ValueError("source must be a source profile name")
+        if source is None or source == self.preprocess.name:
+            return self
+        return replace(self, preprocess=PreprocessPipeline.from_value(source))
+
+    def scaled(self, scale: float) -> 'ScannerConfig':
+        """
+        Config for an image resized by scale: pixel distances and radii follow,
+        and so does param2 since a smaller circle collects fewer Hough votes
+        """
+        if scale == 1:
+            return self
+        circle = replace(
+            self.circle,
+            minDist=max(1, self.circle.minDist * scale),
+            param2=max(1, self.circle.param2 * scale),
+            minRadius=int(round(self.circle.minRadius * scale)),
+            maxRadius=int(round(self.circle.maxRadius * scale))
+        )
+        return replace(self, name=f"{self.name}@{scale:g}x", circle=circle)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'circle_params': self.circle.as_dict(),
+            'shaded_params': self.shaded.as_dict(),
+            'debug_images': self.debug_images,
+            'preprocess': self.preprocess.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ScannerConfig':
+        """Config from to_dict() output or a profile file"""
+        if not isinstance(data, dict):
+            raise ValueError("Scanner config must be an object")
+        return cls(
+            name=data.get('name', 'custom'),
+            circle=_from_mapping(CircleParams, 'circle_params', data.get('circle_params', {})),
+            shaded=_from_mapping(ShadedParams, 'shaded_params', data.get('shaded_params', {})),
+            debug_images=bool(data.get('debug_images', True)),
+            preprocess=PreprocessPipeline.from_value(data.get('preprocess', 'default'))
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'ScannerConfig':
+        """Load a config profile from a JSON file"""
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path: str):
+        """Write this config as a JSON profile"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+# built-in profiles, pinipili per request via "profile"
+PROFILES = {
+    'default': ScannerConfig(),
+    # ~2x resolution cameras: bigger, more spaced bubbles; coarser accumulator is faster
+    'high-res': ScannerConfig(
+        name='high-res',
+        circle=CircleParams(dp=1.5, minDist=60, param1=50, param2=30, minRadius=20, maxRadius=120)
+    )
+}
+
+
+def load_profiles(directory: str) -> Dict[str, ScannerConfig]:
+    """
+    Register every *.json profile in a directory (e.g. autotune.py output)
+    into PROFILES under its file name, returns the loaded profiles
+    """
+    loaded = {}
+    if not os.path.isdir(directory):
+        return loaded
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        name = filename[:-len('.json')]
+        try:
+            loaded[name] = replace(ScannerConfig.load(os.path.join(directory, filename)), name=name)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Skipping scanner profile {filename}: {e}")
+    PROFILES.update(loaded)
+    return loaded
@@ -0,0 +1,262 @@
+"""
+OMR Shadow Mode - Try a candidate scanner config on live traffic
+A sampled fraction of full scans is scanned again after the response has
+been sent, in a pool of low-priority worker processes, with the candidate
+config and (for a fair latency comparison) with the config that served the
+request. Item differences against the served result and per-stage latency
+are kept for /api/shadow/summary; the served result is never touched.
+Samples are dropped while shadow work is over its CPU share.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import statistics
+import threading
+import multiprocessing
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from scanner_config import ScannerConfig
+
+# per-process scanner, set by init_worker()
+_scanner = None
+
+
+def init_worker(nice: int):
+    """Pool initializer: lower priority, quiet output, one warmed-up OMRScanner"""
+    global _scanner
+    # stdout muna bago mag-print/import, baka naka-lock pa sa parent nung nag-fork
+    sys.stdout = open(os.devnull, 'w')
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.nice(nice)
+
+    from omr_scanner import OMRScanner
+    _scanner = OMRScanner()
+    _scanner.warm_up()
+
+
+def item_counts(result: Dict) -> Dict[str, int]:
+    """Selected item -> quantity of a full scan result"""
+    counts = Counter()
+    for item in result.get('items', []):
+        counts[item['item']] += item['quantity']
+    return dict(counts)
+
+
+def shadow_scan(task: Dict) -> Dict:
+    """Scan one slip in a worker with each config in task['configs']"""
+    started_cpu = time.process_time()
+    outcome = {}
+    image = _scanner.load_image(task['filepath'], reduce=task['reduce'])
+    if image is None:
+        outcome['error'] = "Could not load image"
+
+    for role, config in task['configs'].items():
+        if image is None:
+            break
+        config = ScannerConfig.from_dict(config).scaled(1 / task['reduce'])
+        started = time.perf_counter()
+        result = _scanner.full_omr_scan(task['filepath'], image=image, config=config)
+        total_ms = (time.perf_counter() - started) * 1000
+        if 'error' in result:
+            outcome[role] = {'error': result['error']}
+            continue
+        outcome[role] = {
+            'detected_form': result['detected_form'],
+            'items': item_counts(result),
+            'total_price': result['total_price'],
+            'stage_ms': {**result['stage_ms'], 'total': round(total_ms, 3)}
+        }
+
+    outcome['cpu_seconds'] = time.process_time() - started_cpu
+    return outcome
+
+
+class ShadowEvaluator:
+    def __init__(self, candidate: ScannerConfig, sample_rate: float = 0.05, max_cpu_share: float = 0.1,
+                 workers: int = 1, cpu_window_seconds: float = 60.0, log_folder: Optional[str] = None,
+                 nice: int = 10, history: int = 500):
+        """
+        candidate: config to evaluate
+        sample_rate: fraction of full scans re-run in shadow
+        max_cpu_share: max fraction of all cores shadow work may use, over cpu_window_seconds
+        workers: shadow processes (also the max shadow scans queued or running)
+        log_folder: where shadow-YYYY-MM-DD.jsonl comparison logs go (None = no log)
+        nice: niceness added to the shadow processes
+        history: comparisons kept in memory for the summary
+        """
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.max_cpu_share = max_cpu_share
+        self.workers = workers
+        self.cpu_window_seconds = cpu_window_seconds
+        self.log_folder = log_folder
+        self._lock = threading.Lock()
+        self._cpu_used = deque()  # (finished_at, cpu_seconds)
+        self._pending = 0
+        self._records = deque(maxlen=history)
+        self._counts = Counter()
+        self._started_at = time.monotonic()
+
+        if log_folder:
+            os.makedirs(log_folder, exist_ok=True)
+        # fork: spawn would re-import app.py in every worker
+        context = multiprocessing.get_context('fork')
+        self._pool = context.Pool(workers, initializer=init_worker, initargs=(nice,))
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def _cpu_share(self, now: float) -> float:
+        """Share of all cores used by finished shadow scans in the window (lock held)"""
+        while self._cpu_used and now - self._cpu_used[0][0] > self.cpu_window_seconds:
+            self._cpu_used.popleft()
+        window = min(self.cpu_window_seconds, max(now - self._started_at, 1.0))
+        return sum(cpu for _, cpu in self._cpu_used) / (window * (os.cpu_count() or 1))
+
+    def submit(self, filepath: str, primary: ScannerConfig, served: Dict, reduce: int = 1,
+               candidate: Optional[ScannerConfig] = None) -> bool:
+        """
+        Maybe queue a shadow scan of a served full scan; primary is the
+        config that served it (before any decode scaling), candidate the
+        candidate with the same request overrides (default: self.candidate).
+        Returns True if queued.
+        """
+        if random.random() >= self.sample_rate:
+            return False
+
+        with self._lock:
+            self._counts['sampled'] += 1
+            if self._pending >= self.workers:
+                self._counts['skipped_backlog'] += 1
+                return False
+            if self._cpu_share(time.monotonic()) >= self.max_cpu_share:
+                self._counts['skipped_cpu'] += 1
+                return False
+            self._pending += 1
+
+        # never raises: it runs after the served response, nothing there may fail because of it
+        try:
+            task = {
+                'filepath': filepath,
+                'reduce': reduce,
+                'configs': {
+                    'primary': ScannerConfig.from_dict({**primary.to_dict(), 'debug_images': False}).to_dict(),
+                    'candidate': ScannerConfig.from_dict({**(candidate or self.candidate).to_dict(),
+                                                          'debug_images': False}).to_dict()
+                }
+            }
+            served = {
+                'scan_id': served.get('scan_id'),
+                'detected_form': served['detected_form'],
+                'items': item_counts(served),
+                'total_price': served['total_price']
+            }
+            self._pool.apply_async(shadow_scan, (task,),
+                                   callback=lambda outcome: self._record(filepath, served, outcome),
+                                   error_callback=self._failed)
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+            self.skip('error')
+            print(f"Shadow scan not submitted: {e}")
+            return False
+        return True
+
+    def skip(self, reason: str):
+        """Count a served scan that gets no shadow scan, e.g. 'invalid_candidate'"""
+        with self._lock:
+            self._counts[f'skipped_{reason}'] += 1
+
+    def _failed(self, error: BaseException):
+        with self._lock:
+            self._pending -= 1
+            self._counts['errors'] += 1
+        print(f"Shadow scan failed: {error}")
+
+    def _record(self, filepath: str, served: Dict, outcome: Dict):
+        """Compare a finished shadow scan with the served result (pool result thread)"""
+        now = time.monotonic()
+        candidate = outcome.get('candidate', {})
+        record = {
+            'scan_id': served['scan_id'],
+            'file': os.path.basename(filepath),
+            'compared_at': datetime.now().isoformat(),
+            'cpu_seconds': round(outcome['cpu_seconds'], 3)
+        }
+        if 'error' in outcome or 'error' in candidate or 'error' in outcome.get('primary', {}):
+            record['error'] = outcome.get('error') or candidate.get('error') or outcome['primary']['error']
+        else:
+            served_items, candidate_items = Counter(served['items']), Counter(candidate['items'])
+            record.update({
+                'same_items': served_items == candidate_items,
+                'same_form': served['detected_form'] == candidate['detected_form'],
+                'added': dict(candidate_items - served_items),
+                'removed': dict(served_items - candidate_items),
+                'served_total': served['total_price'],
+                'candidate_total': candidate['total_price'],
+                'primary_stage_ms': outcome['primary']['stage_ms'],
+                'candidate_stage_ms': candidate['stage_ms']
+            })
+
+        with self._lock:
+            self._pending -= 1
+            self._cpu_used.append((now, outcome['cpu_seconds']))
+            self._counts['errors' if 'error' in record else 'completed'] += 1
+            self._records.append(record)
+
+        if self.log_folder:
+            # runs in the pool's result thread, an exception here would stop all callbacks
+            try:
+                path = os.path.join(self.log_folder, f"shadow-{datetime.now():%Y-%m-%d}.jsonl")
+                with open(path, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+            except OSError as e:
+                print(f"Shadow log write failed: {e}")
+
+    def summary(self, recent: int = 10) -> Dict:
+        """Agreement with served results and per-stage latency, primary vs candidate"""
+        with self._lock:
+            records = list(self._records)
+            counts = dict(self._counts)
+            cpu_share = self._cpu_share(time.monotonic())
+            pending = self._pending
+
+        compared = [record for record in records if 'error' not in record]
+        stages = compared[0]['candidate_stage_ms'] if compared else {}
+        latency = {
+            stage: {
+                role: round(statistics.median(record[f'{role}_stage_ms'].get(stage, 0) for record in compared), 2)
+                for role in ('primary', 'candidate')
+            }
+            for stage in stages
+        }
+
+        def share(key: str) -> Optional[float]:
+            return round(sum(record[key] for record in compared) / len(compared), 4) if compared else None
+
+        differences = [record for record in compared if not record['same_items'] or not record['same_form']]
+        return {
+            'candidate': self.candidate.name,
+            'sample_rate': self.sample_rate,
+            'max_cpu_share': self.max_cpu_share,
+            'cpu_share': round(cpu_share, 4),
+            'pending': pending,
+            'counts': counts,
+            'compared': len(compared),
+            'item_agreement': share('same_items'),
+            'form_agreement': share('same_form'),
+            'price_mismatches': sum(1 for record in compared if record['served_total'] != record['candidate_total']),
+            'median_stage_ms': latency,
+            'recent_differences': [
+                {key: record[key] for key in ('scan_id', 'file', 'compared_at', 'same_form', 'added', 'removed',
+                                              'served_total', 'candidate_total')}
+                for record in differences[-recent:]
+            ]
+        }
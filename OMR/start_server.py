@@ -2,13 +2,21 @@
 """
 OMR Testing System - Server Startup Script
 Easy way to start the Flask backend server
+
+Production mode (--production or OMR_PRODUCTION=1) skips the dependency
+probe/install, defers heavy imports and warms up the scanner in the
+background before /api/ready reports ready.
 """
 
 import os
 import sys
+import time
+import argparse
 import subprocess
 from pathlib import Path
 
+_started = time.perf_counter()
+
 def check_python_version():
     """Check if Python version is compatible"""
     if sys.version_info < (3, 7):
@@ -61,7 +69,7 @@ def install_dependencies():
         print(f"❌ Failed to install dependencies: {e}")
         return False
 
-def start_server():
+def start_server(production=False):
     """Start the Flask server"""
     print("🚀 Starting OMR Testing Server...")
     
@@ -74,8 +82,14 @@ def start_server():
     
     # Start the Flask app
     try:
-        from app import app
-        app.run(host='0.0.0.0', port=5003, debug=True)
+        from app import app, start_warm_up, STARTUP_TIMINGS
+        if production:
+            # walang reloader/debug, isang import lang ng app
+            STARTUP_TIMINGS['launcher_ms'] = round((time.perf_counter() - _started) * 1000, 1)
+            start_warm_up()
+            app.run(host='0.0.0.0', port=5003, debug=False, use_reloader=False, threaded=True)
+        else:
+            app.run(host='0.0.0.0', port=5003, debug=True)
     except ImportError as e:
         print(f"❌ Failed to import Flask app: {e}")
         print(f"Current directory: {os.getcwd()}")
@@ -87,6 +101,17 @@ def start_server():
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Start the OMR Testing Server")
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('OMR_PRODUCTION') == '1',
+                        help="Skip dependency checks and warm up the scanner in the background")
+    args = parser.parse_args()
+
+    if args.production:
+        print("🚀 Production start: skipping dependency checks")
+        start_server(production=True)
+        return
+
     print("=" * 50)
     print("🔧 OMR Testing System - Server Setup")
     print("=" * 50)
@@ -110,6 +135,7 @@ def main():
     print("   - POST /api/detect-circles")
     print("   - POST /api/analyze-shaded")
     print("   - POST /api/full-scan")
+    print("   - GET /api/ready")
     print("   - GET /api/health")
     print("\n🛑 Press Ctrl+C to stop the server")
     print("=" * 50)
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# flat modules sa OMR/python, same as app.py imports them
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python')
+sys.path.insert(0, PYTHON_DIR)
+
+# env that changes how app.py starts, cleared unless a test sets it
+APP_ENV = ('OMR_SCAN_WORKER_SOCKET', 'OMR_SHADOW_PROFILE', 'OMR_PROFILING_ALLOW_LOCAL', 'OMR_ADMIN_TOKEN',
+           'OMR_RETAKE_WINDOW_SECONDS', 'OMR_UPLOAD_SOURCES')
+
+
+@pytest.fixture
+def run_app(tmp_path):
+    """
+    Run a script that imports app.py in a fresh process (app.py reads env and
+    starts threads at import), with OMR_BASE_FOLDER in tmp_path.
+    The script gets OMR/python as argv[1], writes its JSON result to the
+    file argv[2] (stdout is shared with the warm-up thread) and gets args after.
+    """
+    def run(script, *args, **env):
+        output = str(tmp_path / 'app-script-output.json')
+        process_env = {name: value for name, value in os.environ.items() if name not in APP_ENV}
+        process_env.update(OMR_BASE_FOLDER=str(tmp_path), **env)
+        completed = subprocess.run([sys.executable, '-c', textwrap.dedent(script), PYTHON_DIR, output, *args],
+                                   env=process_env, cwd=str(tmp_path), capture_output=True, text=True, timeout=120)
+        assert completed.returncode == 0, completed.stderr
+        with open(output) as f:
+            return json.load(f)
+    return run
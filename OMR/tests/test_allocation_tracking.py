@@ -0,0 +1,64 @@
+"""peak_allocated_bytes with tracked scans running in several threads"""
+
+import contextlib
+import io
+import threading
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from artifact_store import ArtifactStore
+from omr_scanner import OMRScanner
+from scanner_config import ScannerConfig
+
+
+def slip():
+    image = np.full((700, 500, 3), 255, np.uint8)
+    for index in range(20):
+        center = (100 + (index // 10) * 200, 60 + (index % 10) * 60)
+        cv2.circle(image, center, 20, (0, 0, 0), 2)
+        if index in (0, 4, 7):
+            cv2.circle(image, center, 18, (20, 20, 20), -1)
+    return image
+
+
+def make_scanner(tmp_path):
+    return OMRScanner(results_store=ArtifactStore(str(tmp_path)), track_allocations=True,
+                      config=ScannerConfig(debug_images=False))
+
+
+def test_solo_scan_reports_peak_and_stops_tracing(tmp_path):
+    scanner = make_scanner(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = scanner.full_omr_scan('slip.png', image=slip())
+    assert result['peak_allocated_bytes'] > 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_concurrent_scans_do_not_corrupt_each_others_peak(tmp_path):
+    scanner = make_scanner(tmp_path)
+    image = slip()
+    with contextlib.redirect_stdout(io.StringIO()):
+        solo = scanner.full_omr_scan('slip.png', image=image)['peak_allocated_bytes']
+
+        results = []
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            for _ in range(3):
+                results.append(scanner.full_omr_scan('slip.png', image=image)['peak_allocated_bytes'])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(results) == 12
+    # overlapping scans get None instead of a peak that belongs to another scan
+    assert None in results
+    for peak in results:
+        assert peak is None or solo / 4 <= peak <= solo * 4
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,90 @@
+"""Tier 1 of classify_bubbles must agree with the full per-pixel analysis"""
+
+import cv2
+import numpy as np
+import pytest
+
+from artifact_store import ArtifactStore
+from omr_scanner import OMRScanner
+
+
+@pytest.fixture
+def scanner(tmp_path):
+    return OMRScanner(results_store=ArtifactStore(str(tmp_path)))
+
+
+def bubble_sheet(marks, radius=25, pitch=70, columns=10):
+    """Gray frame with one outlined bubble per mark function, mark(image, center, radius)"""
+    rows = (len(marks) + columns - 1) // columns
+    image = np.full((rows * pitch + pitch, columns * pitch + pitch), 235, np.uint8)
+    circles = []
+    for i, mark in enumerate(marks):
+        center = (pitch + (i % columns) * pitch, pitch + (i // columns) * pitch)
+        cv2.circle(image, center, radius, 40, 2)
+        mark(image, center, radius)
+        circles.append({'id': i + 1, 'center': center, 'radius': radius})
+    return image, circles
+
+
+def dot(size, shade=30):
+    """Filled disk of size pixels in the middle of the bubble"""
+    return lambda image, center, radius: cv2.circle(image, center, size, shade, -1)
+
+
+def ring(inner, outer, shade=30):
+    """Dark annulus, e.g. a bubble traced around its edge"""
+    def mark(image, center, radius):
+        cv2.circle(image, center, outer, shade, -1)
+        cv2.circle(image, center, inner, 235, -1)
+    return mark
+
+
+def scribble(seed):
+    """A few random dark strokes and blobs"""
+    def mark(image, center, radius):
+        rng = np.random.default_rng(seed)
+        for _ in range(rng.integers(1, 6)):
+            offset = rng.integers(-radius // 2, radius // 2 + 1, 2)
+            cv2.circle(image, (center[0] + int(offset[0]), center[1] + int(offset[1])),
+                       int(rng.integers(3, radius)), int(rng.integers(10, 120)), -1)
+    return mark
+
+
+def assert_tiers_agree(scanner, image, circles):
+    results = scanner.classify_bubbles(image, circles)
+    for circle, (is_shaded, fill_percentage, tier) in zip(circles, results):
+        full_shaded, full_fill = scanner.analyze_circle_fill(image, circle)
+        assert is_shaded == full_shaded, f"bubble {circle['id']} tier {tier}: {fill_percentage:.1f}% vs {full_fill:.1f}%"
+        assert fill_percentage == pytest.approx(full_fill)
+    return [tier for _, _, tier in results]
+
+
+def test_centred_dot_is_not_shaded_in_tier_1(scanner):
+    # reads 84% in the inscribed square but 56% of the disk
+    image, circles = bubble_sheet([dot(15)])
+    results = scanner.classify_bubbles(image, circles)
+    full_shaded, full_fill = scanner.analyze_circle_fill(image, circles[0])
+    assert not full_shaded
+    assert results[0][0] is False
+    assert results[0][1] == pytest.approx(full_fill)
+
+
+def test_centre_and_ring_marks_agree_with_full_analysis(scanner):
+    marks = [dot(size) for size in range(0, 24)]
+    marks += [ring(inner, outer) for inner in range(0, 20, 3) for outer in range(inner + 2, 24, 3)]
+    image, circles = bubble_sheet(marks)
+    tiers = assert_tiers_agree(scanner, image, circles)
+    # clear cases still have to be decided by tier 1
+    assert tiers.count(1) > len(tiers) // 2
+
+
+def test_random_marks_agree_with_full_analysis(scanner):
+    image, circles = bubble_sheet([scribble(seed) for seed in range(400)])
+    tiers = assert_tiers_agree(scanner, image, circles)
+    assert 1 in tiers and 2 in tiers
+
+
+def test_bubbles_on_the_frame_edge_use_tier_2(scanner):
+    image, circles = bubble_sheet([dot(20)])
+    circles[0]['center'] = (5, 5)
+    assert scanner.classify_bubbles(image, circles)[0][2] == 2
@@ -0,0 +1,24 @@
+"""Hashed result artifacts are immutable only when they actually exist"""
+
+FETCH_RESULTS = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import app, results_store
+
+    name = results_store.put(b'{"ok": true}', 'debug', 'json')
+    client = app.test_client()
+    policies = {}
+    for label, filename in [('present', name), ('missing', '01/23/debug_0123456789abcdef.json')]:
+        response = client.get('/api/results/' + filename)
+        policies[label] = [response.status_code, response.headers['Cache-Control']]
+    with open(sys.argv[2], 'w') as f:
+        json.dump(policies, f)
+'''
+
+
+def test_missing_hashed_artifact_is_not_cached(run_app):
+    policies = run_app(FETCH_RESULTS)
+
+    assert policies['present'] == [200, 'public, max-age=31536000, immutable']
+    assert policies['missing'][0] == 404
+    assert policies['missing'][1].startswith('no-store')
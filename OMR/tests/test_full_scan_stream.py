@@ -0,0 +1,27 @@
+"""/api/full-scan/stream reports scanner errors like /api/full-scan does"""
+
+import cv2
+import numpy as np
+
+SCAN_BOTH = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import app
+
+    client = app.test_client()
+    stream = client.post('/api/full-scan/stream', json={'filepath': sys.argv[3]})
+    events = [json.loads(line) for line in stream.get_data(as_text=True).splitlines()]
+    plain = client.post('/api/full-scan', json={'filepath': sys.argv[3]})
+    with open(sys.argv[2], 'w') as f:
+        json.dump({'events': events, 'status': plain.status_code, 'message': plain.get_json()['message']}, f)
+'''
+
+
+def test_dead_scan_worker_is_unavailable_not_busy(tmp_path, run_app):
+    slip = str(tmp_path / 'slip.png')
+    cv2.imwrite(slip, np.full((200, 200, 3), 255, np.uint8))
+    output = run_app(SCAN_BOTH, slip, OMR_SCAN_WORKER_SOCKET=str(tmp_path / 'no-worker.sock'))
+
+    assert output['status'] == 503
+    assert [event['event'] for event in output['events']] == ['error']
+    assert output['events'][0]['data']['message'] == output['message'] == "Scanner temporarily unavailable"
@@ -0,0 +1,48 @@
+"""Hot folder checkpoints: finished slips stay done, failed ones retry when the file changes"""
+
+import os
+
+from hot_folder import HotFolder
+from scan_ledger import ScanLedger
+
+
+def make_hot_folder(tmp_path):
+    ledger = ScanLedger(str(tmp_path / 'ledger.db'), flush_interval=0.05)
+    return HotFolder(str(tmp_path / 'drop'), str(tmp_path / 'state.db'), ledger, str(tmp_path / 'out'),
+                     settle_seconds=0), ledger
+
+
+def test_failed_slip_is_retried_after_it_changes(tmp_path):
+    os.makedirs(tmp_path / 'drop')
+    slip = tmp_path / 'drop' / 'slip.png'
+    slip.write_bytes(b'not really a png')
+    hot_folder, ledger = make_hot_folder(tmp_path)
+
+    (path, digest), = hot_folder.poll()
+    hot_folder.commit([{'path': path, 'digest': digest, 'duration_ms': 1.0, 'result': {'error': 'Could not load image'}}])
+    assert hot_folder.poll() == []
+
+    # same content, copied again
+    stat = os.stat(slip)
+    os.utime(slip, (stat.st_atime, stat.st_mtime - 10))
+    assert hot_folder.poll() == [(path, digest)]
+
+    hot_folder.close()
+    ledger.close()
+
+
+def test_scanned_slip_is_not_rescanned_when_touched(tmp_path):
+    os.makedirs(tmp_path / 'drop')
+    slip = tmp_path / 'drop' / 'slip.png'
+    slip.write_bytes(b'scanned slip')
+    hot_folder, ledger = make_hot_folder(tmp_path)
+
+    (path, digest), = hot_folder.poll()
+    hot_folder.commit([{'path': path, 'digest': digest, 'duration_ms': 1.0,
+                        'result': {'detected_form': 1, 'items': [], 'total_price': 0, 'confidence_score': 0}}])
+    stat = os.stat(slip)
+    os.utime(slip, (stat.st_atime, stat.st_mtime - 10))
+    assert hot_folder.poll() == []
+
+    hot_folder.close()
+    ledger.close()
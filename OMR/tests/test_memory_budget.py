@@ -0,0 +1,23 @@
+"""Decode reservations match what cv2.imdecode actually allocates at a reduced factor"""
+
+import cv2
+import numpy as np
+
+from memory_budget import estimate_decode_bytes, image_size
+
+
+def encoded(extension, width=1601, height=1203):
+    return cv2.imencode(extension, np.full((height, width, 3), 200, np.uint8))[1].tobytes()
+
+
+def test_jpeg_reserves_the_reduced_frame():
+    data = encoded('.jpg')
+    width, height = image_size(data)
+    assert estimate_decode_bytes(data, width, height, reduce=8) == 201 * 151 * 3
+
+
+def test_other_formats_reserve_the_full_frame():
+    # OpenCV decodes PNG/WebP full size and shrinks afterwards
+    data = encoded('.png')
+    width, height = image_size(data)
+    assert estimate_decode_bytes(data, width, height, reduce=8) == 1601 * 1203 * 3
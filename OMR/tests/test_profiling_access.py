@@ -0,0 +1,61 @@
+"""Scan profiling needs the admin token even from 127.0.0.1 (a reverse proxy's address)"""
+
+import cv2
+import numpy as np
+
+# test_client requests come from 127.0.0.1, like requests forwarded by a local proxy
+PROFILE_REQUESTS = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import app
+
+    client = app.test_client()
+    statuses = {}
+    for name, headers in [('no_token', {}), ('wrong_token', {'X-Admin-Token': 'guess'}),
+                          ('token', {'X-Admin-Token': 'secret'})]:
+        response = client.post('/api/analyze-shaded?profiling=1', json={'filepath': sys.argv[3]}, headers=headers)
+        statuses[name] = response.status_code
+    with open(sys.argv[2], 'w') as f:
+        json.dump(statuses, f)
+'''
+
+
+def write_slip(tmp_path):
+    slip = str(tmp_path / 'slip.png')
+    image = np.full((300, 300, 3), 255, np.uint8)
+    cv2.circle(image, (150, 150), 20, (0, 0, 0), 2)
+    cv2.imwrite(slip, image)
+    return slip
+
+
+def test_local_callers_need_the_token(tmp_path, run_app):
+    statuses = run_app(PROFILE_REQUESTS, write_slip(tmp_path), OMR_ADMIN_TOKEN='secret')
+    assert statuses == {'no_token': 403, 'wrong_token': 403, 'token': 200}
+
+
+def test_local_callers_allowed_when_opted_in(tmp_path, run_app):
+    statuses = run_app(PROFILE_REQUESTS, write_slip(tmp_path), OMR_ADMIN_TOKEN='secret', OMR_PROFILING_ALLOW_LOCAL='1')
+    assert statuses == {'no_token': 200, 'wrong_token': 200, 'token': 200}
+
+
+# a profiled scan is already running (lock held), the next one gets 409
+OVERLAPPING_PROFILES = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    import app as app_module
+
+    client = app_module.app.test_client()
+    headers = {'X-Admin-Token': 'secret'}
+    with app_module._profiling_lock:
+        busy = client.post('/api/analyze-shaded?profiling=1', json={'filepath': sys.argv[3]}, headers=headers)
+    done = client.post('/api/analyze-shaded?profiling=1', json={'filepath': sys.argv[3]}, headers=headers)
+    with open(sys.argv[2], 'w') as f:
+        json.dump({'busy': busy.status_code, 'done': done.status_code, 'keys': sorted(done.get_json()['data'])}, f)
+'''
+
+
+def test_overlapping_profiled_scans_get_409(tmp_path, run_app):
+    profiles = run_app(OVERLAPPING_PROFILES, write_slip(tmp_path), OMR_ADMIN_TOKEN='secret')
+
+    assert (profiles['busy'], profiles['done']) == (409, 200)
+    assert 'profiling' in profiles['keys'] and 'profile' not in profiles['keys']
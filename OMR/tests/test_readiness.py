@@ -0,0 +1,57 @@
+"""/api/ready when the app is imported by a WSGI server instead of run with python app.py"""
+
+# same as `gunicorn app:app`: import the module, never call start_warm_up() ourselves
+WSGI_PROBE = '''
+    import json, sys, time
+    sys.path.insert(0, sys.argv[1])
+    from app import app
+
+    client = app.test_client()
+    deadline = time.monotonic() + 60
+    status = client.get('/api/ready').status_code
+    while status != 200 and time.monotonic() < deadline:
+        time.sleep(0.1)
+        status = client.get('/api/ready').status_code
+    with open(sys.argv[2], 'w') as f:
+        json.dump({'status': status}, f)
+'''
+
+
+def test_ready_after_wsgi_style_import(run_app):
+    assert run_app(WSGI_PROBE) == {'status': 200}
+
+
+# first warm-up fails, the retry after it succeeds
+FAILING_WARM_UP = '''
+    import json, sys, time
+    sys.path.insert(0, sys.argv[1])
+    import app as app_module
+
+    real_get_omr_scanner = app_module.get_omr_scanner
+    attempts = []
+    def flaky_get_omr_scanner():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('cv2 missing')
+        return real_get_omr_scanner()
+    app_module.get_omr_scanner = flaky_get_omr_scanner
+    app_module.app.config['WARM_UP_RETRY_SECONDS'] = 2
+
+    client = app_module.app.test_client()
+    client.get('/api/ready')
+    while not attempts or app_module._warm_up_failed_at[0] is None:
+        time.sleep(0.05)
+    failed = client.get('/api/ready')
+    deadline = time.monotonic() + 60
+    status = failed.status_code
+    while status != 200 and time.monotonic() < deadline:
+        time.sleep(0.2)
+        status = client.get('/api/ready').status_code
+    with open(sys.argv[2], 'w') as f:
+        json.dump({'failed': failed.status_code, 'error': failed.get_json()['data']['startup'].get('error'),
+                   'retried': status}, f)
+'''
+
+
+def test_failed_warm_up_is_not_ready_and_retries(run_app):
+    assert run_app(FAILING_WARM_UP) == {'failed': 503, 'error': 'cv2 missing', 'retried': 200}
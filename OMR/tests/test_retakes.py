@@ -0,0 +1,65 @@
+"""Layout reuse between scans of the same form, and when a scan counts as a retake"""
+
+import contextlib
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from artifact_store import ArtifactStore
+from omr_scanner import OMRScanner
+from retake_index import RetakeIndex
+from scanner_config import ScannerConfig
+
+
+def slip(shaded, shift=(0, 0), noise=0, seed=0):
+    """Form 1 slip with 43 bubbles in 3 columns, bubble ids in shaded filled in"""
+    image = np.full((1400, 1000, 3), 255, np.uint8)
+    for index in range(43):
+        x, y = 150 + (index // 15) * 300 + shift[0], 100 + (index % 15) * 80 + shift[1]
+        cv2.circle(image, (x, y), 20, (0, 0, 0), 2)
+        if index == 0 or index in shaded:
+            cv2.circle(image, (x, y), 18, (20, 20, 20), -1)
+    if noise:
+        rng = np.random.default_rng(seed)
+        image = np.clip(image.astype(int) + rng.integers(-noise, noise, image.shape), 0, 255).astype(np.uint8)
+    return image
+
+
+@pytest.fixture
+def scanner(tmp_path):
+    return OMRScanner(results_store=ArtifactStore(str(tmp_path)), config=ScannerConfig(debug_images=False),
+                      retake_index=RetakeIndex())
+
+
+def scan(scanner, image):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scanner.full_omr_scan('slip.png', image=image)
+
+
+def items(result):
+    return sorted(item['item'] for item in result['items'])
+
+
+def test_other_slip_of_the_same_form_is_not_a_retake(scanner, tmp_path):
+    first = scan(scanner, slip({5, 9, 20}))
+    second = scan(scanner, slip({12, 30}, shift=(1, 2), noise=5, seed=1))
+
+    # same template, so the layout was reused, but the marks differ
+    assert scanner.retake_index.stats()['layout_reused'] == 1
+    assert first['retake'] is None
+    assert second['retake'] is None
+    plain = OMRScanner(results_store=ArtifactStore(str(tmp_path)), config=ScannerConfig(debug_images=False))
+    assert items(second) == items(scan(plain, slip({12, 30}, shift=(1, 2), noise=5, seed=1)))
+    assert items(second) != items(first)
+
+
+def test_same_slip_scanned_again_is_a_retake(scanner):
+    first = scan(scanner, slip({5, 9, 20}))
+    second = scan(scanner, slip({5, 9, 20}, shift=(3, -2), noise=5, seed=2))
+
+    assert second['retake'] is not None
+    assert second['retake']['offset'] == (3, -2)
+    assert items(second) == items(first)
+    assert scanner.retake_index.stats()['retakes'] == 1
@@ -0,0 +1,50 @@
+"""Stage timings and per-item tiers land in their own ledger columns"""
+
+import sqlite3
+
+from scan_ledger import ScanLedger
+
+RESULT = {
+    'detected_form': 1,
+    'catalog_version': 'v1',
+    'total_circles': 43,
+    'total_price': 250.0,
+    'confidence_score': 90.0,
+    'stage_ms': {'detect': 12.5, 'form_id': 0.4, 'fill': 2.0, 'mapping': 0.1, 'debug_image': 8.0},
+    'items': [
+        {'item': 'Bulalo', 'quantity': 1, 'price': 250.0, 'fill_percentage': 80.0, 'confidence': 90.0, 'tier': 1}
+    ]
+}
+
+
+def test_stage_timings_are_queryable(tmp_path):
+    ledger = ScanLedger(str(tmp_path / 'ledger.db'), flush_interval=0.05)
+    ledger.record(RESULT, source='slip.png', duration_ms=30.0)
+    ledger.record({**RESULT, 'stage_ms': {**RESULT['stage_ms'], 'detect': 7.5}}, source='slip.png', duration_ms=25.0)
+    ledger.flush()
+
+    scan = ledger.query_scans()[0]
+    assert scan['fill_ms'] == 2.0
+    assert scan['items'][0]['confidence'] == 90.0
+    assert scan['items'][0]['tier'] == 1
+    assert ledger.summary()['totals']['avg_detect_ms'] == 10.0
+    ledger.close()
+
+
+def test_older_ledger_gets_the_new_columns(tmp_path):
+    db_path = str(tmp_path / 'ledger.db')
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript("""
+            CREATE TABLE scans (scan_id TEXT PRIMARY KEY, scanned_at REAL NOT NULL, source TEXT,
+                detected_form INTEGER, catalog_version TEXT, total_circles INTEGER, item_count INTEGER,
+                total_price REAL, confidence REAL, duration_ms REAL, debug_image TEXT);
+            CREATE TABLE scan_items (scan_id TEXT NOT NULL, scanned_at REAL NOT NULL, item TEXT NOT NULL,
+                quantity INTEGER NOT NULL, price REAL, fill_percentage REAL, confidence REAL);
+        """)
+    conn.close()
+
+    ledger = ScanLedger(db_path, flush_interval=0.05)
+    ledger.record(RESULT)
+    ledger.flush()
+    assert ledger.query_scans()[0]['detect_ms'] == 12.5
+    ledger.close()
@@ -0,0 +1,63 @@
+"""Malformed per-request scanner params are ValueErrors (400), not TypeErrors (500)"""
+
+import cv2
+import numpy as np
+import pytest
+
+from scanner_config import PROFILES
+
+
+@pytest.mark.parametrize('overrides', [
+    {'circle_params': 5},
+    {'circle_params': None},
+    {'shaded_params': ['dark_threshold']},
+    {'preprocess': [{'op': ['median_blur']}]},
+])
+def test_malformed_overrides_are_value_errors(overrides):
+    with pytest.raises(ValueError):
+        PROFILES['default'].with_overrides(overrides)
+
+
+def test_non_string_source_is_a_value_error():
+    with pytest.raises(ValueError):
+        PROFILES['default'].for_source(['median_blur'])
+
+
+SCAN_REQUESTS = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import app
+
+    client = app.test_client()
+    bodies = {'list_profile': {'profile': ['default']}, 'number_circle_params': {'params': {'circle_params': 5}}}
+    statuses = {name: client.post('/api/full-scan', json={'filepath': sys.argv[3], **body}).status_code
+                for name, body in bodies.items()}
+    with open(sys.argv[2], 'w') as f:
+        json.dump(statuses, f)
+'''
+
+
+def test_malformed_scan_requests_get_400(tmp_path, run_app):
+    slip = str(tmp_path / 'slip.png')
+    cv2.imwrite(slip, np.full((200, 200, 3), 255, np.uint8))
+
+    assert run_app(SCAN_REQUESTS, slip) == {'list_profile': 400, 'number_circle_params': 400}
+
+
+WEBCAM_PIPELINE = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import scan_config_from_request
+
+    config = scan_config_from_request({'filepath': '/uploads/ab/cd/omr_webcam_abcdef0123456789.webp'})
+    with open(sys.argv[2], 'w') as f:
+        json.dump({'preprocess': config.preprocess.name}, f)
+'''
+
+
+def test_webcam_uploads_keep_the_baseline_pipeline(run_app):
+    assert run_app(WEBCAM_PIPELINE) == {'preprocess': 'default'}
+
+
+def test_webcam_pipeline_by_upload_prefix_is_opt_in(run_app):
+    assert run_app(WEBCAM_PIPELINE, OMR_UPLOAD_SOURCES='omr_webcam:webcam') == {'preprocess': 'webcam'}
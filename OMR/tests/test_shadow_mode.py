@@ -0,0 +1,33 @@
+"""Shadow mode never changes what the client is served"""
+
+import cv2
+import numpy as np
+
+# maxRadius=15 is fine for the default profile but below high-res's minRadius=20
+SCAN_WITH_SHADOW = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import app
+
+    client = app.test_client()
+    body = {'filepath': sys.argv[3], 'params': {'circle_params': {'maxRadius': 15}}}
+    plain = client.post('/api/full-scan', json=body)
+    stream = client.post('/api/full-scan/stream', json=body)
+    events = [json.loads(line)['event'] for line in stream.get_data(as_text=True).splitlines()]
+    counts = client.get('/api/shadow/summary').get_json()['data']['counts']
+    with open(sys.argv[2], 'w') as f:
+        json.dump({'status': plain.status_code, 'success': plain.get_json()['success'], 'events': events,
+                   'counts': counts}, f)
+'''
+
+
+def test_invalid_candidate_params_still_serve_the_scan(tmp_path, run_app):
+    slip = str(tmp_path / 'slip.png')
+    image = np.full((300, 300, 3), 255, np.uint8)
+    cv2.circle(image, (150, 150), 12, (0, 0, 0), 2)
+    cv2.imwrite(slip, image)
+    output = run_app(SCAN_WITH_SHADOW, slip, OMR_SHADOW_PROFILE='high-res', OMR_SHADOW_SAMPLE_RATE='1')
+
+    assert (output['status'], output['success']) == (200, True)
+    assert output['events'][-1] == 'result'
+    assert output['counts'].get('skipped_invalid_candidate') == 2
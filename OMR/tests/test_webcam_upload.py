@@ -0,0 +1,18 @@
+"""Bad /api/upload-webcam bodies get a 400, not a 500"""
+
+BAD_UPLOADS = '''
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    from app import app
+
+    client = app.test_client()
+    bodies = {'number': {'image': 42}, 'object': {'image': {'data': 'x'}}, 'list': ['image'],
+              'bad_base64': {'image': 'data:image/png;base64,abc'}}
+    statuses = {name: client.post('/api/upload-webcam', json=body).status_code for name, body in bodies.items()}
+    with open(sys.argv[2], 'w') as f:
+        json.dump(statuses, f)
+'''
+
+
+def test_non_string_legacy_image_is_rejected(run_app):
+    assert run_app(BAD_UPLOADS) == {'number': 400, 'object': 400, 'list': 400, 'bad_base64': 400}
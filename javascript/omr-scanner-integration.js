@@ -8,6 +8,7 @@ const OMR_API_BASE_URL = 'http://localhost:5003/api';
 
 // Global variables
 let omrWebcamStream = null;
+let omrCaptureConfig = null;
 
 // Initialize OMR Scanner Integration
 document.addEventListener('DOMContentLoaded', function () {
@@ -360,16 +361,24 @@ async function captureOMRWebcamImage() {
         const video = document.getElementById('omrWebcamVideo');
         const canvas = document.getElementById('omrWebcamCanvas');
 
-        // Set canvas dimensions to match video
-        canvas.width = video.videoWidth;
-        canvas.height = video.videoHeight;
+        // Capture format and size advertised by the server
+        const captureConfig = await getCaptureConfig();
+
+        // Set canvas dimensions to match video, capped by the server config
+        const scale = Math.min(
+            1,
+            captureConfig.max_width / video.videoWidth,
+            captureConfig.max_height / video.videoHeight
+        );
+        canvas.width = Math.round(video.videoWidth * scale);
+        canvas.height = Math.round(video.videoHeight * scale);
 
         // Draw video frame to canvas
         const context = canvas.getContext('2d');
-        context.drawImage(video, 0, 0);
+        context.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-        // Convert canvas to base64
-        const imageDataURL = canvas.toDataURL('image/png');
+        // Encode canvas to a compressed binary blob
+        const imageBlob = await canvasToBlob(canvas, captureConfig);
 
         // Stop webcam
         stopOMRWebcam();
@@ -379,7 +388,7 @@ async function captureOMRWebcamImage() {
         updateProcessingStatus('Uploading webcam image...');
 
         // Upload to backend
-        const uploadResult = await uploadWebcamImage(imageDataURL);
+        const uploadResult = await uploadWebcamImage(imageBlob);
 
         if (!uploadResult.success) {
             throw new Error(uploadResult.error || 'Upload failed');
@@ -412,17 +421,73 @@ async function captureOMRWebcamImage() {
     }
 }
 
+/**
+ * Get webcam capture config from OMR server (cached)
+ */
+async function getCaptureConfig() {
+    if (omrCaptureConfig) {
+        return omrCaptureConfig;
+    }
+
+    const fallback = {
+        formats: ['image/jpeg'],
+        quality: 0.85,
+        max_width: 1600,
+        max_height: 1600
+    };
+
+    try {
+        const response = await fetch(`${OMR_API_BASE_URL}/capture-config`);
+        const result = await response.json();
+        omrCaptureConfig = result.success ? result.data : fallback;
+    } catch (error) {
+        console.warn('OMR Scanner: Could not load capture config, using defaults:', error);
+        omrCaptureConfig = fallback;
+    }
+    return omrCaptureConfig;
+}
+
+/**
+ * Encode canvas to the first supported format from the capture config
+ */
+function canvasToBlob(canvas, captureConfig) {
+    const encode = (type) => new Promise(resolve => canvas.toBlob(resolve, type, captureConfig.quality));
+
+    return (async () => {
+        for (const type of captureConfig.formats) {
+            const blob = await encode(type);
+            // Browsers without encoder support fall back to PNG
+            if (blob && blob.type === type) {
+                return blob;
+            }
+        }
+        const blob = await encode('image/jpeg');
+        // toBlob gives null when the canvas is empty (e.g. 0x0, camera not ready)
+        if (!blob) {
+            throw new Error('Could not encode webcam frame (camera not ready?)');
+        }
+        return blob;
+    })();
+}
+
 /**
  * Upload webcam image to OMR server
  */
-async function uploadWebcamImage(imageDataURL) {
+async function uploadWebcamImage(imageBlob) {
+    if (!imageBlob) {
+        return {
+            success: false,
+            error: 'No webcam image to upload'
+        };
+    }
+
     try {
         const response = await fetch(`${OMR_API_BASE_URL}/upload-webcam`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': imageBlob.type
             },
-            body: JSON.stringify({ image: imageDataURL })
+            body: imageBlob
         });
 
         const result = await response.json();
@@ -535,7 +600,7 @@ async function performFullScan(filepath) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ filepath })
+            body: JSON.stringify({ filepath, format: 'compact' })
         });
 
 
@@ -550,13 +615,44 @@ async function performFullScan(filepath) {
     }
 }
 
+/**
+ * Get scanned item codes and quantities from a scan response.
+ * Uses the compact `items` list, falls back to parsing the legacy
+ * "ID X: ItemName (Shaded)" strings of the full response.
+ */
+function getScannedItems(scanData) {
+    if (Array.isArray(scanData.items)) {
+        return scanData.items
+            .filter(item => item && typeof item.id === 'string')
+            .map(item => ({ code: item.id, quantity: item.quantity || 1 }));
+    }
+
+    const items = [];
+    if (scanData.selected_item_data && Array.isArray(scanData.selected_item_data)) {
+        scanData.selected_item_data.forEach(itemStr => {
+            if (!itemStr || typeof itemStr !== 'string') {
+                return;
+            }
+            const match = itemStr.match(/ID (\d+): (.+) \((Shaded|Not Shaded)\)/);
+            if (match && match[3] === 'Shaded') {
+                const itemName = match[2];
+                // Filter out N/A items and form identifiers
+                if (itemName === 'N/A' || itemName.trim() === '' || itemName.startsWith('FORM_ID_')) {
+                    return;
+                }
+                items.push({ code: itemName, quantity: 1 });
+            }
+        });
+    }
+    return items;
+}
+
 /**
  * Display scan results
  */
 function displayScanResults(scanData) {
     console.log('OMR Scanner: Displaying scan results:', scanData);
-    console.log('OMR Scanner: selected_item_data:', scanData.selected_item_data);
-    console.log('OMR Scanner: selected_items:', scanData.selected_items);
+    console.log('OMR Scanner: items:', scanData.items);
 
     // Check if scanData is valid
     if (!scanData || typeof scanData !== 'object') {
@@ -565,11 +661,6 @@ function displayScanResults(scanData) {
         return;
     }
 
-    // Debug: Log the scan data structure
-    console.log('OMR Scanner: Full scan data:', scanData);
-    console.log('OMR Scanner: selected_item_data type:', typeof scanData.selected_item_data);
-    console.log('OMR Scanner: selected_item_data value:', scanData.selected_item_data);
-
     document.getElementById('omrProcessing').style.display = 'none';
     document.getElementById('omrResults').style.display = 'block';
 
@@ -577,57 +668,40 @@ function displayScanResults(scanData) {
     // Clear previous results
     itemsList.innerHTML = '';
 
-    // Parse and display items
-    if (scanData.selected_item_data && Array.isArray(scanData.selected_item_data)) {
-        console.log('OMR Scanner: Processing', scanData.selected_item_data.length, 'items');
-        scanData.selected_item_data.forEach((itemStr, index) => {
-            console.log(`OMR Scanner: Processing item ${index}:`, itemStr);
-
-            // Check if itemStr is valid
-            if (!itemStr || typeof itemStr !== 'string') {
-                console.warn(`OMR Scanner: Invalid item string at index ${index}:`, itemStr);
-                return;
-            }
-
-            // Parse item string format: "ID X: ItemName (Shaded)"
-            const match = itemStr.match(/ID (\d+): (.+) \((Shaded|Not Shaded)\)/);
-            if (match && match[3] === 'Shaded') {
-                const itemName = match[2];
-                console.log(`OMR Scanner: Found shaded item: "${itemName}"`);
-
-                // Filter out N/A items and form identifiers
-                if (itemName === 'N/A' || itemName.trim() === '' ||
-                    itemName === 'FORM_ID_1' || itemName === 'FORM_ID_2' ||
-                    itemName.startsWith('FORM_ID_')) {
-                    console.log(`OMR Scanner: Skipping filtered item: "${itemName}"`);
-                    return; // Skip N/A items and form identifiers
-                }
+    // Server flags a rescan of the slip scanned moments ago; the cashier decides
+    if (scanData.retake) {
+        const retakeDiv = document.createElement('div');
+        retakeDiv.className = 'alert alert-warning p-2 mb-2';
+        retakeDiv.textContent = 'This looks like a rescan of the slip scanned moments ago. ' +
+            'Check the order before adding these items again.';
+        itemsList.appendChild(retakeDiv);
+    }
 
-                // Create item display
-                const itemDiv = document.createElement('div');
-                itemDiv.className = 'omr-item-entry border rounded p-2 mb-2';
-                itemDiv.innerHTML = `
+    // Display items
+    const scannedItems = getScannedItems(scanData);
+    console.log('OMR Scanner: Processing', scannedItems.length, 'items');
+    scannedItems.forEach(item => {
+        const itemDiv = document.createElement('div');
+        itemDiv.className = 'omr-item-entry border rounded p-2 mb-2';
+        itemDiv.innerHTML = `
     <div class="d-flex justify-content-between align-items-center">
     <div>
-    <strong>${itemName}</strong>
+    <strong>${item.code}</strong>${item.quantity > 1 ? ` x${item.quantity}` : ''}
     </div>
     <div>
     <span class="badge bg-success">Detected</span>
     </div>
     </div>
                 `;
-                itemsList.appendChild(itemDiv);
-            }
-        });
-    }
+        itemsList.appendChild(itemDiv);
+    });
 
 
     // Update summary with better error handling
-    const totalItems = (typeof scanData.selected_items === 'number') ? scanData.selected_items : 0;
+    const totalItems = scannedItems.reduce((sum, item) => sum + item.quantity, 0);
     const totalPrice = (typeof scanData.total_price === 'number') ? scanData.total_price : 0;
 
     console.log('OMR Scanner: Summary - Total Items:', totalItems, 'Total Price:', totalPrice);
-    console.log('OMR Scanner: Summary data types - selected_items:', typeof scanData.selected_items, 'total_price:', typeof scanData.total_price);
 
     document.getElementById('omrTotalItems').textContent = totalItems;
     document.getElementById('omrEstimatedTotal').textContent = `₱${totalPrice.toFixed(2)}`;
@@ -668,6 +742,10 @@ async function addScannedItemsToOrder() {
 
 
     const scanData = window.currentOMRScanData;
+    if (scanData.retake && !confirm('This slip was just scanned. Add its items to the order again?')) {
+        return;
+    }
+
     // Show loading state
     const addBtn = document.getElementById('omrAddToOrderBtn');
     const originalText = addBtn ? addBtn.innerHTML : '';
@@ -682,46 +760,35 @@ async function addScannedItemsToOrder() {
 
     try {
         // Process each scanned item
-        if (scanData.selected_item_data && Array.isArray(scanData.selected_item_data)) {
-            for (const itemStr of scanData.selected_item_data) {
-                // Parse item string format: "ID X: ItemName (Shaded)"
-                const match = itemStr.match(/ID (\d+): (.+) \((Shaded|Not Shaded)\)/);
-                if (match && match[3] === 'Shaded') {
-                    const itemCode = match[2]; // This is the code from OMR sheet
-
-                    // Filter out N/A items and form identifiers
-                    if (itemCode === 'N/A' || itemCode.trim() === '' ||
-                        itemCode === 'FORM_ID_1' || itemCode === 'FORM_ID_2' ||
-                        itemCode.startsWith('FORM_ID_')) {
-                        continue; // Skip N/A items and form identifiers
-                    }
-
-                    try {
-                        // Look up item in Firebase by code first, then by name
-                        const menuItem = await findMenuItemInFirebase(itemCode);
-
-                        if (menuItem) {
-                            // Add item to order
-                            if (typeof window.addItemToOrder === 'function') {
-                                await window.addItemToOrder(
-                                    menuItem.name,
-                                    `₱${menuItem.price.toFixed(2)}`,
-                                    menuItem.photoUrl || ''
-                                );
-                                itemsAdded++;
-                                console.log(`OMR Scanner: Added item "${menuItem.name}" (code: ${itemCode}) to order`);
-                            } else {
-                                console.error('OMR Scanner: addItemToOrder function not found');
-                            }
-                        } else {
-                            itemsNotFound.push(itemCode);
-                            console.warn(`OMR Scanner: Menu item not found for code: "${itemCode}"`);
+        for (const scannedItem of getScannedItems(scanData)) {
+            const itemCode = scannedItem.code; // This is the code from OMR sheet
+
+            try {
+                // Look up item in Firebase by code first, then by name
+                const menuItem = await findMenuItemInFirebase(itemCode);
+
+                if (menuItem) {
+                    // Add item to order
+                    if (typeof window.addItemToOrder === 'function') {
+                        for (let i = 0; i < scannedItem.quantity; i++) {
+                            await window.addItemToOrder(
+                                menuItem.name,
+                                `₱${menuItem.price.toFixed(2)}`,
+                                menuItem.photoUrl || ''
+                            );
+                            itemsAdded++;
                         }
-                    } catch (error) {
-                        console.error(`OMR Scanner: Error adding item "${itemCode}":`, error);
-                        itemsNotFound.push(itemCode);
+                        console.log(`OMR Scanner: Added item "${menuItem.name}" (code: ${itemCode}) to order`);
+                    } else {
+                        console.error('OMR Scanner: addItemToOrder function not found');
                     }
+                } else {
+                    itemsNotFound.push(itemCode);
+                    console.warn(`OMR Scanner: Menu item not found for code: "${itemCode}"`);
                 }
+            } catch (error) {
+                console.error(`OMR Scanner: Error adding item "${itemCode}":`, error);
+                itemsNotFound.push(itemCode);
             }
         }
 